@@ -0,0 +1,109 @@
+import threading
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+
+DASHBOARD_CACHE = 'dashboard'
+# The panels each role's dashboard caches, as named in its template context
+PANELS = {
+    'employee': ['assigned_tasks', 'completed_task_count', 'recent_appraisals'],
+    'team_leader': ['departments', 'subordinates', 'recent_appraisals'],
+    'manager': ['departments', 'subordinates'],
+    'hr_admin': ['pending_appraisals', 'negotiation_tickets', 'completed_appraisals', 'appraisal_periods'],
+}
+
+# Scopes a panel can depend on; a signal bumping a scope's version makes
+# every panel keyed on it miss:
+#   user:<id>  the user's own tasks and appraisals
+#   team:<id>  the user's direct reports
+#   hr         the HR review queues
+#   global     periods and departments, which every role can see
+
+
+def _cache():
+    return caches[DASHBOARD_CACHE]
+
+
+def _version_key(scope):
+    return f'dashboard:version:{scope}'
+
+
+def invalidate(*scopes):
+    """Give each scope a fresh version so the panels built on it are rebuilt.
+
+    A scope without a version has no panels built on it yet (readers create
+    the version before building), so only existing versions are replaced;
+    bulk writes touching thousands of fresh users then cost one read.
+    """
+    found = _cache().get_many([_version_key(scope) for scope in scopes if scope])
+    if found:
+        _cache().set_many({key: uuid4().hex for key in found}, None)
+
+
+def _versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = _cache().get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, None)
+    return {**found, **missing}
+
+
+def cached_panels(role, panels):
+    """Return {name: value} for a role's panels given as {name: (scopes, key parts, builder)}.
+
+    Costs two cache round trips when every panel is warm: one for the scope
+    versions and one for the panels themselves.
+    """
+    versions = _versions({scope for scopes, _, _ in panels.values() for scope in scopes})
+    keys = {
+        name: ':'.join(['dashboard:panel', role, name, *map(str, parts),
+                        *(versions[_version_key(scope)] for scope in sorted(scopes))])
+        for name, (scopes, parts, _) in panels.items()
+    }
+    found = _cache().get_many(keys.values())
+
+    values, missed = {}, {}
+    for name, (_, _, build) in panels.items():
+        if keys[name] in found:
+            values[name] = found[keys[name]]
+        else:
+            values[name] = missed[keys[name]] = build()
+    if missed:
+        _cache().set_many(missed, settings.DASHBOARD_CACHE_TIMEOUT)
+    _count([f'{role}.{name}' for name in panels if keys[name] in found], 'hits')
+    _count([f'{role}.{name}' for name in panels if keys[name] not in found], 'misses')
+    return values
+
+
+# Hit and miss counters live in process memory: counting in the file cache
+# would cost two file writes per panel on every dashboard load, and its
+# incr() is a read then a write that concurrent workers overwrite.
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(names, outcome):
+    with _stats_lock:
+        _stats.update(f'{name}:{outcome}' for name in names)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def cache_stats():
+    """Hit and miss counters of every panel served by this process"""
+    names = [f'{role}.{name}' for role, panels in PANELS.items() for name in panels]
+    with _stats_lock:
+        counts = dict(_stats)
+    stats = {}
+    for name in names:
+        hits = counts.get(f'{name}:hits', 0)
+        misses = counts.get(f'{name}:misses', 0)
+        stats[name] = {'hits': hits, 'misses': misses,
+                       'hit_rate': hits / (hits + misses) if hits + misses else None}
+    return stats
@@ -0,0 +1,108 @@
+from django.db import transaction
+
+from .models import CustomUser, OrgClosure
+
+
+def closure_rows(parents):
+    """Yield (ancestor, descendant, depth) for a {user id: manager id} map.
+
+    A chain that loops back on itself is cut where it repeats, so corrupt
+    data yields a usable closure instead of an endless walk.
+    """
+    for user_id in parents:
+        seen = {user_id}
+        yield user_id, user_id, 0
+        ancestor, depth = parents.get(user_id), 1
+        while ancestor is not None and ancestor not in seen:
+            yield ancestor, user_id, depth
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+
+
+def expected_closure():
+    parents = dict(CustomUser.objects.values_list('pk', 'manager_id'))
+    return set(closure_rows(parents))
+
+
+def rebuild_closure(repair=True):
+    """Compare the closure table with CustomUser.manager and optionally fix it.
+
+    Returns the number of rows that were missing or wrong.
+    """
+    expected = expected_closure()
+    existing = set(OrgClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+    drift = len(expected ^ existing)
+    if repair and drift:
+        with transaction.atomic():
+            OrgClosure.objects.all().delete()
+            OrgClosure.objects.bulk_create(
+                [OrgClosure(ancestor_id=a, descendant_id=d, depth=depth) for a, d, depth in expected],
+                batch_size=1000,
+            )
+    return drift
+
+
+def add_user(user):
+    """Link a new user under its manager's chain"""
+    links = [OrgClosure(ancestor_id=user.pk, descendant_id=user.pk, depth=0)]
+    if user.manager_id:
+        links += [
+            OrgClosure(ancestor_id=ancestor_id, descendant_id=user.pk, depth=depth + 1)
+            for ancestor_id, depth in OrgClosure.objects.filter(descendant_id=user.manager_id)
+            .values_list('ancestor_id', 'depth')
+        ]
+    OrgClosure.objects.bulk_create(links)
+
+
+def add_users(users):
+    """Link many new users at once, e.g. after a bulk_create that sent no signals.
+
+    Managers may be existing users or other users in the batch; the batch
+    must not contain a manager cycle.
+    """
+    parents = {user.pk: user.manager_id for user in users}
+    outside = {manager_id for manager_id in parents.values() if manager_id and manager_id not in parents}
+    chains = {}
+    for ancestor_id, descendant_id, depth in OrgClosure.objects.filter(
+        descendant_id__in=outside,
+    ).values_list('ancestor_id', 'descendant_id', 'depth'):
+        chains.setdefault(descendant_id, []).append((ancestor_id, depth))
+
+    def chain(user_id):
+        if user_id not in parents:
+            # An existing manager missing from the closure still heads its own chain
+            return chains.setdefault(user_id, [(user_id, 0)])
+        if user_id not in chains:
+            manager_id = parents[user_id]
+            above = chain(manager_id) if manager_id else []
+            chains[user_id] = [(user_id, 0)] + [(ancestor_id, depth + 1) for ancestor_id, depth in above]
+        return chains[user_id]
+
+    OrgClosure.objects.bulk_create([
+        OrgClosure(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth)
+        for user_id in parents
+        for ancestor_id, depth in chain(user_id)
+    ], batch_size=1000)
+
+
+def detach_subtree(root_id, above_id=None):
+    """Cut every link between root's subtree and the managers above ``above_id`` (root by default)"""
+    above_id = root_id if above_id is None else above_id
+    subtree = OrgClosure.objects.filter(ancestor_id=root_id).values('descendant_id')
+    managers = OrgClosure.objects.filter(descendant_id=above_id, depth__gt=0).values('ancestor_id')
+    OrgClosure.objects.filter(descendant_id__in=subtree, ancestor_id__in=managers).delete()
+
+
+def move_subtree(user_id, manager_id):
+    """Re-hang a user and everyone below them under ``manager_id`` (or nobody)"""
+    with transaction.atomic():
+        detach_subtree(user_id)
+        if manager_id is None:
+            return
+        subtree = list(OrgClosure.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth'))
+        chain = list(OrgClosure.objects.filter(descendant_id=manager_id).values_list('ancestor_id', 'depth'))
+        OrgClosure.objects.bulk_create([
+            OrgClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in chain
+            for descendant_id, down in subtree
+        ], batch_size=1000)
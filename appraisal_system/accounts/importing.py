@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .dashboard import invalidate as invalidate_dashboards
+from .hierarchy import add_users
+from .models import CustomUser, Department
+from appraisal_system.pools import discard_pool, shared_pool
+
+IMPORT_FIELDS = ['username', 'first_name', 'last_name', 'email', 'role', 'department',
+                 'employee_id', 'phone', 'hire_date', 'manager', 'password']
+# Below this many passwords a process pool costs more than it saves
+POOL_THRESHOLD = 8
+# Ceiling on the default hashing pool, which stays up once an import starts it
+MAX_HASH_WORKERS = 4
+
+
+class ImportReport:
+    """Outcome of a bulk import: the users created, or the per-row errors that stopped it"""
+
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def add_error(self, row_number, username, message):
+        self.errors.append({'row': row_number, 'username': username, 'message': message})
+
+
+def parse_rows(content, filename=''):
+    """Read CSV or JSON (a list of objects) into a list of dicts"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or content.lstrip().startswith('['):
+        rows = json.loads(content)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('JSON imports must be a list of objects.')
+        return rows
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def hash_workers():
+    workers = getattr(settings, 'IMPORT_HASH_WORKERS', None)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, MAX_HASH_WORKERS)
+    return workers
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password() for every entry, spread across a process pool.
+
+    PBKDF2 is deliberately slow, so hashing is the bulk of an import; blank
+    passwords become unusable ones and never reach the pool. The pool is
+    spawned once per process and shared by every import, so concurrent
+    uploads queue for the same bounded set of workers.
+    """
+    to_hash = [password for password in passwords if password]
+    workers = hash_workers() if workers is None else workers
+    if workers <= 1 or len(to_hash) < POOL_THRESHOLD:
+        hashed = [make_password(password) for password in to_hash]
+    else:
+        pool = shared_pool('passwords', workers)
+        try:
+            hashed = list(pool.map(make_password, to_hash, chunksize=max(len(to_hash) // (workers * 4), 1)))
+        except BrokenProcessPool:
+            discard_pool(pool)
+            raise
+    hashed = iter(hashed)
+    return [next(hashed) if password else make_password(None) for password in passwords]
+
+
+def _clean(row):
+    return {field: (str(row.get(field) or '')).strip() for field in IMPORT_FIELDS}
+
+
+def import_users(rows, workers=None, dry_run=False):
+    """Validate every row, then create all users in one transaction or none at all.
+
+    ``department`` is a department name and ``manager`` a username, either of
+    an existing user or of another row in the same import.
+    """
+    report = ImportReport()
+    rows = [_clean(row) for row in rows]
+
+    usernames = [row['username'] for row in rows]
+    employee_ids = [row['employee_id'] for row in rows if row['employee_id']]
+    referenced = {row['manager'] for row in rows if row['manager']}
+    taken_usernames = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+    taken_employee_ids = set(
+        CustomUser.objects.filter(employee_id__in=employee_ids).values_list('employee_id', flat=True)
+    )
+    departments = dict(Department.objects.filter(
+        name__in={row['department'] for row in rows if row['department']},
+    ).values_list('name', 'pk'))
+    existing_managers = dict(CustomUser.objects.filter(username__in=referenced).values_list('username', 'pk'))
+    in_file = {}
+    for number, row in enumerate(rows, start=1):
+        in_file.setdefault(row['username'], number)
+    seen_employee_ids = {}
+
+    users = []
+    for number, row in enumerate(rows, start=1):
+        username = row['username']
+        errors = []
+        if in_file.get(username) != number:
+            errors.append(f"duplicates row {in_file[username]}")
+        if username in taken_usernames:
+            errors.append('username already exists')
+        if row['employee_id']:
+            if row['employee_id'] in taken_employee_ids:
+                errors.append('employee_id already exists')
+            elif seen_employee_ids.setdefault(row['employee_id'], number) != number:
+                errors.append(f"employee_id duplicates row {seen_employee_ids[row['employee_id']]}")
+        if row['department'] and row['department'] not in departments:
+            errors.append(f"unknown department '{row['department']}'")
+        if row['manager'] and row['manager'] not in existing_managers and row['manager'] not in in_file:
+            errors.append(f"unknown manager '{row['manager']}'")
+        if row['manager'] and row['manager'] == username:
+            errors.append('cannot be their own manager')
+
+        user = CustomUser(
+            username=username,
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            email=row['email'],
+            role=row['role'] or 'employee',
+            department_id=departments.get(row['department']),
+            employee_id=row['employee_id'] or None,
+            phone=row['phone'],
+            hire_date=row['hire_date'] or None,
+            manager_id=existing_managers.get(row['manager']),
+        )
+        try:
+            user.full_clean(exclude=['password', 'department', 'manager'], validate_unique=False)
+        except ValidationError as exc:
+            errors.extend(f"{field}: {' '.join(messages)}" for field, messages in exc.message_dict.items())
+        for message in errors:
+            report.add_error(number, username, message)
+        users.append(user)
+
+    _check_manager_cycles(rows, in_file, report)
+    if not report.ok or dry_run:
+        return report
+
+    for user, password in zip(users, hash_passwords([row['password'] for row in rows], workers)):
+        user.password = password
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users, batch_size=500)
+        by_username = {user.username: user for user in users}
+        reports = []
+        for user, row in zip(users, rows):
+            if row['manager'] in by_username and user.manager_id is None:
+                user.manager_id = by_username[row['manager']].pk
+                reports.append(user)
+        CustomUser.objects.bulk_update(reports, ['manager'], batch_size=500)
+        # bulk_create sends no post_save, so link the hierarchy here
+        add_users(users)
+    invalidate_dashboards(*{f'team:{user.manager_id}' for user in users if user.manager_id})
+    report.created = users
+    return report
+
+
+def _check_manager_cycles(rows, in_file, report):
+    """Report rows whose in-file manager chain loops back on itself"""
+    parents = {row['username']: row['manager'] for row in rows if row['manager'] in in_file}
+    for username in parents:
+        seen, current = set(), username
+        while current in parents and current not in seen:
+            seen.add(current)
+            current = parents[current]
+        if current == username:
+            report.add_error(in_file[username], username, 'manager chain loops back to this user')
@@ -0,0 +1,38 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importing import IMPORT_FIELDS, import_users, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Create users in bulk from a CSV or JSON file, all or nothing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help=f"CSV with a header row, or a JSON list; columns: {', '.join(IMPORT_FIELDS)}")
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: IMPORT_HASH_WORKERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            rows = parse_rows(path.read_bytes(), path.name)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        start = time.perf_counter()
+        report = import_users(rows, workers=options['workers'], dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - start
+
+        for error in report.errors:
+            self.stderr.write(f"row {error['row']} ({error['username'] or '-'}): {error['message']}")
+        if not report.ok:
+            raise CommandError(f"{len(report.errors)} errors; nothing was imported.")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} rows are valid."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(report.created)} users in {elapsed:.2f}s "
+            f"({len(report.created) / elapsed if elapsed else 0:.1f} users/sec)"
+        ))
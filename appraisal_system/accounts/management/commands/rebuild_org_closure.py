@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.hierarchy import rebuild_closure
+
+
+class Command(BaseCommand):
+    help = "Verify the OrgClosure table against CustomUser.manager and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Report drift without repairing it; exits non-zero if any is found')
+
+    def handle(self, *args, **options):
+        drift = rebuild_closure(repair=not options['check'])
+        if options['check'] and drift:
+            raise CommandError(f"{drift} org hierarchy links out of sync.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done, {drift} org hierarchy links {'out of sync' if options['check'] else 'repaired'}."
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    OrgClosure = apps.get_model('accounts', 'OrgClosure')
+    parents = dict(CustomUser.objects.values_list('pk', 'manager_id'))
+    links = []
+    for user_id in parents:
+        links.append(OrgClosure(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        seen = {user_id}
+        ancestor, depth = parents.get(user_id), 1
+        while ancestor is not None and ancestor not in seen:
+            links.append(OrgClosure(ancestor_id=ancestor, descendant_id=user_id, depth=depth))
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    OrgClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customuser_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='org_descendant_depth_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_org_link')],
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
 
 class Department(models.Model):
@@ -23,9 +24,66 @@ class CustomUser(AbstractUser):
     phone = models.CharField(max_length=15, blank=True)
     hire_date = models.DateField(null=True, blank=True)
     manager = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True)
+    # Kept in step with Notification.is_read by appraisals.utils so the
+    # unread badge never has to COUNT(*) notifications.
+    unread_notification_count = models.PositiveIntegerField(default=0)
+    
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['role'], name='user_role_idx'),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.role})"
     
+    def clean(self):
+        super().clean()
+        if self.manager_id and self.pk and self.manages(self.manager_id):
+            raise ValidationError({'manager': 'A user cannot report to themselves or to anyone in their own reporting line.'})
+    
     def get_subordinates(self):
         return CustomUser.objects.filter(manager=self)
+    
+    def get_all_subordinates(self, max_depth=None):
+        """Everyone below this user in the org, at any depth"""
+        links = {'ancestor_links__ancestor': self, 'ancestor_links__depth__gt': 0}
+        if max_depth is not None:
+            links['ancestor_links__depth__lte'] = max_depth
+        return CustomUser.objects.filter(**links)
+    
+    def get_management_chain(self):
+        """This user's managers, nearest first"""
+        return CustomUser.objects.filter(
+            descendant_links__descendant=self, descendant_links__depth__gt=0,
+        ).order_by('descendant_links__depth')
+    
+    def manages(self, user_id):
+        """True when ``user_id`` is this user or anyone below them"""
+        return OrgClosure.objects.filter(ancestor_id=self.pk, descendant_id=user_id).exists()
+    
+    @property
+    def org_depth(self):
+        """Number of managers above this user (0 for the top of the org)"""
+        return OrgClosure.objects.filter(descendant_id=self.pk).count() - 1
+
+
+class OrgClosure(models.Model):
+    """Transitive closure of CustomUser.manager: one row per (manager, report) pair at any depth.
+
+    Every user also has a depth-0 row to themselves. Maintained by
+    accounts.signals; rebuild with the rebuild_org_closure command.
+    """
+    ancestor = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_org_link'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='org_descendant_depth_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
@@ -0,0 +1,64 @@
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .dashboard import invalidate as invalidate_dashboards
+from .hierarchy import add_user, detach_subtree, move_subtree
+from .models import CustomUser, Department, OrgClosure
+
+# Saves that never change what a dashboard shows about the user
+BOOKKEEPING_FIELDS = {'last_login', 'password', 'unread_notification_count'}
+
+
+def _touches_manager(update_fields):
+    return update_fields is None or 'manager' in update_fields or 'manager_id' in update_fields
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_manager(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the stored manager so post_save can move the subtree, and refuse cycles"""
+    if raw or instance.pk is None or not _touches_manager(update_fields):
+        return
+    instance._previous_manager_id = (
+        sender.objects.filter(pk=instance.pk).values_list('manager_id', flat=True).first()
+    )
+    if (instance.manager_id and instance.manager_id != instance._previous_manager_id
+            and OrgClosure.objects.filter(ancestor_id=instance.pk, descendant_id=instance.manager_id).exists()):
+        raise ValidationError({'manager': 'A user cannot report to themselves or to anyone in their own reporting line.'})
+
+
+@receiver(post_save, sender=CustomUser)
+def update_org_closure(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_user(instance)
+        return
+    if '_previous_manager_id' not in instance.__dict__:
+        return
+    previous = instance.__dict__.pop('_previous_manager_id')
+    if previous != instance.manager_id:
+        move_subtree(instance.pk, instance.manager_id)
+        invalidate_dashboards(f'team:{previous}' if previous else None)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_team_panels(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= BOOKKEEPING_FIELDS):
+        return
+    invalidate_dashboards(f'team:{instance.manager_id}' if instance.manager_id else None)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_department_panels(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards('global')
+
+
+@receiver(pre_delete, sender=CustomUser)
+def detach_reports(sender, instance, **kwargs):
+    # The reports are SET_NULL by a plain UPDATE, which sends no signal; cut
+    # them loose from the managers above here while the links still exist.
+    detach_subtree(instance.pk)
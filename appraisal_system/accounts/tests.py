@@ -1,3 +1,291 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password, is_password_usable
+from django.core.exceptions import ValidationError
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.template.backends.django import Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from appraisal_system.middleware import TimedTemplate, endpoint_stats
+from appraisal_system.pools import shared_pool
+from appraisals.tests import seed_org
+from .dashboard import DASHBOARD_CACHE, reset_stats
+from .hierarchy import rebuild_closure
+from .importing import POOL_THRESHOLD, hash_passwords, import_users, parse_rows
+from .models import CustomUser
+
+
+class DashboardQueryBudgetTests(TestCase):
+    """Dashboards must cost the same number of queries however many rows they list"""
+
+    # session + user + the role's panels
+    BUDGETS = {
+        'employee': 5,
+        'team_leader': 5,
+        'manager': 4,
+        'hr_admin': 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=4, tasks_per_employee=6)
+
+    def setUp(self):
+        caches[DASHBOARD_CACHE].clear()
+
+    def test_dashboard_budgets(self):
+        users = [self.org['employees'][0], self.org['leaders'][0], self.org['manager'], self.org['hr']]
+        for user in users:
+            with self.subTest(role=user.role):
+                self.client.force_login(user)
+                with self.assertNumQueries(self.BUDGETS[user.role]):
+                    response = self.client.get(reverse('dashboard'))
+                self.assertEqual(response.status_code, 200)
+                # Warm panels leave only the session and user lookups
+                with self.assertNumQueries(2):
+                    warm = self.client.get(reverse('dashboard'))
+                self.assertEqual(warm.content, response.content)
+
+
+class OrgHierarchyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=1)
+        cls.manager = cls.org['manager']
+        cls.leader, cls.other_leader = cls.org['leaders']
+
+    def usernames(self, queryset):
+        return set(queryset.values_list('username', flat=True))
+
+    def test_subtree_and_chain_are_single_queries(self):
+        with self.assertNumQueries(1):
+            subtree = self.usernames(self.manager.get_all_subordinates())
+        self.assertEqual(subtree, {'leader0', 'leader1', 'emp0_0', 'emp0_1', 'emp1_0', 'emp1_1'})
+        self.assertEqual(self.usernames(self.manager.get_all_subordinates(max_depth=1)), {'leader0', 'leader1'})
+        employee = self.org['employees'][0]
+        with self.assertNumQueries(1):
+            chain = list(employee.get_management_chain().values_list('username', flat=True))
+        self.assertEqual(chain, ['leader0', 'manager'])
+        self.assertEqual(employee.org_depth, 2)
+
+    def test_reassigning_moves_the_whole_subtree(self):
+        director = CustomUser.objects.create_user('director', role='manager')
+        self.leader.manager = director
+        self.leader.save()
+        self.assertEqual(self.usernames(director.get_all_subordinates()), {'leader0', 'emp0_0', 'emp0_1'})
+        self.assertEqual(self.usernames(self.manager.get_all_subordinates()), {'leader1', 'emp1_0', 'emp1_1'})
+        self.assertEqual(rebuild_closure(repair=False), 0)
+
+    def test_cycles_are_refused(self):
+        self.manager.manager = self.org['employees'][0]
+        with self.assertRaises(ValidationError):
+            self.manager.full_clean()
+        with self.assertRaises(ValidationError):
+            self.manager.save()
+        self.manager.manager = self.manager
+        with self.assertRaises(ValidationError):
+            self.manager.full_clean()
+
+    def test_deleting_a_manager_detaches_their_reports(self):
+        self.leader.delete()
+        self.assertEqual(self.usernames(self.manager.get_all_subordinates()), {'leader1', 'emp1_0', 'emp1_1'})
+        self.assertEqual(rebuild_closure(repair=False), 0)
+
+    def test_rebuild_repairs_unsignalled_updates(self):
+        CustomUser.objects.filter(pk=self.other_leader.pk).update(manager=self.leader)
+        self.assertGreater(rebuild_closure(), 0)
+        self.assertIn('emp1_0', self.usernames(self.leader.get_all_subordinates()))
+        self.assertEqual(rebuild_closure(repair=False), 0)
+
+
+IMPORT_CSV = """username,first_name,last_name,email,role,department,employee_id,manager,password,hire_date
+lead,Lena,Lead,lena@example.com,team_leader,Engineering,E100,manager,s3cret-pass,2024-01-15
+dev1,Dev,One,dev1@example.com,employee,Engineering,E101,lead,s3cret-pass,
+dev2,Dev,Two,,employee,,E102,lead,,
+"""
+
+
+class UserImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=1)
+
+    def test_import_links_managers_in_file_and_in_db(self):
+        report = import_users(parse_rows(IMPORT_CSV), workers=1)
+        self.assertEqual(report.errors, [])
+        lead = CustomUser.objects.get(username='lead')
+        self.assertEqual(lead.manager, self.org['manager'])
+        self.assertEqual(lead.department.name, 'Engineering')
+        self.assertTrue(lead.check_password('s3cret-pass'))
+        self.assertFalse(CustomUser.objects.get(username='dev2').has_usable_password())
+        self.assertEqual(set(lead.get_all_subordinates().values_list('username', flat=True)), {'dev1', 'dev2'})
+        self.assertIn('dev1', set(self.org['manager'].get_all_subordinates().values_list('username', flat=True)))
+        self.assertEqual(rebuild_closure(repair=False), 0)
+
+    def test_any_bad_row_imports_nothing(self):
+        rows = parse_rows(IMPORT_CSV) + [
+            {'username': 'dev1', 'role': 'employee'},
+            {'username': 'ghost', 'role': 'wizard', 'department': 'Nowhere', 'manager': 'nobody'},
+            {'username': 'emp0_0'},
+            {'username': 'loop_a', 'manager': 'loop_b'},
+            {'username': 'loop_b', 'manager': 'loop_a'},
+            {'username': 'late', 'hire_date': 'yesterday', 'email': 'not-an-email'},
+        ]
+        report = import_users(rows, workers=1)
+        messages = {(error['row'], error['message'].split(':')[0]) for error in report.errors}
+        self.assertIn((4, 'duplicates row 2'), messages)
+        self.assertIn((5, "unknown department 'Nowhere'"), messages)
+        self.assertIn((5, "unknown manager 'nobody'"), messages)
+        self.assertIn((5, 'role'), messages)
+        self.assertIn((6, 'username already exists'), messages)
+        self.assertIn((7, 'manager chain loops back to this user'), messages)
+        self.assertIn((9, 'hire_date'), messages)
+        self.assertIn((9, 'email'), messages)
+        self.assertFalse(CustomUser.objects.filter(username='lead').exists())
+
+    def test_large_imports_hash_in_the_shared_pool(self):
+        passwords = [f'pw-{i:08}' for i in range(POOL_THRESHOLD)] + ['']
+        with mock.patch('accounts.importing.shared_pool', wraps=shared_pool) as pool:
+            hashed = hash_passwords(passwords, workers=2)
+        pool.assert_called_once_with('passwords', 2)
+        self.assertEqual(shared_pool('passwords', 2)._mp_context.get_start_method(), 'spawn')
+        self.assertEqual(len(hashed), len(passwords))
+        self.assertTrue(check_password(passwords[-2], hashed[-2]))
+        self.assertFalse(is_password_usable(hashed[-1]))
+
+    def test_json_upload_through_hr_view(self):
+        self.client.force_login(self.org['hr'])
+        upload = SimpleUploadedFile('people.json', b'[{"username": "newbie", "manager": "leader0", "password": "pw-12345678"}]')
+        response = self.client.post(reverse('hr_import_users'), {'file': upload})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(CustomUser.objects.get(username='newbie').manager, self.org['leaders'][0])
+
+    def test_view_reports_errors_and_is_hr_only(self):
+        self.client.force_login(self.org['hr'])
+        upload = SimpleUploadedFile('people.csv', b'username,role\nx,wizard\n')
+        response = self.client.post(reverse('hr_import_users'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].errors[0]['row'], 1)
+        self.client.force_login(self.org['manager'])
+        self.assertEqual(self.client.get(reverse('hr_import_users')).status_code, 302)
+
+
+class DashboardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+
+    def setUp(self):
+        caches[DASHBOARD_CACHE].clear()
+        reset_stats()
+
+    def load(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('dashboard')).context
+
+    def test_new_task_refreshes_only_the_assignee(self):
+        from appraisals.models import Task
+        employee, colleague = self.org['employees'][:2]
+        self.load(employee)
+        self.load(colleague)
+        Task.objects.create(title='Fresh task', description='New', assigned_to=employee,
+                            assigned_by=self.org['leaders'][0], due_date=timezone.now())
+        self.assertEqual(self.load(employee)['assigned_tasks'][0].title, 'Fresh task')
+        self.client.force_login(colleague)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+    def test_hr_queue_follows_appraisal_changes(self):
+        from appraisals.models import Appraisal
+        pending = len(self.load(self.org['hr'])['pending_appraisals'])
+        appraisal = Appraisal.objects.filter(status='submitted').first()
+        appraisal.hr_approved = True
+        appraisal.save()
+        self.assertEqual(len(self.load(self.org['hr'])['pending_appraisals']), pending - 1)
+
+    def test_reassignment_refreshes_both_teams(self):
+        leader, other = self.org['leaders']
+        employee = self.org['employees'][0]
+        self.load(leader)
+        self.load(other)
+        employee.manager = other
+        employee.save()
+        self.assertNotIn(employee, self.load(leader)['subordinates'])
+        self.assertIn(employee, self.load(other)['subordinates'])
+
+    def test_logins_do_not_invalidate(self):
+        leader = self.org['leaders'][0]
+        self.load(leader)
+        self.client.force_login(self.org['employees'][0])
+        self.client.force_login(leader)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('dashboard'))
+
+    def test_stats_endpoint(self):
+        hr = self.org['hr']
+        self.load(hr)
+        self.load(hr)
+        stats = self.client.get(reverse('dashboard_cache_stats')).json()
+        self.assertEqual(stats['hr_admin.pending_appraisals'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        self.client.force_login(self.org['manager'])
+        self.assertEqual(self.client.get(reverse('dashboard_cache_stats')).status_code, 403)
+
+
+class RequestInstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=2)
+
+    def setUp(self):
+        caches[DASHBOARD_CACHE].clear()
+        endpoint_stats.reset()
+
+    def test_server_timing_reports_db_template_and_total(self):
+        self.client.force_login(self.org['employees'][0])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('task_list'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+    def test_template_time_comes_from_the_backend_not_a_patched_django_class(self):
+        self.assertEqual(Template.render.__module__, 'django.template.backends.django')
+        self.client.force_login(self.org['employees'][0])
+        with mock.patch.object(TimedTemplate, 'render', autospec=True,
+                               side_effect=Template.render) as render:
+            self.client.get(reverse('task_list'))
+        render.assert_called()
+
+    def test_slow_queries_are_logged_with_view_and_role(self):
+        self.client.force_login(self.org['leaders'][0])
+        with override_settings(SLOW_QUERY_MS=0), self.assertLogs('appraisal_system.slow_queries') as logs:
+            self.client.get(reverse('task_list'))
+        self.assertTrue(logs.output)
+        self.assertTrue(all('GET task_list role=team_leader' in line for line in logs.output))
+
+    def test_hr_page_ranks_endpoints(self):
+        self.client.force_login(self.org['employees'][0])
+        for _ in range(3):
+            self.client.get(reverse('task_list'))
+        self.client.get(reverse('dashboard'))
+
+        self.client.force_login(self.org['hr'])
+        rows = self.client.get(reverse('hr_endpoint_stats'), {'sort': 'total'}).context['rows']
+        task_list = next(row for row in rows if row['endpoint'] == 'task_list')
+        self.assertEqual(task_list['requests'], 3)
+        self.assertGreater(task_list['avg_queries'], 0)
+
+        self.client.force_login(self.org['manager'])
+        self.assertRedirects(self.client.get(reverse('hr_endpoint_stats')), reverse('dashboard'),
+                             fetch_redirect_response=False)
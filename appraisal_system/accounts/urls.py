@@ -4,7 +4,10 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
     path('login/', auth_views.LoginView.as_view(), name='login'),
     path('logout/', auth_views.LogoutView.as_view(), name='logout'),
     path('hr/create-user/', views.hr_create_user, name='hr_create_user'),
+    path('hr/import-users/', views.hr_import_users, name='hr_import_users'),
+    path('hr/endpoints/', views.hr_endpoint_stats, name='hr_endpoint_stats'),
 ]
\ No newline at end of file
@@ -5,53 +5,101 @@ from django.contrib import messages
 from django.contrib.auth.forms import UserCreationForm
 from django.utils import timezone
 from .models import CustomUser, Department
+from .importing import IMPORT_FIELDS, import_users, parse_rows
+from .dashboard import cache_stats, cached_panels
+from appraisal_system.middleware import endpoint_stats
 from django import forms
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
+
+HR_QUEUE_PAGE_SIZE = 20
 
 @login_required
 def dashboard(request):
     user = request.user
     context = {'user': user}
     
+    # Panels are served from the shared dashboard cache and rebuilt only when
+    # a signal has bumped one of the scopes they depend on (accounts.dashboard)
     if user.role == 'employee':
         from appraisals.models import Task, Appraisal
-        assigned_tasks = Task.objects.filter(assigned_to=user).order_by('-created_at')[:5]
-        completed_tasks = Task.objects.filter(assigned_to=user, status='completed')
-        context.update({
-            'assigned_tasks': assigned_tasks,
-            'completed_tasks': completed_tasks,
-            'recent_appraisals': Appraisal.objects.filter(employee=user, hr_approved=True).order_by('-updated_at')[:3],
-        })
+        context.update(cached_panels(user.role, {
+            'assigned_tasks': ([f'user:{user.id}'], [user.id], lambda: list(
+                Task.objects.filter(assigned_to=user).order_by('-created_at')[:5])),
+            'completed_task_count': ([f'user:{user.id}'], [user.id], lambda:
+                Task.objects.filter(assigned_to=user, status='completed').count()),
+            'recent_appraisals': ([f'user:{user.id}', 'global'], [user.id], lambda: list(
+                Appraisal.objects.filter(employee=user, hr_approved=True)
+                .select_related('period', 'manager', 'negotiationticket').order_by('-updated_at')[:3])),
+        }))
         return render(request, 'accounts/employee_dashboard.html', context)
     
     elif user.role == 'manager':
-        context.update({
-            'departments': Department.objects.all(),
-            'subordinates': user.get_subordinates(),
-        })
+        context.update(cached_panels(user.role, {
+            'departments': (['global'], [], lambda: list(Department.objects.all())),
+            'subordinates': ([f'team:{user.id}', 'global'], [user.id], lambda: list(
+                user.get_subordinates().select_related('department'))),
+        }))
         return render(request, 'accounts/manager_dashboard.html', context)
     
     elif user.role == 'hr_admin':
         from appraisals.models import Appraisal, NegotiationTicket, AppraisalPeriod
-        context.update({
-            'pending_appraisals': Appraisal.objects.filter(status='submitted', hr_approved=False),
-            'negotiation_tickets': NegotiationTicket.objects.filter(status__in=['open', 'in_review']),
-            'completed_appraisals': Appraisal.objects.filter(status='accepted', hr_approved=True),
-            'appraisal_periods': AppraisalPeriod.objects.all().order_by('-start_date'),
-        })
+        from appraisals.pagination import keyset_paginate
+        pending_cursor = request.GET.get('pending_cursor', '')
+        tickets_cursor = request.GET.get('tickets_cursor', '')
+        completed_cursor = request.GET.get('completed_cursor', '')
+        context.update(cached_panels(user.role, {
+            'pending_appraisals': (['hr', 'global'], [pending_cursor], lambda: keyset_paginate(
+                Appraisal.objects.filter(status='submitted', hr_approved=False).select_related('employee', 'manager'),
+                pending_cursor, HR_QUEUE_PAGE_SIZE)),
+            'negotiation_tickets': (['hr', 'global'], [tickets_cursor], lambda: keyset_paginate(
+                NegotiationTicket.objects.filter(status__in=['open', 'in_review']).select_related('appraisal__employee'),
+                tickets_cursor, HR_QUEUE_PAGE_SIZE)),
+            'completed_appraisals': (['hr', 'global'], [completed_cursor], lambda: keyset_paginate(
+                Appraisal.objects.filter(status='accepted', hr_approved=True).select_related('employee', 'period'),
+                completed_cursor, HR_QUEUE_PAGE_SIZE)),
+            'appraisal_periods': (['global'], [], lambda: list(
+                AppraisalPeriod.objects.all().order_by('-start_date'))),
+        }))
         return render(request, 'accounts/hr_dashboard.html', context)
     
     elif user.role == 'team_leader':
         from appraisals.models import Appraisal
-        context.update({
-            'departments': Department.objects.all(),
-            'subordinates': user.get_subordinates(),
-            'recent_appraisals': Appraisal.objects.filter(employee=user, hr_approved=True).order_by('-updated_at')[:3],
-        })
+        context.update(cached_panels(user.role, {
+            'departments': (['global'], [], lambda: list(Department.objects.all())),
+            'subordinates': ([f'team:{user.id}', 'global'], [user.id], lambda: list(
+                user.get_subordinates().select_related('department'))),
+            'recent_appraisals': ([f'user:{user.id}', 'global'], [user.id], lambda: list(
+                Appraisal.objects.filter(employee=user, hr_approved=True)
+                .select_related('period').order_by('-updated_at')[:3])),
+        }))
         return render(request, 'accounts/team_leader_dashboard.html', context)
     
     return render(request, 'accounts/dashboard.html', context)
 
+@login_required
+def dashboard_cache_stats(request):
+    if request.user.role != 'hr_admin':
+        return JsonResponse({'status': 'error', 'message': 'You do not have permission to view cache statistics.'}, status=403)
+    return JsonResponse(cache_stats())
+
+ENDPOINT_SORTS = {'total': 'total_ms', 'p95': 'p95_ms', 'avg': 'avg_ms', 'queries': 'avg_queries', 'slow': 'slow_queries'}
+
+@login_required
+def hr_endpoint_stats(request):
+    """Worst endpoints of this server process, from SQLInstrumentationMiddleware"""
+    if request.user.role != 'hr_admin':
+        messages.error(request, 'You do not have permission to view performance statistics.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        endpoint_stats.reset()
+        messages.success(request, 'Endpoint statistics have been reset.')
+        return redirect('hr_endpoint_stats')
+    sort = request.GET.get('sort') if request.GET.get('sort') in ENDPOINT_SORTS else 'total'
+    rows = sorted(endpoint_stats.snapshot(), key=lambda row: row[ENDPOINT_SORTS[sort]], reverse=True)
+    return render(request, 'accounts/hr_endpoint_stats.html', {
+        'rows': rows, 'sort': sort, 'sorts': ENDPOINT_SORTS,
+    })
+
 # Removed the register view as registration is now HR-only.
 
 class HRUserCreationForm(forms.ModelForm):
@@ -91,6 +139,37 @@ def hr_create_user(request):
         form = HRUserCreationForm()
     return render(request, 'accounts/hr_create_user.html', {'form': form})
 
+class UserImportForm(forms.Form):
+    file = forms.FileField(help_text='CSV with a header row, or a JSON list of objects')
+    dry_run = forms.BooleanField(required=False, label='Validate only')
+
+@login_required
+def hr_import_users(request):
+    if request.user.role != 'hr_admin':
+        messages.error(request, 'You do not have permission to add users.')
+        return redirect('dashboard')
+    report = None
+    if request.method == 'POST':
+        form = UserImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                rows = parse_rows(upload.read(), upload.name)
+            except ValueError as exc:
+                form.add_error('file', f'Could not read the file: {exc}')
+            else:
+                report = import_users(rows, dry_run=form.cleaned_data['dry_run'])
+                if report.ok and not form.cleaned_data['dry_run']:
+                    messages.success(request, f'{len(report.created)} users imported successfully!')
+                    return redirect('dashboard')
+                if report.ok:
+                    messages.success(request, f'All {len(rows)} rows are valid.')
+    else:
+        form = UserImportForm()
+    return render(request, 'accounts/hr_import_users.html', {
+        'form': form, 'report': report, 'import_fields': IMPORT_FIELDS,
+    })
+
 @login_required
 def accept_appraisal(request, appraisal_id):
     from appraisals.models import Appraisal, NegotiationTicket
@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+slow_query_log = logging.getLogger('appraisal_system.slow_queries')
+
+_current = ContextVar('request_timings', default=None)
+
+# Durations kept per endpoint for its p95, and endpoints tracked per process
+SAMPLE_SIZE = 200
+MAX_ENDPOINTS = 500
+
+
+class SlowQueryLogHandler(RotatingFileHandler):
+    """RotatingFileHandler that creates its directory and opens the file on first use"""
+
+    def __init__(self, filename, **kwargs):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        super().__init__(filename, delay=True, **kwargs)
+
+
+class RequestTimings:
+    """SQL and template time of one request; its __call__ has the connection.execute_wrapper signature"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.rendering = 0
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.db_ms += elapsed
+            if elapsed >= settings.SLOW_QUERY_MS:
+                self.slow.append((elapsed, sql))
+
+
+def timed_execute(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection (see appraisal_system.db).
+
+    It finds the request through a context variable rather than being added
+    per request, so queries a sync view runs in asgiref's worker thread under
+    ASGI are counted as well.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+class TimedTemplate(Template):
+    """Template whose render adds its duration to the current request's timings"""
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        # Only the outermost render counts, so a template rendered from
+        # inside another is not timed twice
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.rendering -= 1
+            timings.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend returning TimedTemplate, configured in TEMPLATES"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
+
+
+class EndpointStats:
+    """Per-view request timings, aggregated in memory for the life of the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, total_ms, timings):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                if len(self._endpoints) >= MAX_ENDPOINTS:
+                    return
+                stats = self._endpoints[endpoint] = {
+                    'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0,
+                    'queries': 0, 'slow_queries': 0, 'samples': deque(maxlen=SAMPLE_SIZE),
+                }
+            stats['requests'] += 1
+            stats['total_ms'] += total_ms
+            stats['max_ms'] = max(stats['max_ms'], total_ms)
+            stats['db_ms'] += timings.db_ms
+            stats['queries'] += timings.queries
+            stats['slow_queries'] += len(timings.slow)
+            stats['samples'].append(total_ms)
+
+    def snapshot(self):
+        """One row per endpoint with its averages and recent p95, in no particular order"""
+        with self._lock:
+            endpoints = [(endpoint, dict(stats, samples=sorted(stats['samples'])))
+                         for endpoint, stats in self._endpoints.items()]
+        rows = []
+        for endpoint, stats in endpoints:
+            requests, samples = stats['requests'], stats['samples']
+            rows.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'total_ms': round(stats['total_ms'], 1),
+                'avg_ms': round(stats['total_ms'] / requests, 2),
+                'p95_ms': round(samples[max(-(-len(samples) * 95 // 100) - 1, 0)], 2),
+                'max_ms': round(stats['max_ms'], 2),
+                'avg_db_ms': round(stats['db_ms'] / requests, 2),
+                'avg_queries': round(stats['queries'] / requests, 1),
+                'slow_queries': stats['slow_queries'],
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+class SQLInstrumentationMiddleware:
+    """Count and time every query of a request.
+
+    Adds a Server-Timing header (db, tpl and total; tpl is measured by the
+    TimedDjangoTemplates backend and includes queries run while rendering),
+    logs queries slower than SLOW_QUERY_MS with the view and the user's
+    role, and feeds endpoint_stats. Install it first so the session and auth
+    queries are counted too. It is async-capable so that under ASGI the
+    notification stream is not pinned to a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        user = getattr(request, 'user', None) if timings.slow else None
+        return self.finish(request, response, timings, start, user)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        # request.user would hit the database from the event loop
+        user = await request.auser() if timings.slow and hasattr(request, 'auser') else None
+        return self.finish(request, response, timings, start, user)
+
+    def finish(self, request, response, timings, start, user):
+        total_ms = (time.perf_counter() - start) * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db_ms:.1f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+        match = request.resolver_match
+        endpoint = match.view_name if match else 'unresolved'
+        if timings.slow:
+            role = getattr(user, 'role', 'anonymous') if user is not None and user.is_authenticated else 'anonymous'
+            for elapsed, sql in timings.slow:
+                slow_query_log.warning('%.1f ms %s %s role=%s: %s', elapsed, request.method, endpoint, role, sql)
+        endpoint_stats.record(endpoint, total_ms, timings)
+        return response
@@ -0,0 +1,35 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+_lock = threading.Lock()
+_pools = {}
+
+
+def shared_pool(name, workers):
+    """A process pool of ``workers`` processes shared by every request of this process.
+
+    Workers are spawned, not forked: forking a threaded server copies locks
+    other threads hold and the parent's whole memory, once per export. The
+    pool starts on first use, each worker runs django.setup() once, and
+    concurrent callers queue on the same bounded set of processes.
+    """
+    key = (name, workers)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        return pool
+
+
+def discard_pool(pool):
+    """Drop a broken pool so the next caller starts a fresh one"""
+    with _lock:
+        for key, existing in list(_pools.items()):
+            if existing is pool:
+                del _pools[key]
+    pool.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'your-secret-key-here'
@@ -22,6 +24,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 MIDDLEWARE = [
+    # First, so that session and auth queries are timed as well
+    'appraisal_system.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,9 +37,13 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'appraisal_system.urls'
 
+# Keeps the test suite away from the file-based caches below
+TEST_RUNNER = 'appraisal_system.test_runner.TestRunner'
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that adds render time to the request's Server-Timing
+        'BACKEND': 'appraisal_system.middleware.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -44,23 +52,160 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'appraisals.context_processors.live_notifications',
             ],
         },
     },
 ]
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# APPRAISAL_DB_PROFILE picks the database setup:
+#   development  SQLite with Django's defaults
+#   production   SQLite in WAL mode with a busy timeout, IMMEDIATE write
+#                transactions and persistent connections
+#   postgres     PostgreSQL through psycopg's connection pool, configured by
+#                the POSTGRES_* environment variables
+APPRAISAL_DB_PROFILE = os.environ.get('APPRAISAL_DB_PROFILE', 'development')
+
+# Run on every new SQLite connection by appraisal_system.db
+SQLITE_PRAGMAS = {}
+
+if APPRAISAL_DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'appraisal_system'),
+            'USER': os.environ.get('POSTGRES_USER', 'appraisal_system'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # The pool keeps connections open, so CONN_MAX_AGE stays 0
+            'OPTIONS': {
+                'pool': {
+                    'min_size': 2,
+                    'max_size': int(os.environ.get('POSTGRES_POOL_SIZE', 20)),
+                    'timeout': 10,
+                },
+            },
+        }
     }
-}
+elif APPRAISAL_DB_PROFILE in ('development', 'production'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+    if APPRAISAL_DB_PROFILE == 'production':
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+            # IMMEDIATE takes the write lock at BEGIN, where the busy timeout
+            # applies, instead of failing at the first write of a DEFERRED
+            # transaction that another writer got ahead of
+            'OPTIONS': {'timeout': 20, 'transaction_mode': 'IMMEDIATE'},
+        })
+        SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 20000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -32000,
+            'temp_store': 'MEMORY',
+        }
+else:
+    raise ImproperlyConfigured(f"Unknown APPRAISAL_DB_PROFILE '{APPRAISAL_DB_PROFILE}'.")
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# When True, fan-out notifications are queued and written by the
+# process_notification_outbox worker instead of inside the request.
+NOTIFICATION_OUTBOX = False
+
+# Live notifications: SSE keepalive interval and long-poll wait in seconds,
+# and the delay in milliseconds before an EventSource reconnects or a
+# long-poll is repeated. Under WSGI polls answer at once and are repeated
+# every NOTIFICATION_POLL_INTERVAL seconds instead.
+NOTIFICATION_HEARTBEAT = 15
+NOTIFICATION_POLL_TIMEOUT = 25
+NOTIFICATION_RETRY_MS = 3000
+NOTIFICATION_POLL_INTERVAL = 30
+
+# Size of the spawned process pool every period PDF export of a web process
+# shares; None uses up to 4 CPUs, 0 renders inside the request process.
+PDF_EXPORT_WORKERS = None
+
+# Size of the spawned process pool that hashes passwords of bulk user
+# imports; None uses up to 4 CPUs, 0 or 1 hashes inside the request process.
+IMPORT_HASH_WORKERS = None
+
+# Rendered appraisal letters, evicted least recently used first once the
+# directory grows past PDF_CACHE_MAX_BYTES.
+PDF_CACHE_DIR = BASE_DIR / 'pdf_cache'
+PDF_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Resumable completion report uploads: the largest accepted report, the
+# chunk size clients are told to use, and how long an idle upload is kept
+# before prune_report_blobs discards it.
+REPORT_UPLOAD_MAX_BYTES = 512 * 1024 * 1024
+REPORT_UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+REPORT_UPLOAD_EXPIRY = 24 * 60 * 60
+
+# Department analytics are invalidated whenever a period's appraisals or
+# ratings change; the timeout only bounds staleness from users changing
+# department.
+ANALYTICS_CACHE_TIMEOUT = 60 * 60
+
+# Dashboard panels and department analytics live in file-based caches so
+# every worker process on the host (and every management command) sees the
+# same entries and the same invalidations; the timeouts are only backstops.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'dashboard',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'analytics': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'analytics',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+DASHBOARD_CACHE_TIMEOUT = 10 * 60
+
+# Queries at least this slow are written to the rotating slow-query log
+# with the view and the user's role.
+SLOW_QUERY_MS = 100
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {'format': '{asctime} {message}', 'style': '{'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'appraisal_system.middleware.SlowQueryLogHandler',
+            'filename': BASE_DIR / 'logs' / 'slow_queries.log',
+            'maxBytes': 5 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'timestamped',
+        },
+    },
+    'loggers': {
+        'appraisal_system.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
\ No newline at end of file
@@ -0,0 +1,36 @@
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Run the suite with every cache in local memory and PDFs in a temporary directory.
+
+    The dashboard and analytics caches and the PDF cache are directories
+    shared with the running site: a test clearing them would wipe a
+    developer's live cache (a letter render also drops the other renders of
+    its appraisal), and entries one run writes would leak into the next.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._pdf_cache = tempfile.TemporaryDirectory()
+        self._settings = override_settings(
+            CACHES={
+                alias: {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': f'test-{alias}',
+                    'OPTIONS': {'MAX_ENTRIES': 10000},
+                }
+                for alias in settings.CACHES
+            },
+            PDF_CACHE_DIR=self._pdf_cache.name,
+        )
+        self._settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.disable()
+        self._pdf_cache.cleanup()
+        super().teardown_test_environment(**kwargs)
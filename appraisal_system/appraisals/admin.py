@@ -1,34 +1,76 @@
 from django.contrib import admin
-from .models import Task, PerformanceRating, Appraisal, AppraisalPeriod, NegotiationTicket, Notification
+from django.db import transaction
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from .models import Task, PerformanceRating, Appraisal, AppraisalPeriod, NegotiationTicket, Notification, EmployeeScoreRollup, Keyword, NotificationOutbox, ReportBlob, ReportUpload
+from .rollups import get_scores
+from .utils import recount_unread
+from .scoring import SCORE_FIELDS
+from .search import matching_ids, search_available
+
+class FullTextSearchMixin:
+    """Also match the admin search term against the FTS5 index of ``search_kind``.
+
+    The long text fields are not in search_fields, where each would be an
+    icontains scan; they are found through the index instead.
+    """
+    search_kind = None
+    
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        matching = matching_ids(self.search_kind, search_term) if search_available() else None
+        if matching:
+            results |= queryset.filter(pk__in=RawSQL(*matching))
+        return results, may_have_duplicates
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = 'task'
     list_display = ['title', 'assigned_to', 'assigned_by', 'status', 'priority', 'due_date']
     list_filter = ['status', 'priority', 'assigned_by']
-    search_fields = ['title', 'assigned_to__username']
+    search_fields = ['assigned_to__username']
 
 @admin.register(PerformanceRating)
-class PerformanceRatingAdmin(admin.ModelAdmin):
+class PerformanceRatingAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = 'rating'
     list_display = ['employee', 'manager', 'quality_rating', 'overall_rating', 'rating_date']
     list_filter = ['quality_rating', 'timeliness_rating']
+    search_fields = ['employee__username']
 
 @admin.register(Appraisal)
-class AppraisalAdmin(admin.ModelAdmin):
+class AppraisalAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = 'appraisal'
     list_display = ['employee', 'period', 'manager', 'overall_percentage', 'status', 'hr_approved']
     list_filter = ['status', 'hr_approved', 'period']
+    search_fields = ['employee__username']
     actions = ['calculate_scores']
     
     def calculate_scores(self, request, queryset):
-        for appraisal in queryset:
-            appraisal.calculate_scores()
-        self.message_user(request, f"Scores calculated for {queryset.count()} appraisals.")
+        now = timezone.now()
+        appraisals = list(queryset.select_related('employee', 'period'))
+        for appraisal in appraisals:
+            get_scores(appraisal.employee, appraisal.period).apply(appraisal)
+            appraisal.updated_at = now
+        Appraisal.objects.bulk_update(appraisals, SCORE_FIELDS + ['updated_at'])
+        self.message_user(request, f"Scores calculated for {len(appraisals)} appraisals.")
 
 @admin.register(AppraisalPeriod)
 class AppraisalPeriodAdmin(admin.ModelAdmin):
     list_display = ['title', 'start_date', 'end_date', 'is_active']
 
+@admin.register(EmployeeScoreRollup)
+class EmployeeScoreRollupAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'period', 'rating_count', 'task_count', 'completed_task_count', 'updated_at']
+    list_filter = ['period']
+
+@admin.register(Keyword)
+class KeywordAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
 @admin.register(NegotiationTicket)
-class NegotiationTicketAdmin(admin.ModelAdmin):
+class NegotiationTicketAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    search_kind = 'ticket'
     list_display = ['appraisal', 'negotiated_by', 'status', 'created_at']
     list_filter = ['status', 'negotiated_by__role']
     search_fields = ['appraisal__employee__username', 'negotiated_by__username']
@@ -41,9 +83,28 @@ class NotificationAdmin(admin.ModelAdmin):
     actions = ['mark_as_read', 'mark_as_unread']
     
     def mark_as_read(self, request, queryset):
-        queryset.update(is_read=True)
+        self._set_read(queryset, True)
         self.message_user(request, f"{queryset.count()} notifications marked as read.")
     
     def mark_as_unread(self, request, queryset):
-        queryset.update(is_read=False)
-        self.message_user(request, f"{queryset.count()} notifications marked as unread.")
\ No newline at end of file
+        self._set_read(queryset, False)
+        self.message_user(request, f"{queryset.count()} notifications marked as unread.")
+    
+    def _set_read(self, queryset, is_read):
+        recipient_ids = set(queryset.values_list('recipient_id', flat=True))
+        with transaction.atomic():
+            queryset.update(is_read=is_read)
+            recount_unread(recipient_ids)
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['title', 'notification_type', 'created_at', 'processed_at']
+    list_filter = ['notification_type']
+
+@admin.register(ReportBlob)
+class ReportBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'created_at']
+
+@admin.register(ReportUpload)
+class ReportUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'user', 'offset', 'size', 'updated_at']
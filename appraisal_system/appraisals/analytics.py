@@ -0,0 +1,136 @@
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Sum
+
+from .models import Appraisal, PerformanceRating
+from .scoring import SCORE_FIELDS, rating_period_q
+
+ANALYTICS_CACHE = 'analytics'
+PERCENTILES = (10, 25, 50, 75, 90)
+BUCKET_WIDTH = 10
+
+
+def _cache():
+    return caches[ANALYTICS_CACHE]
+
+
+def _version_key(period_id):
+    return f'analytics:period:{period_id}:version'
+
+
+def period_version(period_id):
+    key = _version_key(period_id)
+    version = _cache().get(key)
+    if version is None:
+        # Two readers racing here must agree on one version
+        _cache().add(key, uuid4().hex, None)
+        version = _cache().get(key)
+    return version
+
+
+def invalidate_period(period_id):
+    """Make every cached report of a period stale, in every process sharing the cache.
+
+    The version is replaced rather than incremented: a file-based incr() is
+    a read and a write, and two concurrent ones could land on the same value.
+    """
+    _cache().set(_version_key(period_id), uuid4().hex, None)
+
+
+def percentiles(ordered, points=PERCENTILES):
+    """Linearly interpolated percentiles of an already sorted list"""
+    if not ordered:
+        return {f'p{point}': None for point in points}
+    last = len(ordered) - 1
+    result = {}
+    for point in points:
+        rank = last * point / 100
+        low = int(rank)
+        high = min(low + 1, last)
+        result[f'p{point}'] = ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+    return result
+
+
+def histogram(ordered, width=BUCKET_WIDTH):
+    """Bucket counts of an already sorted list of 0-100 scores; the top bucket includes 100"""
+    buckets = {}
+    for low in range(0, 100, width):
+        high = low + width
+        upper = bisect_right(ordered, high) if high >= 100 else bisect_left(ordered, high)
+        buckets[f'{low}-{high}'] = upper - bisect_left(ordered, low)
+    return buckets
+
+
+def describe(ordered):
+    """Mean, min, max and percentiles of an already sorted list"""
+    return {
+        'mean': sum(ordered) / len(ordered) if ordered else None,
+        'min': ordered[0] if ordered else None,
+        'max': ordered[-1] if ordered else None,
+        **percentiles(ordered),
+    }
+
+
+def appraisal_summary(appraisals):
+    """Count, mean, min/max, percentiles and histogram of every appraisal score.
+
+    One narrow extract feeds everything: each column is sorted once and
+    every statistic is read off the sorted list, so the database does a
+    single pass over the period's appraisals.
+    """
+    rows = list(appraisals.order_by().values_list('status', *SCORE_FIELDS))
+    statuses = Counter(row[0] for row in rows)
+    columns = [sorted(row[i] for row in rows) for i in range(1, len(SCORE_FIELDS) + 1)]
+    return {
+        'count': len(rows),
+        'scores': {field: describe(column) for field, column in zip(SCORE_FIELDS, columns)},
+        'histogram': histogram(columns[SCORE_FIELDS.index('overall_percentage')]),
+        'statuses': {value: statuses.get(value, 0) for value, _ in Appraisal.STATUS_CHOICES},
+    }
+
+
+def rating_summary(ratings):
+    """Count, mean and per-choice breakdown of performance ratings"""
+    quality = dict.fromkeys(dict(PerformanceRating.RATING_CHOICES), 0)
+    timeliness = dict.fromkeys(dict(PerformanceRating.TIMELINESS_CHOICES), 0)
+    count = overall = 0
+    rows = ratings.order_by().values_list('quality_rating', 'timeliness_rating').annotate(
+        n=Count('pk'), overall_sum=Sum('overall_rating'),
+    )
+    for quality_rating, timeliness_rating, n, overall_sum in rows:
+        quality[quality_rating] = quality.get(quality_rating, 0) + n
+        timeliness[timeliness_rating] = timeliness.get(timeliness_rating, 0) + n
+        count += n
+        overall += overall_sum or 0
+    return {
+        'count': count,
+        'overall_mean': overall / count if count else None,
+        'quality': quality,
+        'timeliness': timeliness,
+    }
+
+
+def department_period_report(department, period):
+    """Score distribution of one department in one appraisal period"""
+    appraisals = Appraisal.objects.filter(period=period, employee__department=department)
+    ratings = PerformanceRating.objects.filter(rating_period_q(period), employee__department=department)
+    return {
+        'department': {'id': department.id, 'name': department.name},
+        'period': {'id': period.id, 'title': period.title},
+        'appraisals': appraisal_summary(appraisals),
+        'ratings': rating_summary(ratings),
+    }
+
+
+def cached_department_period_report(department, period):
+    """department_period_report, cached until the period's appraisals or ratings change"""
+    key = f'analytics:period:{period.id}:v{period_version(period.id)}:department:{department.id}'
+    report = _cache().get(key)
+    if report is None:
+        report = department_period_report(department, period)
+        _cache().set(key, report, settings.ANALYTICS_CACHE_TIMEOUT)
+    return report
@@ -0,0 +1,113 @@
+import hashlib
+
+from django.db.models import Q
+
+from .models import Appraisal, AppraisalPeriod, PerformanceRating, Task
+from .pagination import keyset_paginate
+
+MAX_PAGE_SIZE = 100
+
+
+def task_scope(user):
+    # Mirrors task_list: assignees see their own, leaders and managers what
+    # they assigned, and HR no tasks at all
+    if user.role == 'hr_admin':
+        return Q(pk__in=[])
+    if user.role == 'employee':
+        return Q(assigned_to=user)
+    if user.role == 'team_leader':
+        return Q(assigned_to=user) | Q(assigned_by=user)
+    return Q(assigned_by=user)
+
+
+def rating_scope(user):
+    if user.role == 'hr_admin':
+        return Q()
+    # Employees rate no one, so theirs is a single index seek
+    if user.role == 'employee':
+        return Q(employee=user)
+    return Q(employee=user) | Q(manager=user)
+
+
+def appraisal_scope(user):
+    # Mirrors view_appraisal: the employee, their appraising manager, or HR
+    if user.role == 'hr_admin':
+        return Q()
+    if user.role == 'employee':
+        return Q(employee=user)
+    return Q(employee=user) | Q(manager=user)
+
+
+def period_scope(user):
+    return Q()
+
+
+# resource -> (model, row filter for a user, readable fields; foreign keys read as ids)
+RESOURCES = {
+    'tasks': (Task, task_scope, [
+        'id', 'title', 'description', 'assigned_to', 'assigned_by', 'priority', 'status',
+        'due_date', 'completed_date', 'completion_report_name', 'created_at', 'updated_at',
+    ]),
+    'ratings': (PerformanceRating, rating_scope, [
+        'id', 'employee', 'manager', 'task', 'quality_rating', 'timeliness_rating',
+        'overall_rating', 'remarks', 'keywords', 'rating_date', 'updated_at',
+    ]),
+    'appraisals': (Appraisal, appraisal_scope, [
+        'id', 'employee', 'period', 'manager', 'overall_percentage', 'task_completion_score',
+        'quality_score', 'timeliness_score', 'status', 'final_remarks', 'hr_approved',
+        'hr_approved_by', 'created_at', 'updated_at',
+    ]),
+    'periods': (AppraisalPeriod, period_scope, [
+        'id', 'title', 'start_date', 'end_date', 'is_active', 'created_by', 'updated_at',
+    ]),
+}
+
+
+def select_fields(resource, requested):
+    """Validate a comma-separated ``fields`` parameter against the resource's whitelist.
+
+    Raises ValueError naming the first unknown field.
+    """
+    allowed = RESOURCES[resource][2]
+    if not requested:
+        return list(allowed)
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    for field in fields:
+        if field not in allowed:
+            raise ValueError(f"Unknown field '{field}'.")
+    return list(dict.fromkeys(fields))
+
+
+def scoped_queryset(resource, user):
+    model, scope, _ = RESOURCES[resource]
+    return model.objects.filter(scope(user))
+
+
+def values_page_query(queryset, fields):
+    """values() over the requested fields plus the keys keyset pagination needs"""
+    return queryset.values(*dict.fromkeys(fields + ['id', 'updated_at']))
+
+
+def page_etag(queryset, cursor, limit, *parts):
+    """ETag and Last-Modified of one API page from the keys of its rows.
+
+    Only (id, updated_at) of the page's rows are read, which the updated_at
+    indexes hold, so an unchanged poll costs one index range read of at
+    most ``limit + 1`` entries however large the collection is. An edit,
+    insertion or deletion that changes what the page shows changes one of
+    those keys; ``parts`` are the request parameters that shape the body.
+    """
+    page = keyset_paginate(queryset.values('id', 'updated_at'), cursor, per_page=limit, field='updated_at')
+    keys = [f"{row['id']}:{row['updated_at'].isoformat()}" for row in page]
+    raw = '|'.join(map(str, [*keys, page.next_cursor, *parts]))
+    last_modified = max((row['updated_at'] for row in page), default=None)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32], last_modified
+
+
+def row_etag(row, *parts):
+    raw = '|'.join(map(str, [row['id'], row['updated_at'], *parts]))
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def shape(row, fields):
+    return {field: row[field] for field in fields}
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AppraisalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appraisals'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from appraisal_system import db  # noqa: F401
@@ -0,0 +1,6 @@
+from django.core.handlers.asgi import ASGIRequest
+
+
+def live_notifications(request):
+    """Whether the page may open the notification stream, which needs the ASGI server"""
+    return {'notification_streaming': isinstance(request, ASGIRequest)}
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+
+from .models import Notification
+
+User = get_user_model()
+
+# Events buffered per connection before the oldest are dropped; a dropped
+# notification is still in the inbox and the next unread event carries the
+# absolute count, so a slow reader only loses the toast, never the badge
+QUEUE_SIZE = 50
+
+
+class Subscription:
+    """One waiting SSE stream or long poll: an asyncio queue on its own event loop"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def deliver(self, event):
+        """Hand an event over from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the loop has closed; unsubscribe is on its way
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        """The next event, or None after ``timeout`` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broker:
+    """In-process pub/sub of per-user events.
+
+    An idle subscriber costs one queue and one suspended coroutine, no thread
+    and no database connection. Publishing only reaches subscribers of this
+    process; clients of other workers catch up from the database when they
+    reconnect or their long poll times out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[subscription.user_id]
+
+    def listening(self, user_ids):
+        """The ids among ``user_ids`` with at least one subscriber"""
+        with self._lock:
+            return {user_id for user_id in user_ids if user_id in self._subscribers}
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(user_id, ()))
+        for subscription in subscriptions:
+            subscription.deliver(event)
+
+
+broker = Broker()
+
+
+def notification_event(notification):
+    return {
+        'event': 'notification',
+        'id': notification.pk,
+        'data': {
+            'id': notification.pk,
+            'type': notification.notification_type,
+            'title': notification.title,
+            'message': notification.message,
+            'appraisal_id': notification.appraisal_id,
+            'created_at': notification.created_at.isoformat(),
+        },
+    }
+
+
+def unread_event(count):
+    return {'event': 'unread', 'data': {'unread_count': count}}
+
+
+def format_sse(event):
+    lines = []
+    if 'id' in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['event']}")
+    lines.append(f"data: {json.dumps(event['data'], separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _publish(notifications=(), user_ids=()):
+    recipients = {notification.recipient_id for notification in notifications} | set(user_ids)
+    listening = broker.listening(recipients)
+    if not listening:
+        return
+    for notification in notifications:
+        if notification.recipient_id in listening:
+            broker.publish(notification.recipient_id, notification_event(notification))
+    # Counts are read back rather than computed so concurrent changes cannot drift them
+    for user_id, count in User.objects.filter(pk__in=listening).values_list('pk', 'unread_notification_count'):
+        broker.publish(user_id, unread_event(count))
+
+
+def publish_notifications(notifications):
+    """Push new notifications and their recipients' unread counts once the transaction commits"""
+    notifications = list(notifications)
+    transaction.on_commit(lambda: _publish(notifications=notifications))
+
+
+def publish_unread(user_ids):
+    """Push the unread counts of ``user_ids`` once the transaction commits"""
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: _publish(user_ids=user_ids))
+
+
+def notifications_after(user_id, last_id, limit=50):
+    """What a client holding notifications up to ``last_id`` has missed.
+
+    Returns (notifications oldest first, unread count, last id). Without a
+    ``last_id`` nothing counts as missed and the user's newest id is returned
+    for the next call.
+    """
+    notifications = Notification.objects.filter(recipient_id=user_id)
+    if last_id is None:
+        missed = []
+        last_id = notifications.order_by('-pk').values_list('pk', flat=True).first() or 0
+    else:
+        missed = list(notifications.filter(pk__gt=last_id).order_by('pk')[:limit])
+        if missed:
+            last_id = missed[-1].pk
+    count = User.objects.filter(pk=user_id).values_list('unread_notification_count', flat=True).first() or 0
+    return missed, count, last_id
+
+
+def release_connection():
+    """Close this thread's database connection before a long wait, unless a transaction needs it"""
+    if not connection.in_atomic_block:
+        connection.close()
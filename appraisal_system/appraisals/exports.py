@@ -0,0 +1,94 @@
+import csv
+
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+from .models import Appraisal, PerformanceRating, Task, completion_status_case
+from .scoring import rating_period_q, task_period_q
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def full_name(prefix):
+    return Concat(f'{prefix}__first_name', Value(' '), f'{prefix}__last_name')
+
+
+# dataset -> (model, period filter, [(header, field path or expression)])
+DATASETS = {
+    'appraisals': (Appraisal, lambda period: {'period': period}, [
+        ('appraisal_id', 'id'),
+        ('employee_username', 'employee__username'),
+        ('employee_id', 'employee__employee_id'),
+        ('employee_name', full_name('employee')),
+        ('department', 'employee__department__name'),
+        ('period', 'period__title'),
+        ('period_start', 'period__start_date'),
+        ('period_end', 'period__end_date'),
+        ('manager_name', full_name('manager')),
+        ('overall_percentage', 'overall_percentage'),
+        ('task_completion_score', 'task_completion_score'),
+        ('quality_score', 'quality_score'),
+        ('timeliness_score', 'timeliness_score'),
+        ('status', 'status'),
+        ('hr_approved', 'hr_approved'),
+        ('updated_at', 'updated_at'),
+    ]),
+    'ratings': (PerformanceRating, rating_period_q, [
+        ('rating_id', 'id'),
+        ('employee_username', 'employee__username'),
+        ('employee_name', full_name('employee')),
+        ('department', 'employee__department__name'),
+        ('manager_name', full_name('manager')),
+        ('task', 'task__title'),
+        ('quality_rating', 'quality_rating'),
+        ('timeliness_rating', 'timeliness_rating'),
+        ('overall_rating', 'overall_rating'),
+        ('keywords', 'keywords'),
+        ('rating_date', 'rating_date'),
+    ]),
+    'tasks': (Task, task_period_q, [
+        ('task_id', 'id'),
+        ('title', 'title'),
+        ('assignee_username', 'assigned_to__username'),
+        ('assignee_name', full_name('assigned_to')),
+        ('department', 'assigned_to__department__name'),
+        ('assigned_by_name', full_name('assigned_by')),
+        ('priority', 'priority'),
+        ('status', 'status'),
+        ('completion_status', completion_status_case()),
+        ('due_date', 'due_date'),
+        ('completed_date', 'completed_date'),
+        ('created_at', 'created_at'),
+    ]),
+}
+
+
+def export_queryset(dataset, period=None):
+    """values_list queryset of a dataset with every column resolved in SQL"""
+    model, period_filter, columns = DATASETS[dataset]
+    queryset = model.objects.all()
+    if period is not None:
+        condition = period_filter(period)
+        queryset = queryset.filter(**condition) if isinstance(condition, dict) else queryset.filter(condition)
+    expressions = {f'_{header}': source for header, source in columns if not isinstance(source, str)}
+    fields = [source if isinstance(source, str) else f'_{header}' for header, source in columns]
+    return queryset.annotate(**expressions).order_by('pk').values_list(*fields)
+
+
+def export_header(dataset):
+    return [header for header, _ in DATASETS[dataset][2]]
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, period=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield a dataset as CSV lines, holding at most one chunk of rows in memory"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(export_header(dataset))
+    for row in export_queryset(dataset, period).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.dashboard import invalidate as invalidate_dashboards
+
+from .analytics import invalidate_period
+from .models import Appraisal, AppraisalPeriod
+from .rollups import get_scores_bulk
+from .scoring import SCORE_FIELDS
+from .search import index as index_search
+
+User = get_user_model()
+
+APPRAISED_ROLES = ['employee', 'team_leader']
+REFRESHABLE_STATUSES = ['draft', 'submitted']
+ALL_DEPARTMENTS = object()
+
+
+def generate_for_department(period_id, department_id=ALL_DEPARTMENTS, chunk_size=500, refresh=False):
+    """Create the missing appraisals of one department (or everyone) for a period.
+
+    Employees are walked in primary key order and every chunk commits on its
+    own, so an interrupted run can simply be started again: appraisals that
+    already exist are skipped.
+    """
+    period = AppraisalPeriod.objects.get(pk=period_id)
+    employees = User.objects.filter(role__in=APPRAISED_ROLES, is_active=True).order_by('pk')
+    if department_id is None:
+        employees = employees.filter(department__isnull=True)
+    elif department_id is not ALL_DEPARTMENTS:
+        employees = employees.filter(department_id=department_id)
+
+    created = updated = skipped = 0
+    last_pk = 0
+    started = timezone.now()
+    while True:
+        chunk = list(employees.filter(pk__gt=last_pk).values_list('pk', 'manager_id')[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        managers = dict(chunk)
+
+        with transaction.atomic():
+            existing = {
+                appraisal.employee_id: appraisal
+                for appraisal in Appraisal.objects.select_for_update().filter(
+                    period_id=period_id, employee_id__in=managers,
+                )
+            }
+            missing = [pk for pk, manager_id in chunk if pk not in existing and manager_id]
+            skipped += sum(1 for pk, manager_id in chunk if pk not in existing and not manager_id)
+            stale = [
+                appraisal for appraisal in existing.values()
+                if refresh and appraisal.status in REFRESHABLE_STATUSES and not appraisal.hr_approved
+            ]
+
+            scores = get_scores_bulk(missing + [appraisal.employee_id for appraisal in stale], period)
+
+            new_appraisals = []
+            for pk in missing:
+                appraisal = Appraisal(
+                    employee_id=pk,
+                    period_id=period_id,
+                    manager_id=managers[pk],
+                    overall_percentage=0,
+                    final_remarks=Appraisal.AUTO_REMARKS,
+                    status='submitted',
+                )
+                scores[pk].apply(appraisal)
+                new_appraisals.append(appraisal)
+            # A concurrent run or create_appraisal may have inserted some of
+            # these since we looked; the unique constraint turns those into
+            # no-ops. Ignored conflicts leave no pks behind, so read them back.
+            Appraisal.objects.bulk_create(new_appraisals, ignore_conflicts=True)
+            new_ids = list(Appraisal.objects.filter(
+                period_id=period_id, employee_id__in=missing, created_at__gte=started,
+            ).values_list('pk', flat=True))
+            index_search('appraisal', new_ids)
+            created += len(new_ids)
+
+            if stale:
+                now = timezone.now()
+                for appraisal in stale:
+                    scores[appraisal.employee_id].apply(appraisal)
+                    appraisal.updated_at = now
+                Appraisal.objects.bulk_update(stale, SCORE_FIELDS + ['updated_at'])
+                updated += len(stale)
+
+        # bulk_create/bulk_update send no signals
+        if missing or stale:
+            invalidate_period(period_id)
+            invalidate_dashboards('hr', *(f'user:{pk}' for pk in missing),
+                                  *(f'user:{appraisal.employee_id}' for appraisal in stale))
+
+    return created, updated, skipped
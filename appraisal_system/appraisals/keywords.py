@@ -0,0 +1,102 @@
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Keyword, PerformanceRating, RatingKeyword
+from .scoring import rating_period_q
+
+BATCH_SIZE = 1000
+MAX_LENGTH = Keyword._meta.get_field('name').max_length
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_keywords(text):
+    """The distinct keywords of a comma-separated string, lower-cased and single-spaced, in order"""
+    names = []
+    for part in (text or '').split(','):
+        name = _SPACES.sub(' ', part).strip().lower()[:MAX_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def keyword_ids(names):
+    """Map each name to its Keyword id, inserting the ones not seen before"""
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(Keyword.objects.filter(name__in=names).values_list('name', 'pk'))
+    missing = names - ids.keys()
+    if missing:
+        # A concurrent save may insert the same name; the unique index settles it
+        Keyword.objects.bulk_create([Keyword(name=name) for name in missing], ignore_conflicts=True)
+        ids.update(Keyword.objects.filter(name__in=missing).values_list('name', 'pk'))
+    return ids
+
+
+def index_ratings(ratings):
+    """Replace the keyword links of ``ratings`` with ones parsed from their keywords field"""
+    parsed = {rating.pk: (rating, normalize_keywords(rating.keywords)) for rating in ratings}
+    if not parsed:
+        return 0
+    ids = keyword_ids(name for _, names in parsed.values() for name in names)
+    links = [
+        RatingKeyword(rating_id=rating.pk, keyword_id=ids[name], employee_id=rating.employee_id,
+                      rating_date=rating.rating_date)
+        for rating, names in parsed.values() for name in names
+    ]
+    with transaction.atomic():
+        RatingKeyword.objects.filter(rating_id__in=parsed).delete()
+        RatingKeyword.objects.bulk_create(links, batch_size=BATCH_SIZE)
+    return len(links)
+
+
+def backfill(ratings=None, batch_size=BATCH_SIZE):
+    """Index every rating (or those of a queryset) in primary-key batches.
+
+    Returns (ratings, links) written.
+    """
+    ratings = (PerformanceRating.objects.all() if ratings is None else ratings).order_by('pk')
+    ratings = ratings.only('pk', 'employee_id', 'rating_date', 'keywords')
+    rated = linked = 0
+    last = 0
+    while True:
+        batch = list(ratings.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return rated, linked
+        linked += index_ratings(batch)
+        rated += len(batch)
+        last = batch[-1].pk
+
+
+def prune_keywords():
+    """Delete keywords no rating uses any more; returns how many"""
+    return Keyword.objects.filter(rating_links__isnull=True).delete()[0]
+
+
+def employees_with_keyword(keyword, period=None):
+    """Employees tagged with ``keyword`` (during ``period``), most often tagged first.
+
+    Rows are dicts of employee id, username and name plus the number of
+    ratings that used the keyword, read from keyword_date_employee_idx.
+    """
+    names = normalize_keywords(keyword)
+    if not names:
+        return RatingKeyword.objects.none().values()
+    return (RatingKeyword.objects.filter(rating_period_q(period), keyword__name=names[0])
+            .values('employee', 'employee__username', 'employee__first_name', 'employee__last_name')
+            .annotate(ratings=Count('pk'))
+            .order_by('-ratings', 'employee'))
+
+
+def top_keywords(department, period=None, limit=10):
+    """The ``limit`` keywords used most on ratings of a department's employees (during ``period``).
+
+    Rows are dicts of keyword name, ratings and distinct employees, read
+    through keyword_employee_date_idx for each employee of the department.
+    """
+    return (RatingKeyword.objects.filter(rating_period_q(period), employee__department=department)
+            .values('keyword__name')
+            .annotate(ratings=Count('pk'), employees=Count('employee', distinct=True))
+            .order_by('-ratings', 'keyword__name')[:limit])
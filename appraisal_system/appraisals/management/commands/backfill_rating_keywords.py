@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from appraisals.keywords import BATCH_SIZE, backfill, prune_keywords
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the normalized keyword index from PerformanceRating.keywords; safe to re-run, "
+            "saves keep it in sync afterwards")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Ratings indexed per transaction')
+
+    def handle(self, *args, **options):
+        rated, linked = backfill(batch_size=options['batch_size'])
+        pruned = prune_keywords()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {linked} keywords on {rated} ratings; removed {pruned} unused keywords."
+        ))
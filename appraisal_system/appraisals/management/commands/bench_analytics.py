@@ -0,0 +1,79 @@
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Department
+from appraisals.analytics import ANALYTICS_CACHE, cached_department_period_report, department_period_report
+from appraisals.models import Appraisal, AppraisalPeriod, PerformanceRating
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark the department analytics report, cold and cached (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['employees'], options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, size, repeat):
+        suffix = time.monotonic_ns()
+        department = Department.objects.create(name=f"Bench {suffix}")
+        manager = User.objects.create(username=f"bench_mgr_{suffix}", role='manager', department=department)
+        period = AppraisalPeriod.objects.create(title=f"Bench {suffix}", start_date=date.today() - timedelta(days=30),
+                                                end_date=date.today() + timedelta(days=30), created_by=manager)
+        User.objects.bulk_create([
+            User(username=f"bench_{suffix}_{i}", role='employee', department=department, manager=manager)
+            for i in range(size)
+        ], batch_size=1000)
+        employee_ids = list(User.objects.filter(department=department, role='employee').values_list('pk', flat=True))
+        Appraisal.objects.bulk_create([
+            Appraisal(employee_id=pk, period=period, manager=manager, overall_percentage=(i * 37) % 101,
+                      task_completion_score=i % 101, quality_score=(i * 7) % 101,
+                      timeliness_score=(i * 13) % 101, final_remarks="benchmark", status='submitted')
+            for i, pk in enumerate(employee_ids)
+        ], batch_size=1000)
+        qualities = [value for value, _ in PerformanceRating.RATING_CHOICES]
+        timeliness = [value for value, _ in PerformanceRating.TIMELINESS_CHOICES]
+        PerformanceRating.objects.bulk_create([
+            PerformanceRating(employee_id=pk, manager=manager, quality_rating=qualities[i % len(qualities)],
+                              timeliness_rating=timeliness[i % len(timeliness)], overall_rating=i % 101,
+                              remarks="benchmark", keywords="benchmark")
+            for i, pk in enumerate(employee_ids)
+        ], batch_size=1000)
+
+        cold = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                department_period_report(department, period)
+                cold.append((time.perf_counter() - start) * 1000)
+        queries = len(ctx.captured_queries)
+
+        caches[ANALYTICS_CACHE].clear()
+        cached_department_period_report(department, period)
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cached_department_period_report(department, period)
+            warm.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(f"{size} employees: cold {min(cold):.1f} ms ({queries} queries), "
+                          f"cached {min(warm):.2f} ms")
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from appraisals.models import Notification, Task
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Measure committed writes/sec with concurrent workers under the active APPRAISAL_DB_PROFILE "
+            "(bench rows are deleted afterwards)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--writes', type=int, default=100, help='Write transactions per worker')
+
+    def handle(self, *args, **options):
+        workers, writes = options['workers'], options['writes']
+        suffix = time.monotonic_ns()
+        leader = User.objects.create(username=f'bench_lead_{suffix}', role='team_leader')
+        employees = [User.objects.create(username=f'bench_emp_{suffix}_{i}', role='employee', manager=leader)
+                     for i in range(workers)]
+        tasks = [Task.objects.create(title='Bench', description='benchmark', assigned_to=employee,
+                                     assigned_by=leader, due_date=timezone.now())
+                 for employee in employees]
+
+        committed, locked = [0] * workers, [0] * workers
+        start_line = threading.Barrier(workers + 1)
+
+        def worker(index):
+            try:
+                start_line.wait()
+                for n in range(writes):
+                    # One small HR-style transaction: touch a row and append one
+                    try:
+                        with transaction.atomic():
+                            Task.objects.filter(pk=tasks[index].pk).update(
+                                priority=Task.PRIORITY_CHOICES[n % 4][0], updated_at=timezone.now())
+                            Notification.objects.bulk_create([Notification(
+                                recipient=employees[index], notification_type='appraisal_created',
+                                title='Bench', message='benchmark')])
+                        committed[index] += 1
+                    except OperationalError:
+                        locked[index] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        start_line.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        try:
+            self.stdout.write(
+                f"profile={settings.APPRAISAL_DB_PROFILE} workers={workers} "
+                f"committed={sum(committed)} locked={sum(locked)} "
+                f"elapsed={elapsed:.2f}s writes/sec={sum(committed) / elapsed:.0f}"
+            )
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in employees]).delete()
+            leader.delete()
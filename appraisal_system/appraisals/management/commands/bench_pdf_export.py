@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appraisals.models import AppraisalPeriod
+from appraisals.pdf import period_pdf_rows, pdf_filename, render_many, stream_zip
+
+
+def synthetic_rows(count):
+    for i in range(count):
+        yield {
+            'id': i,
+            'employee': f"Employee {i}",
+            'manager': f"Manager {i % 50}",
+            'period': "Benchmark",
+            'overall_percentage': i % 101,
+            'task_completion_score': (i * 7) % 101,
+            'quality_score': (i * 3) % 101,
+            'timeliness_score': (i * 5) % 101,
+            'status': "Submitted",
+            'final_remarks': "Consistent delivery.\nKeeps the team unblocked.",
+        }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the streaming period PDF export (pages/sec at several worker counts)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, help='Export a real period instead of synthetic rows')
+        parser.add_argument('--count', type=int, default=500, help='Synthetic appraisals to render')
+        parser.add_argument('--workers', default='0,2,4',
+                            help='Comma-separated worker counts (0 renders in-process)')
+
+    def handle(self, *args, **options):
+        period = None
+        if options['period'] is not None:
+            try:
+                period = AppraisalPeriod.objects.get(pk=options['period'])
+            except AppraisalPeriod.DoesNotExist:
+                raise CommandError(f"Appraisal period {options['period']} does not exist.")
+
+        self.stdout.write(f"{'workers':>8} {'pages':>8} {'seconds':>10} {'pages/sec':>10} {'zip MB':>8}")
+        for workers in [int(w) for w in options['workers'].split(',')]:
+            rows = period_pdf_rows(period) if period else synthetic_rows(options['count'])
+            counter = {'pages': 0}
+            start = time.perf_counter()
+            size = sum(len(chunk) for chunk in stream_zip(self._named(render_many(rows, workers), counter)))
+            elapsed = time.perf_counter() - start
+            pages = counter['pages']
+            self.stdout.write(f"{workers:>8} {pages:>8} {elapsed:>10.2f} "
+                              f"{pages / elapsed if elapsed else 0:>10.1f} {size / 1e6:>8.2f}")
+
+    def _named(self, rendered, counter):
+        for data, pdf in rendered:
+            counter['pages'] += 1
+            yield pdf_filename(data), pdf
@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from appraisals.models import PerformanceRating, Task
+from appraisals.scoring import QUALITY_POINTS, TIMELINESS_POINTS, compute_scores
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark compute_scores() at several rating volumes per employee (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000,100000',
+                            help='Comma-separated number of ratings per employee')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per size; the best run is reported')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f"{'ratings':>10} {'queries':>8} {'best ms':>10} {'mean ms':>10}")
+        for size in sizes:
+            try:
+                with transaction.atomic():
+                    self.stdout.write(self._run(size, options['repeat']))
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, size, repeat):
+        suffix = f"{size}_{time.monotonic_ns()}"
+        manager = User.objects.create(username=f"bench_mgr_{suffix}", role='team_leader')
+        employee = User.objects.create(username=f"bench_emp_{suffix}", role='employee', manager=manager)
+
+        now = timezone.now()
+        task_count = max(size // 10, 1)
+        Task.objects.bulk_create([
+            Task(title=f"Task {i}", description="benchmark", assigned_to=employee, assigned_by=manager,
+                 due_date=now, status='completed' if i % 3 else 'assigned')
+            for i in range(task_count)
+        ], batch_size=1000)
+
+        qualities = list(QUALITY_POINTS)
+        timeliness = list(TIMELINESS_POINTS)
+        PerformanceRating.objects.bulk_create([
+            PerformanceRating(employee=employee, manager=manager,
+                              quality_rating=qualities[i % len(qualities)],
+                              timeliness_rating=timeliness[i % len(timeliness)],
+                              overall_rating=i % 101, remarks="benchmark", keywords="benchmark")
+            for i in range(size)
+        ], batch_size=1000)
+
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                compute_scores(employee)
+                timings.append((time.perf_counter() - start) * 1000)
+        return f"{size:>10} {len(ctx.captured_queries):>8} {min(timings):>10.2f} {sum(timings) / len(timings):>10.2f}"
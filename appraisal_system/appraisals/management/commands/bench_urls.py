@@ -0,0 +1,196 @@
+import gc
+import json
+import logging
+import math
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import NoReverseMatch, reverse
+
+from accounts.dashboard import DASHBOARD_CACHE
+from accounts.models import Department
+from appraisals.analytics import ANALYTICS_CACHE
+from appraisals.api import scoped_queryset
+from appraisals.models import Appraisal, AppraisalPeriod, Notification, Task
+
+User = get_user_model()
+
+ROLES = ['employee', 'team_leader', 'manager', 'hr_admin']
+URLCONFS = ['appraisals.urls', 'accounts.urls']
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def summarize(timings, queries, **extra):
+    ordered = sorted(timings)
+    return {'p50_ms': round(percentile(ordered, 0.5), 2), 'p95_ms': round(percentile(ordered, 0.95), 2),
+            'queries': queries, **extra}
+
+
+def sample_user(role):
+    """The active user of a role with the most tasks, so pages have something to show"""
+    return (User.objects.filter(role=role, is_active=True)
+            .annotate(activity=Count('assigned_tasks') + Count('created_tasks', distinct=True))
+            .order_by('-activity', 'pk').first())
+
+
+def url_arguments(user, period):
+    """A value for every URL parameter name, chosen among the rows the user may see"""
+    return {
+        'task_id': (Task.objects.filter(assigned_to=user).order_by('-pk').values_list('pk', flat=True).first()
+                    or scoped_queryset('tasks', user).order_by('-pk').values_list('pk', flat=True).first()),
+        'pk': scoped_queryset('tasks', user).order_by('-pk').values_list('pk', flat=True).first(),
+        'resource': 'tasks',
+        'dataset': 'tasks',
+        'employee_id': (user.get_subordinates().values_list('pk', flat=True).first()
+                        or User.objects.filter(role='employee').values_list('pk', flat=True).first()),
+        'appraisal_id': scoped_queryset('appraisals', user).order_by('-pk').values_list('pk', flat=True).first(),
+        'period_id': period.pk if period else None,
+        'department_id': user.department_id or Department.objects.values_list('pk', flat=True).first(),
+        'notification_id': Notification.objects.filter(recipient=user).values_list('pk', flat=True).first(),
+    }
+
+
+def routes():
+    for urlconf in URLCONFS:
+        for pattern in import_module(urlconf).urlpatterns:
+            if pattern.name:
+                yield pattern.name, list(pattern.pattern.converters)
+
+
+class Command(BaseCommand):
+    help = ("Time every route of appraisals.urls and accounts.urls as each role, plus calculate_scores, "
+            "and write p50/p95 latency and query counts to a JSON baseline (or compare against one)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help='Timed requests per route and role')
+        parser.add_argument('--output', default='bench_baseline.json')
+        parser.add_argument('--compare', help='Baseline to compare against; exits non-zero on a regression')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 slowdown before a route counts as regressed')
+        parser.add_argument('--skip',
+                            default='logout,create_appraisal,export_period_pdfs,notification_poll,notification_stream',
+                            help='Comma-separated route names to leave out (create_appraisal inserts on GET, so '
+                                 'runs would not time the same work; the period PDF export is slow; the '
+                                 'notification long poll and stream wait for events)')
+        parser.add_argument('--cold', action='store_true', help='Clear the caches before every request')
+
+    def handle(self, *args, **options):
+        period = AppraisalPeriod.objects.order_by('-end_date', '-pk').first()
+        skip = {name for name in options['skip'].split(',') if name}
+        # Expected 403/404s for roles a page is not meant for would flood the output
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        results = {}
+        for role in ROLES:
+            user = sample_user(role)
+            if user is None:
+                self.stderr.write(f"No {role} users; seed some with manage.py seed_org")
+                continue
+            client = Client()
+            client.force_login(user)
+            arguments = url_arguments(user, period)
+            for name, params in routes():
+                if name in skip:
+                    continue
+                try:
+                    url = reverse(name, kwargs={param: arguments[param] for param in params})
+                except (KeyError, NoReverseMatch):
+                    continue  # nothing this role could request, e.g. an upload id
+                measured = self.measure(client, url, options)
+                if measured is not None:
+                    results[f'{role} {name}'] = measured
+                    self.stdout.write(f"{role:<12} {name:<28} {measured['status']:>4} "
+                                      f"p50 {measured['p50_ms']:>8.2f} ms  p95 {measured['p95_ms']:>8.2f} ms  "
+                                      f"{measured['queries']:>3} queries")
+        if period:
+            results['calculate_scores'] = self.measure_scores(period, options['repeat'])
+            self.stdout.write(f"{'calculate_scores':<41} p50 {results['calculate_scores']['p50_ms']:>8.2f} ms  "
+                              f"p95 {results['calculate_scores']['p95_ms']:>8.2f} ms  "
+                              f"{results['calculate_scores']['queries']:>3} queries")
+
+        report = {
+            'meta': {
+                'db_profile': settings.APPRAISAL_DB_PROFILE,
+                'users': User.objects.count(),
+                'repeat': options['repeat'],
+                'cold': options['cold'],
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} measurements to {options['output']}"))
+
+        if options['compare']:
+            self.compare(results, options['compare'], options['tolerance'])
+
+    def measure(self, client, url, options):
+        """Warm up once, then time ``repeat`` GETs; None when the route does not answer GET"""
+        response = client.get(url)
+        if response.status_code == 405:
+            return None
+        timings = []
+        # As timeit does, keep collector pauses out of the timings; a collection
+        # that is due runs during the next route's untimed warm-up instead
+        gc.disable()
+        try:
+            for _ in range(options['repeat']):
+                if options['cold']:
+                    caches[ANALYTICS_CACHE].clear()
+                    caches[DASHBOARD_CACHE].clear()
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    if response.streaming:
+                        for _ in response.streaming_content:
+                            pass
+                    timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            gc.enable()
+        return summarize(timings, len(ctx.captured_queries), status=response.status_code)
+
+    def measure_scores(self, period, repeat):
+        appraisals = list(Appraisal.objects.filter(period=period).select_related('employee', 'period')[:repeat])
+        timings = []
+        for appraisal in appraisals:
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                appraisal.calculate_scores(commit=False)
+                timings.append((time.perf_counter() - start) * 1000)
+        return summarize(timings or [0], len(ctx.captured_queries) if appraisals else 0)
+
+    def compare(self, results, path, tolerance):
+        try:
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)['results']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Cannot read baseline {path}: {exc}")
+
+        regressions = []
+        for key, current in sorted(results.items()):
+            before = baseline.get(key)
+            if before is None:
+                continue
+            # Sub-millisecond differences are timer noise, not regressions
+            slower = current['p95_ms'] > before['p95_ms'] * (1 + tolerance) and current['p95_ms'] - before['p95_ms'] > 1
+            if slower or current['queries'] > before['queries']:
+                regressions.append(
+                    f"{key}: p95 {before['p95_ms']} -> {current['p95_ms']} ms, "
+                    f"queries {before['queries']} -> {current['queries']}"
+                )
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(line))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regressions against {path}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {path}."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from appraisals.reports import dedupe_reports
+
+
+class Command(BaseCommand):
+    help = "Move completion reports saved before content addressing into shared blob storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--delete-originals', action='store_true',
+                            help='Also delete files under task_reports/ that no task refers to any more')
+
+    def handle(self, *args, **options):
+        moved, deleted = dedupe_reports(delete_originals=options['delete_originals'])
+        self.stdout.write(self.style.SUCCESS(f"Moved {moved} reports into blob storage, deleted {deleted} originals."))
@@ -0,0 +1,40 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appraisals.exports import DATASETS, DEFAULT_CHUNK_SIZE, stream_csv
+from appraisals.models import AppraisalPeriod
+
+
+class Command(BaseCommand):
+    help = "Stream appraisals, ratings or tasks as CSV in constant memory and report rows/sec"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--period', type=int, help='Only rows belonging to this AppraisalPeriod id')
+        parser.add_argument('--output', help='File to write (default: stdout; /dev/null to benchmark)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        period = None
+        if options['period'] is not None:
+            try:
+                period = AppraisalPeriod.objects.get(pk=options['period'])
+            except AppraisalPeriod.DoesNotExist:
+                raise CommandError(f"Appraisal period {options['period']} does not exist.")
+
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        rows = -1  # the header is not a row
+        start = time.perf_counter()
+        try:
+            for line in stream_csv(options['dataset'], period, options['chunk_size']):
+                output.write(line)
+                rows += 1
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = time.perf_counter() - start
+
+        self.stderr.write(f"Exported {rows} {options['dataset']} rows in {elapsed:.2f}s "
+                          f"({rows / elapsed if elapsed else 0:.0f} rows/sec)")
@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from accounts.models import Department
+from appraisals.generation import generate_for_department
+from appraisals.models import AppraisalPeriod
+
+
+def _init_worker():
+    django.setup()
+    # Never reuse a connection inherited from the parent process
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Create every missing appraisal of an appraisal period in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, required=True, help='AppraisalPeriod id')
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Shard by department across this many processes (0 runs in-process)')
+        parser.add_argument('--refresh', action='store_true',
+                            help='Also recalculate scores of existing draft/submitted appraisals')
+
+    def handle(self, *args, **options):
+        try:
+            period = AppraisalPeriod.objects.get(pk=options['period'])
+        except AppraisalPeriod.DoesNotExist:
+            raise CommandError(f"Appraisal period {options['period']} does not exist.")
+
+        start = time.perf_counter()
+        if options['workers'] > 0:
+            created, updated, skipped = self._run_sharded(period, options)
+        else:
+            created, updated, skipped = generate_for_department(
+                period.pk, chunk_size=options['chunk_size'], refresh=options['refresh'],
+            )
+        elapsed = time.perf_counter() - start
+
+        rate = (created + updated) / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{period.title}: created {created}, refreshed {updated}, "
+            f"skipped {skipped} without a manager in {elapsed:.2f}s ({rate:.1f} appraisals/sec)"
+        ))
+
+    def _run_sharded(self, period, options):
+        departments = list(Department.objects.values_list('pk', flat=True)) + [None]
+        totals = [0, 0, 0]
+        # Children must open their own connections rather than share ours
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(generate_for_department, period.pk, department_id,
+                            options['chunk_size'], options['refresh']): department_id
+                for department_id in departments
+            }
+            for future in as_completed(futures):
+                counts = future.result()
+                totals = [total + count for total, count in zip(totals, counts)]
+                self.stdout.write(f"department {futures[future] or '-'}: created {counts[0]}, "
+                                  f"refreshed {counts[1]}, skipped {counts[2]}")
+        return totals
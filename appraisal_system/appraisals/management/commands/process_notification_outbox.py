@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from appraisals.utils import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Materialize queued outbox notifications in batches (run as a long-lived worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Outbox events per transaction')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            events, notifications = process_outbox(options['batch_size'])
+            if events:
+                self.stdout.write(f"Delivered {notifications} notifications from {events} events")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
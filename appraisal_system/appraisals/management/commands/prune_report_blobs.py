@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from appraisals.reports import prune_blobs
+
+
+class Command(BaseCommand):
+    help = "Delete completion-report blobs no task refers to and chunked uploads that were abandoned"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Keep unreferenced blobs younger than this, as a submission may still claim them')
+
+    def handle(self, *args, **options):
+        removed, uploads = prune_blobs(grace=timedelta(minutes=options['grace_minutes']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} blobs and {uploads} expired uploads."))
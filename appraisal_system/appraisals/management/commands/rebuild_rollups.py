@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from appraisals.models import AppraisalPeriod
+from appraisals.rollups import rebuild_period
+
+
+class Command(BaseCommand):
+    help = "Verify EmployeeScoreRollup rows against ratings and tasks and repair any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, help='Only this AppraisalPeriod id (default: all)')
+        parser.add_argument('--check', action='store_true',
+                            help='Report drift without repairing it; exits non-zero if any is found')
+
+    def handle(self, *args, **options):
+        periods = AppraisalPeriod.objects.order_by('pk')
+        if options['period']:
+            periods = periods.filter(pk=options['period'])
+            if not periods.exists():
+                raise CommandError(f"Appraisal period {options['period']} does not exist.")
+
+        total = 0
+        for period in periods:
+            drifted = rebuild_period(period, repair=not options['check'])
+            total += len(drifted)
+            if drifted:
+                action = 'found' if options['check'] else 'repaired'
+                self.stdout.write(f"{period.title}: {action} drift for {len(drifted)} employees")
+            else:
+                self.stdout.write(f"{period.title}: in sync")
+
+        if options['check'] and total:
+            raise CommandError(f"{total} rollups out of sync.")
+        self.stdout.write(self.style.SUCCESS(f"Done, {total} rollups {'out of sync' if options['check'] else 'repaired'}."))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from appraisals.search import rebuild, search_available
+
+
+class Command(BaseCommand):
+    help = ("Refill the FTS5 search index over task descriptions, rating remarks, appraisal remarks and "
+            "negotiation texts; saves keep it current, this repairs it after bulk writes")
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError("The search index needs SQLite with FTS5; run migrate first.")
+        start = time.perf_counter()
+        with transaction.atomic():
+            counts = rebuild()
+        summary = ', '.join(f'{count} {kind}s' for kind, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {summary} in {time.perf_counter() - start:.1f}s."
+        ))
@@ -0,0 +1,41 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from appraisals.seeding import OrgSeeder
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Bulk-generate a synthetic org (departments, managers, team leaders, employees and HR) "
+            "with tasks, ratings, appraisals, negotiation tickets and notifications")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--departments', type=int, default=4)
+        parser.add_argument('--managers', type=int, default=2, help='Managers per department, head included')
+        parser.add_argument('--leaders', type=int, default=3, help='Team leaders per manager')
+        parser.add_argument('--employees', type=int, default=6, help='Employees per team leader')
+        parser.add_argument('--tasks', type=int, default=8, help='Tasks per user with a manager')
+        parser.add_argument('--periods', type=int, default=2, help='Consecutive appraisal periods, the last one current')
+        parser.add_argument('--hr', type=int, default=2, help='HR admins')
+        parser.add_argument('--prefix', default='seed', help='Username prefix; must not be in use yet')
+        parser.add_argument('--password', default='password', help='Password of every seeded user')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for a reproducible org')
+
+    def handle(self, *args, **options):
+        if options['managers'] < 1 or options['periods'] < 1:
+            raise CommandError('--managers and --periods must be at least 1.')
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users with prefix '{options['prefix']}_' already exist; pick another --prefix.")
+
+        start = time.perf_counter()
+        counts = OrgSeeder(
+            departments=options['departments'], managers=options['managers'], leaders=options['leaders'],
+            employees=options['employees'], tasks=options['tasks'], periods=options['periods'],
+            hr=options['hr'], prefix=options['prefix'], password=options['password'], seed=options['seed'],
+        ).run()
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f'{count} {name}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.dashboard import invalidate as invalidate_dashboards
+from appraisals.models import Task, TaskQuerySet
+
+
+class Command(BaseCommand):
+    help = "Mark open tasks past their due date as overdue with a single UPDATE; run it periodically"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would be flagged')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        due = Task.objects.filter(status__in=TaskQuerySet.OPEN_STATUSES, due_date__lt=now)
+        if options['dry_run']:
+            self.stdout.write(f"{due.count()} tasks would be marked overdue.")
+            return
+
+        assignees = set(due.values_list('assigned_to_id', flat=True).distinct())
+        swept = Task.objects.sweep_overdue(now)
+        # update() sends no post_save, so the assignees' dashboard panels are invalidated here
+        invalidate_dashboards(*(f'user:{user_id}' for user_id in assignees))
+        self.stdout.write(self.style.SUCCESS(f"Marked {swept} tasks overdue."))
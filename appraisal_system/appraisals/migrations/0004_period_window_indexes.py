@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0003_alter_appraisal_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='performancerating',
+            index=models.Index(fields=['employee', 'rating_date', 'overall_rating', 'quality_rating', 'timeliness_rating'], name='rating_employee_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'due_date', 'status'], name='task_assignee_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'completed_date', 'status'], name='task_assignee_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0004_period_window_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeScoreRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('overall_sum', models.FloatField(default=0)),
+                ('quality_points_sum', models.PositiveIntegerField(default=0)),
+                ('timeliness_points_sum', models.PositiveIntegerField(default=0)),
+                ('task_count', models.PositiveIntegerField(default=0)),
+                ('completed_task_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_rollups', to=settings.AUTH_USER_MODEL)),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_rollups', to='appraisals.appraisalperiod')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'period'), name='unique_rollup_per_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0005_employeescorerollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(fields=['status', 'hr_approved'], name='appraisal_status_hr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='negotiationticket',
+            index=models.Index(fields=['status'], name='ticket_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_by', '-created_at'], name='task_assigner_created_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0006_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appraisal',
+            name='appraisal_status_hr_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='negotiationticket',
+            name='ticket_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_assignee_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_assigner_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(condition=models.Q(('hr_approved', False), ('status', 'submitted')), fields=['-created_at', '-id'], name='appraisal_pending_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(condition=models.Q(('hr_approved', True), ('status', 'accepted')), fields=['-created_at', '-id'], name='appraisal_completed_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='negotiationticket',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_by', '-created_at', '-id'], name='task_assigner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', '-created_at', '-id'], name='task_assignee_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status', '-created_at', '-id'], name='task_assignee_status_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_by', 'status', '-created_at', '-id'], name='task_assigner_status_feed_idx'),
+        ),
+    ]
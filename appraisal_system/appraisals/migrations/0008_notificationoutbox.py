@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('appraisal_created', 'Appraisal Created'), ('appraisal_submitted', 'Appraisal Submitted'), ('appraisal_approved', 'Appraisal Approved'), ('appraisal_rejected', 'Appraisal Rejected'), ('negotiation_requested', 'Negotiation Requested'), ('negotiation_resolved', 'Negotiation Resolved')], max_length=25)),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('recipient_ids', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('appraisal', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='appraisals.appraisal')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:19
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    Notification = apps.get_model('appraisals', 'Notification')
+    unread = (Notification.objects.filter(recipient=OuterRef('pk'), is_read=False)
+              .order_by().values('recipient').annotate(n=Count('pk')).values('n'))
+    CustomUser.objects.update(
+        unread_notification_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_customuser_unread_notification_count'),
+        ('appraisals', '0008_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
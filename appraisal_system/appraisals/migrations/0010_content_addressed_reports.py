@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:35
+
+import appraisals.storage
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remember_report_names(apps, schema_editor):
+    Task = apps.get_model('appraisals', 'Task')
+    tasks = list(Task.objects.exclude(completion_report='').exclude(completion_report__isnull=True))
+    for task in tasks:
+        task.completion_report_name = task.completion_report.name.rsplit('/', 1)[-1]
+    Task.objects.bulk_update(tasks, ['completion_report_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0009_backfill_unread_notification_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completion_report_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='completion_report',
+            field=models.FileField(blank=True, null=True, storage=appraisals.storage.report_storage, upload_to='task_reports/'),
+        ),
+        migrations.CreateModel(
+            name='ReportUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(remember_report_names, migrations.RunPython.noop),
+    ]
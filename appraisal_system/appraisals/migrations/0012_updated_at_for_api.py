@@ -0,0 +1,31 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_rating_updated_at(apps, schema_editor):
+    # A rating is never edited in place, so it was last changed when it was given
+    PerformanceRating = apps.get_model('appraisals', 'PerformanceRating')
+    PerformanceRating.objects.update(updated_at=models.F('rating_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0011_task_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appraisalperiod',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='performancerating',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_rating_updated_at, migrations.RunPython.noop),
+    ]
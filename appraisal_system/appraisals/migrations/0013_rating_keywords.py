@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0012_updated_at_for_api'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RatingKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating_date', models.DateTimeField()),
+                ('employee', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rating_keywords', to=settings.AUTH_USER_MODEL)),
+                ('keyword', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rating_links', to='appraisals.keyword')),
+                ('rating', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='keyword_links', to='appraisals.performancerating')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='performancerating',
+            name='keyword_tags',
+            field=models.ManyToManyField(blank=True, related_name='ratings', through='appraisals.RatingKeyword', to='appraisals.keyword'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingkeyword',
+            index=models.Index(fields=['keyword', 'rating_date', 'employee'], name='keyword_date_employee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingkeyword',
+            index=models.Index(fields=['employee', 'rating_date', 'keyword'], name='keyword_employee_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='ratingkeyword',
+            constraint=models.UniqueConstraint(fields=('rating', 'keyword'), name='unique_keyword_per_rating'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:40
+
+from django.db import OperationalError, migrations
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS appraisals_search USING fts5("
+    "title, body, tags, link_id UNINDEXED, tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+
+FILL_SQL = [
+    """INSERT INTO appraisals_search (rowid, title, body, tags, link_id)
+       SELECT t.id * 8 + 1, t.title, t.description,
+              'k1 u' || t.assigned_to_id || ' u' || t.assigned_by_id, NULL
+       FROM appraisals_task t""",
+    """INSERT INTO appraisals_search (rowid, title, body, tags, link_id)
+       SELECT r.id * 8 + 2, '', r.remarks,
+              'k2 u' || r.employee_id || ' u' || r.manager_id, NULL
+       FROM appraisals_performancerating r""",
+    """INSERT INTO appraisals_search (rowid, title, body, tags, link_id)
+       SELECT a.id * 8 + 3, '', a.final_remarks,
+              'k3 u' || a.employee_id || ' u' || a.manager_id, a.id
+       FROM appraisals_appraisal a""",
+    """INSERT INTO appraisals_search (rowid, title, body, tags, link_id)
+       SELECT n.id * 8 + 4, '', n.employee_reason || char(10) || n.manager_response || char(10) || n.hr_decision,
+              'k4 u' || a.employee_id || ' u' || a.manager_id || ifnull(' u' || n.negotiated_by_id, ''), a.id
+       FROM appraisals_negotiationticket n JOIN appraisals_appraisal a ON a.id = n.appraisal_id""",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other databases keep the icontains admin search
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            return  # SQLite built without FTS5
+        for sql in FILL_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS appraisals_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0013_rating_keywords'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0014_fts5_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='appraisal',
+            constraint=models.UniqueConstraint(fields=('employee', 'period'), name='appraisal_employee_period_uniq'),
+        ),
+    ]
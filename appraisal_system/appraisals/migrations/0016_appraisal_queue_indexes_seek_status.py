@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0015_appraisal_employee_period_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appraisal',
+            name='appraisal_pending_feed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='appraisal',
+            name='appraisal_completed_feed_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(condition=models.Q(('hr_approved', False), ('status', 'submitted')), fields=['status', '-created_at', '-id'], name='appraisal_pending_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(condition=models.Q(('hr_approved', True), ('status', 'accepted')), fields=['status', '-created_at', '-id'], name='appraisal_completed_feed_idx'),
+        ),
+    ]
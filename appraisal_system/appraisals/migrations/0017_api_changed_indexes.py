@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appraisals', '0016_appraisal_queue_indexes_seek_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(fields=['-updated_at', '-id'], name='appraisal_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(fields=['employee', '-updated_at', '-id'], name='appraisal_employee_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appraisal',
+            index=models.Index(fields=['manager', '-updated_at', '-id'], name='appraisal_manager_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appraisalperiod',
+            index=models.Index(fields=['-updated_at', '-id'], name='period_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancerating',
+            index=models.Index(fields=['-updated_at', '-id'], name='rating_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancerating',
+            index=models.Index(fields=['employee', '-updated_at', '-id'], name='rating_employee_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='performancerating',
+            index=models.Index(fields=['manager', '-updated_at', '-id'], name='rating_manager_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', '-updated_at', '-id'], name='task_assignee_changed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_by', '-updated_at', '-id'], name='task_assigner_changed_idx'),
+        ),
+    ]
@@ -1,9 +1,46 @@
+import uuid
+from datetime import datetime, time, timedelta
+
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .storage import report_storage
+
 User = get_user_model()
 
+def completion_status_case(now=None):
+    """SQL twin of Task.completion_status; ``now`` defaults to the database clock"""
+    now = Now() if now is None else now
+    return models.Case(
+        models.When(status='completed', completed_date__lte=models.F('due_date'), then=models.Value('on_time')),
+        models.When(status='completed', then=models.Value('late')),
+        models.When(models.Q(status='overdue') | models.Q(due_date__lt=now), then=models.Value('overdue')),
+        default=models.Value('pending'),
+        output_field=models.CharField(),
+    )
+
+
+class TaskQuerySet(models.QuerySet):
+    OPEN_STATUSES = ['assigned', 'in_progress']
+
+    def overdue(self, now=None):
+        """Tasks past due and not completed, whether or not the sweeper has flagged them yet"""
+        now = now or timezone.now()
+        return self.filter(models.Q(status='overdue') | models.Q(status__in=self.OPEN_STATUSES, due_date__lt=now))
+
+    def with_completion_status(self, now=None):
+        """Annotate ``completion_state`` (on_time/late/overdue/pending) for filtering and ordering in SQL"""
+        return self.annotate(completion_state=completion_status_case(now))
+
+    def sweep_overdue(self, now=None):
+        """Flip open tasks past their due date to 'overdue' in one UPDATE and return how many changed"""
+        now = now or timezone.now()
+        return self.filter(status__in=self.OPEN_STATUSES, due_date__lt=now).update(status='overdue', updated_at=now)
+
+
 class Task(models.Model):
     PRIORITY_CHOICES = [
         ('low', 'Low'),
@@ -27,20 +64,44 @@ class Task(models.Model):
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='assigned')
     due_date = models.DateTimeField()
     completed_date = models.DateTimeField(null=True, blank=True)
-    completion_report = models.FileField(upload_to='task_reports/', null=True, blank=True)
+    completion_report = models.FileField(upload_to='task_reports/', storage=report_storage, null=True, blank=True)
+    # Reports are stored by content hash, so the uploaded name is kept here
+    completion_report_name = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TaskQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Period windows: tasks due or completed in a date range per assignee
+            models.Index(fields=['assigned_to', 'due_date', 'status'], name='task_assignee_due_idx'),
+            models.Index(fields=['assigned_to', 'completed_date', 'status'], name='task_assignee_completed_idx'),
+            models.Index(fields=['assigned_by', '-created_at', '-id'], name='task_assigner_created_idx'),
+            # Keyset-paginated task lists, optionally filtered by status
+            models.Index(fields=['assigned_to', '-created_at', '-id'], name='task_assignee_feed_idx'),
+            models.Index(fields=['assigned_to', 'status', '-created_at', '-id'], name='task_assignee_status_feed_idx'),
+            models.Index(fields=['assigned_by', 'status', '-created_at', '-id'], name='task_assigner_status_feed_idx'),
+            # Overdue sweep: open tasks past their due date
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+            # API pages, newest change first, for each side of the task scope
+            models.Index(fields=['assigned_to', '-updated_at', '-id'], name='task_assignee_changed_idx'),
+            models.Index(fields=['assigned_by', '-updated_at', '-id'], name='task_assigner_changed_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.assigned_to.get_full_name()}"
     
     @property
     def is_overdue(self):
-        from django.utils import timezone
-        return self.due_date < timezone.now() and self.status != 'completed'
+        if 'completion_state' in self.__dict__:
+            return self.completion_state == 'overdue'
+        return self.status == 'overdue' or (self.status != 'completed' and self.due_date < timezone.now())
     
     @property
     def completion_status(self):
+        if 'completion_state' in self.__dict__:
+            return self.completion_state
         if self.status == 'completed':
             if self.completed_date <= self.due_date:
                 return 'on_time'
@@ -78,8 +139,25 @@ class PerformanceRating(models.Model):
     # Feedback
     remarks = models.TextField()
     keywords = models.CharField(max_length=500, help_text="Comma-separated keywords")
+    # Normalized copy of ``keywords``, kept in sync by appraisals.keywords
+    keyword_tags = models.ManyToManyField('Keyword', through='RatingKeyword', related_name='ratings', blank=True)
     
     rating_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # Covers the period-scoped score aggregate without touching the table
+            models.Index(
+                fields=['employee', 'rating_date', 'overall_rating', 'quality_rating', 'timeliness_rating'],
+                name='rating_employee_date_idx',
+            ),
+            # API pages, newest change first: all ratings for HR, else the
+            # ones the user received or gave
+            models.Index(fields=['-updated_at', '-id'], name='rating_changed_idx'),
+            models.Index(fields=['employee', '-updated_at', '-id'], name='rating_employee_changed_idx'),
+            models.Index(fields=['manager', '-updated_at', '-id'], name='rating_manager_changed_idx'),
+        ]
     
     def __str__(self):
         return f"Rating for {self.employee.get_full_name()} by {self.manager.get_full_name()}"
@@ -90,9 +168,22 @@ class AppraisalPeriod(models.Model):
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # API pages, newest change first
+            models.Index(fields=['-updated_at', '-id'], name='period_changed_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.start_date} - {self.end_date})"
+    
+    def window(self):
+        """Return the period as an aware [start, end) datetime range"""
+        start = timezone.make_aware(datetime.combine(self.start_date, time.min))
+        end = timezone.make_aware(datetime.combine(self.end_date + timedelta(days=1), time.min))
+        return start, end
 
 class Appraisal(models.Model):
     STATUS_CHOICES = [
@@ -104,6 +195,8 @@ class Appraisal(models.Model):
         ('accepted', 'Accepted'),
     ]
     
+    AUTO_REMARKS = "Generated automatically based on performance ratings."
+    
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appraisals')
     period = models.ForeignKey(AppraisalPeriod, on_delete=models.CASCADE)
     manager = models.ForeignKey(User, on_delete=models.CASCADE, related_name='managed_appraisals')
@@ -123,32 +216,92 @@ class Appraisal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # HR dashboard queues, keyset-paginated newest first. Boolean filters
+            # compile to "NOT hr_approved", which a (status, hr_approved) index
+            # cannot seek, so each queue gets its own partial index instead.
+            # Leading with status lets the queue query seek it (status=?)
+            # rather than walk it, and keeps the index usable for status alone.
+            models.Index(fields=['status', '-created_at', '-id'], name='appraisal_pending_feed_idx',
+                         condition=models.Q(status='submitted', hr_approved=False)),
+            models.Index(fields=['status', '-created_at', '-id'], name='appraisal_completed_feed_idx',
+                         condition=models.Q(status='accepted', hr_approved=True)),
+            # API pages, newest change first: all appraisals for HR, else the
+            # user's own and the ones they manage
+            models.Index(fields=['-updated_at', '-id'], name='appraisal_changed_idx'),
+            models.Index(fields=['employee', '-updated_at', '-id'], name='appraisal_employee_changed_idx'),
+            models.Index(fields=['manager', '-updated_at', '-id'], name='appraisal_manager_changed_idx'),
+        ]
+        constraints = [
+            # One appraisal per employee and period, however many writers race to create it
+            models.UniqueConstraint(fields=['employee', 'period'], name='appraisal_employee_period_uniq'),
+        ]
+    
     def __str__(self):
         return f"Appraisal: {self.employee.get_full_name()} - {self.period.title}"
     
-    def calculate_scores(self):
+    def calculate_scores(self, commit=True):
         """Calculate appraisal scores based on ratings and tasks"""
-        ratings = PerformanceRating.objects.filter(employee=self.employee)
-        
-        if ratings.exists():
-            # Calculate average scores
-            self.overall_percentage = sum(r.overall_rating for r in ratings) / ratings.count()
-            
-            # Task completion analysis
-            tasks = Task.objects.filter(assigned_to=self.employee)
-            if tasks.exists():
-                completed_tasks = tasks.filter(status='completed').count()
-                self.task_completion_score = (completed_tasks / tasks.count()) * 100
-                
-                # Quality and timeliness scores
-                quality_scores = {'excellent': 100, 'good': 80, 'average': 60, 'below_average': 40, 'poor': 20}
-                timeliness_scores = {'on_time': 100, 'slightly_late': 80, 'late': 60, 'very_late': 40}
-                
-                if ratings.exists():
-                    self.quality_score = sum(quality_scores.get(r.quality_rating, 0) for r in ratings) / ratings.count()
-                    self.timeliness_score = sum(timeliness_scores.get(r.timeliness_rating, 0) for r in ratings) / ratings.count()
-        
-        self.save()
+        from .rollups import get_scores
+
+        result = get_scores(self.employee, self.period)
+        result.apply(self)
+        if commit:
+            self.save()
+        return result
+
+class EmployeeScoreRollup(models.Model):
+    """Running totals behind an employee's scores for one appraisal period"""
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='score_rollups')
+    period = models.ForeignKey(AppraisalPeriod, on_delete=models.CASCADE, related_name='score_rollups')
+    
+    rating_count = models.PositiveIntegerField(default=0)
+    overall_sum = models.FloatField(default=0)
+    quality_points_sum = models.PositiveIntegerField(default=0)
+    timeliness_points_sum = models.PositiveIntegerField(default=0)
+    task_count = models.PositiveIntegerField(default=0)
+    completed_task_count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'period'], name='unique_rollup_per_period'),
+        ]
+    
+    def __str__(self):
+        return f"Rollup: {self.employee_id} - {self.period_id}"
+
+class Keyword(models.Model):
+    """A normalized (lower-case, single-spaced) rating keyword"""
+    name = models.CharField(max_length=100, unique=True)
+    
+    def __str__(self):
+        return self.name
+
+class RatingKeyword(models.Model):
+    """One keyword of one rating, with the rating's employee and date copied for indexed lookups"""
+    # The composite unique constraint and indexes below lead with each of these
+    rating = models.ForeignKey(PerformanceRating, on_delete=models.CASCADE, related_name='keyword_links',
+                               db_index=False)
+    keyword = models.ForeignKey(Keyword, on_delete=models.CASCADE, related_name='rating_links', db_index=False)
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rating_keywords', db_index=False)
+    rating_date = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rating', 'keyword'], name='unique_keyword_per_rating'),
+        ]
+        indexes = [
+            # Keyword -> employees tagged with it during a period
+            models.Index(fields=['keyword', 'rating_date', 'employee'], name='keyword_date_employee_idx'),
+            # Department (via its employees) -> keyword counts during a period
+            models.Index(fields=['employee', 'rating_date', 'keyword'], name='keyword_employee_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.keyword_id} on rating {self.rating_id}"
 
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
@@ -173,6 +326,54 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread_idx'),
+        ]
+
+class NotificationOutbox(models.Model):
+    """A notification waiting to be fanned out to its recipients by the outbox worker"""
+    notification_type = models.CharField(max_length=25, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    appraisal = models.ForeignKey(Appraisal, on_delete=models.CASCADE, null=True, blank=True)
+    recipient_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], name='outbox_pending_idx', condition=models.Q(processed_at__isnull=True)),
+        ]
+    
+    def __str__(self):
+        return f"Outbox: {self.title} ({len(self.recipient_ids)} recipients)"
+
+class ReportBlob(models.Model):
+    """One stored completion report file and how many tasks point at it"""
+    name = models.CharField(max_length=100, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+class ReportUpload(models.Model):
+    """A resumable chunked upload of a completion report that is still in progress"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def is_complete(self):
+        return self.offset == self.size
+    
+    def __str__(self):
+        return f"Upload {self.filename}: {self.offset}/{self.size}"
 
 class NegotiationTicket(models.Model):
     STATUS_CHOICES = [
@@ -192,5 +393,10 @@ class NegotiationTicket(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     resolved_at = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created_at', '-id'], name='ticket_status_feed_idx'),
+        ]
+    
     def __str__(self):
         return f"Negotiation: {self.appraisal.employee.get_full_name()}"
\ No newline at end of file
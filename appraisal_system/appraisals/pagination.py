@@ -0,0 +1,70 @@
+import base64
+import binascii
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 25
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, newest first"""
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, pk):
+    raw = f"{value.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (datetime, pk) for a cursor, or None when it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def keyset_paginate(queryset, cursor=None, per_page=DEFAULT_PAGE_SIZE, field='created_at'):
+    """Return the page of ``queryset`` after ``cursor``, ordered by (-field, -pk).
+
+    The cursor is the position of the last row already seen, so a page is a
+    single index range seek no matter how deep the reader has scrolled.
+    """
+    queryset = queryset.order_by(f'-{field}', '-pk')
+    position = decode_cursor(cursor)
+    if position is not None:
+        value, pk = position
+        # Written as a range plus an exclusion (rather than an OR) so the
+        # database can seek straight to ``value`` on the ordering index.
+        queryset = queryset.filter(**{f'{field}__lte': value}).exclude(**{field: value, 'pk__gte': pk})
+
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        if isinstance(last, dict):
+            # values() rows; the caller must select ``field`` and ``id``
+            next_cursor = encode_cursor(last[field], last['id'])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,305 @@
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from appraisal_system.pools import discard_pool, shared_pool
+
+from .models import Appraisal
+
+STATUS_LABELS = dict(Appraisal.STATUS_CHOICES)
+
+# Ceiling on the default export pool, so a many-core host does not park a
+# dozen idle renderer processes next to every web worker
+MAX_EXPORT_WORKERS = 4
+
+# Everything the letter needs, fetched with values() so rows pickle cheaply
+PDF_FIELDS = [
+    'id', 'status', 'final_remarks', 'updated_at',
+    'overall_percentage', 'task_completion_score', 'quality_score', 'timeliness_score',
+    'employee__first_name', 'employee__last_name',
+    'manager__first_name', 'manager__last_name',
+    'period__title',
+]
+
+
+def _full_name(first, last):
+    return f"{first} {last}".strip()
+
+
+def appraisal_pdf_data(row):
+    """Turn a PDF_FIELDS values() row into the plain dict the renderer draws"""
+    return {
+        'id': row['id'],
+        'employee': _full_name(row['employee__first_name'], row['employee__last_name']),
+        'manager': _full_name(row['manager__first_name'], row['manager__last_name']),
+        'period': row['period__title'],
+        'overall_percentage': row['overall_percentage'],
+        'task_completion_score': row['task_completion_score'],
+        'quality_score': row['quality_score'],
+        'timeliness_score': row['timeliness_score'],
+        'status': STATUS_LABELS.get(row['status'], row['status']),
+        'final_remarks': row['final_remarks'],
+        'updated_at': row['updated_at'],
+    }
+
+
+def pdf_data_for(appraisal_id):
+    """Fetch the render data of one appraisal in a single query, or None"""
+    row = Appraisal.objects.filter(pk=appraisal_id).values(*PDF_FIELDS).first()
+    return appraisal_pdf_data(row) if row else None
+
+
+def pdf_filename(data):
+    return f"appraisal_{data['employee']}_{data['period']}.pdf"
+
+
+def render_appraisal_pdf(data):
+    """Render one appraisal letter and return the PDF bytes"""
+    buffer = io.BytesIO()
+    p = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+
+    # PDF Content
+    p.drawString(100, height - 100, f"PERFORMANCE APPRAISAL REPORT")
+    p.drawString(100, height - 130, f"Employee: {data['employee']}")
+    p.drawString(100, height - 150, f"Period: {data['period']}")
+    p.drawString(100, height - 170, f"Manager: {data['manager']}")
+    p.drawString(100, height - 200, f"Overall Score: {data['overall_percentage']:.1f}%")
+    p.drawString(100, height - 220, f"Task Completion: {data['task_completion_score']:.1f}%")
+    p.drawString(100, height - 240, f"Quality Score: {data['quality_score']:.1f}%")
+    p.drawString(100, height - 260, f"Timeliness Score: {data['timeliness_score']:.1f}%")
+    p.drawString(100, height - 290, f"Status: {data['status']}")
+
+    # Add remarks
+    p.drawString(100, height - 320, "Final Remarks:")
+    y_pos = height - 340
+    for line in data['final_remarks'].split('\n'):
+        p.drawString(120, y_pos, line)
+        y_pos -= 20
+
+    p.showPage()
+    p.save()
+    return buffer.getvalue()
+
+
+def pdf_cache_key(data):
+    """Fingerprint of everything drawn on a letter.
+
+    ``updated_at`` moves on every save of the appraisal; hashing the rest of
+    the row too means a renamed employee or period retitle is never served
+    from a stale file.
+    """
+    fingerprint = '|'.join(f"{key}={data[key]!r}" for key in sorted(data))
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+
+def _cache_dir():
+    path = Path(settings.PDF_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def cached_appraisal_pdf(data, key=None):
+    """Return the letter's PDF bytes from the disk cache, rendering it on a miss.
+
+    Each appraisal's renders live in their own folder, so replacing a
+    superseded one only lists that folder, never the whole cache.
+    """
+    key = key or pdf_cache_key(data)
+    directory = _cache_dir()
+    folder = directory / str(data['id'])
+    path = folder / f"{key}.pdf"
+    try:
+        content = path.read_bytes()
+    except FileNotFoundError:
+        pass
+    else:
+        # Touch it so eviction sees it as recently used
+        os.utime(path)
+        return content
+
+    content = render_appraisal_pdf(data)
+    folder.mkdir(parents=True, exist_ok=True)
+    # An older render of the same appraisal can never be hit again
+    freed = sum(_remove(entry.path) for entry in os.scandir(folder) if entry.name.endswith('.pdf'))
+    partial = path.with_suffix(f'.{os.getpid()}.tmp')
+    partial.write_bytes(content)
+    os.replace(partial, path)
+    _track_cache_size(directory, len(content) - freed, keep=path)
+    return content
+
+
+# Bytes each cache directory is believed to hold: measured by one scan, then
+# moved by every letter this process writes or replaces and re-measured by
+# each eviction. Other processes' writes only show up at the next scan, so
+# the directory can run over the limit by what they wrote in between.
+_cache_sizes = {}
+_cache_sizes_lock = threading.Lock()
+
+
+def _track_cache_size(directory, added, keep=None):
+    """Account for a write and evict only once the running total passes the limit"""
+    with _cache_sizes_lock:
+        size = _cache_sizes.get(str(directory))
+        if size is not None:
+            size += added
+        if size is None or size > settings.PDF_CACHE_MAX_BYTES:
+            size = evict_pdf_cache(directory, keep=keep)
+        _cache_sizes[str(directory)] = size
+
+
+def evict_pdf_cache(directory=None, keep=None):
+    """Drop the least recently used letters until the cache fits; returns the bytes left"""
+    directory = directory or _cache_dir()
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_dir():
+            entries.extend(_letter_stats(entry.path))
+        elif entry.name.endswith('.pdf'):
+            # Flat "<id>-<key>.pdf" files from before per-appraisal folders
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    limit = settings.PDF_CACHE_MAX_BYTES
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path != str(keep):
+            _remove(path)
+            total -= size
+            if os.path.dirname(path) != str(directory):
+                try:
+                    os.rmdir(os.path.dirname(path))
+                except OSError:
+                    pass  # another letter of that appraisal is still there
+    return total
+
+
+def _letter_stats(folder):
+    for entry in os.scandir(folder):
+        if entry.name.endswith('.pdf'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            yield stat.st_mtime, stat.st_size, entry.path
+
+
+def _remove(path):
+    """Delete a file if it is still there and return the bytes freed"""
+    try:
+        size = os.stat(path).st_size
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+
+def export_workers():
+    workers = getattr(settings, 'PDF_EXPORT_WORKERS', None)
+    if workers is None:
+        workers = min(os.cpu_count() or 1, MAX_EXPORT_WORKERS)
+    return workers
+
+
+def render_batch(batch):
+    """Render a batch of letters in one worker round-trip"""
+    return [render_appraisal_pdf(data) for data in batch]
+
+
+def render_many(rows, workers=None, batch_size=16):
+    """Yield (data, pdf bytes) for every row, in order, rendering across a process pool.
+
+    Rows travel to the workers in batches so a one-page letter is not
+    dwarfed by the cost of pickling it across, and at most two batches per
+    worker are in flight, so memory stays bounded however many rows the
+    iterator produces. The pool is shared with every other export of this
+    process; ``workers=0`` renders inline.
+    """
+    workers = export_workers() if workers is None else workers
+    if workers == 0:
+        for data in rows:
+            yield data, render_appraisal_pdf(data)
+        return
+
+    executor = shared_pool('pdf', workers)
+    in_flight = deque()
+    try:
+        rows = iter(rows)
+        batches = iter(lambda: list(islice(rows, batch_size)), [])
+        for batch in batches:
+            in_flight.append((batch, executor.submit(render_batch, batch)))
+            if len(in_flight) >= workers * 2:
+                batch, future = in_flight.popleft()
+                yield from zip(batch, future.result())
+        while in_flight:
+            batch, future = in_flight.popleft()
+            yield from zip(batch, future.result())
+    except BrokenProcessPool:
+        discard_pool(executor)
+        raise
+    finally:
+        # A client that disconnects mid-download leaves batches nobody will read
+        for _, future in in_flight:
+            future.cancel()
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only file object that hands back whatever zipfile wrote since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """Yield a ZIP archive chunk by chunk from an iterable of (name, bytes)"""
+    sink = _ZipSink()
+    seen = {}
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in files:
+            # Two employees with the same name must not overwrite each other
+            count = seen.get(name, 0)
+            seen[name] = count + 1
+            if count:
+                stem, ext = os.path.splitext(name)
+                name = f"{stem}_{count}{ext}"
+            archive.writestr(name, content)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def period_pdf_rows(period, chunk_size=200):
+    """Stream the render data of every appraisal in a period"""
+    rows = (Appraisal.objects.filter(period=period).order_by('pk')
+            .values(*PDF_FIELDS).iterator(chunk_size=chunk_size))
+    for row in rows:
+        yield appraisal_pdf_data(row)
+
+
+def stream_period_pdfs(period, workers=None):
+    """Yield a ZIP of every appraisal letter in a period as it is rendered"""
+    rendered = render_many(period_pdf_rows(period), workers)
+    return stream_zip((pdf_filename(data), pdf) for data, pdf in rendered)
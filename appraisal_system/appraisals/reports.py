@@ -0,0 +1,158 @@
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ReportBlob, ReportUpload, Task
+from .storage import BLOB_PREFIX, UPLOAD_PREFIX, report_storage
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk did not start where the upload left off; the client should resume from ``offset``"""
+
+    def __init__(self, offset):
+        super().__init__(f'Upload is at byte {offset}.')
+        self.offset = offset
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(f'{BLOB_PREFIX}/')
+
+
+def retain_blob(name):
+    """Count one more task pointing at a stored blob"""
+    if not is_blob(name):
+        return
+    blob, _ = ReportBlob.objects.get_or_create(name=name, defaults={'size': report_storage().size(name)})
+    ReportBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+
+def release_blob(name):
+    """Count one task fewer; unreferenced blobs are removed by prune_blobs()"""
+    if is_blob(name):
+        ReportBlob.objects.filter(name=name).update(ref_count=Greatest(F('ref_count') - 1, Value(0)))
+
+
+def attach_report(task, content, filename):
+    """Point a task at an uploaded report; the bytes are hashed and stored on task.save()"""
+    filename = os.path.basename(filename)
+    task.completion_report = File(content, name=filename)
+    task.completion_report_name = filename[:255]
+
+
+def start_upload(user, filename, size):
+    upload = ReportUpload.objects.create(user=user, filename=os.path.basename(filename)[:255], size=size)
+    path = report_storage().upload_path(upload.pk)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def append_chunk(upload, stream, offset):
+    """Append a request body to an upload, refusing chunks that do not continue it.
+
+    The row is locked for the duration so two retries of the same chunk
+    cannot both be appended.
+    """
+    with transaction.atomic():
+        upload = ReportUpload.objects.select_for_update().get(pk=upload.pk)
+        if offset != upload.offset:
+            raise UploadOffsetMismatch(upload.offset)
+        written = 0
+        with open(report_storage().upload_path(upload.pk), 'r+b') as part:
+            part.seek(upload.offset)
+            while True:
+                chunk = stream.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if upload.offset + written + len(chunk) > upload.size:
+                    raise ValueError('Chunk runs past the declared upload size.')
+                part.write(chunk)
+                written += len(chunk)
+            part.truncate()
+        upload.offset += written
+        upload.save(update_fields=['offset', 'updated_at'])
+    return upload
+
+
+def finish_upload(task, upload):
+    """Attach a completed chunked upload to a task and save it"""
+    path = report_storage().upload_path(upload.pk)
+    with open(path, 'rb') as part:
+        attach_report(task, part, upload.filename)
+        task.save()
+    os.remove(path)
+    upload.delete()
+
+
+def prune_blobs(grace=timedelta(hours=1)):
+    """Delete unreferenced blobs, orphaned blob files and abandoned uploads.
+
+    Returns (blobs removed, uploads removed).
+    """
+    storage = report_storage()
+    cutoff = timezone.now() - grace
+    removed = 0
+    for blob in ReportBlob.objects.filter(ref_count=0, created_at__lt=cutoff):
+        with transaction.atomic():
+            # Re-check under lock: a new submission may have picked it up
+            if ReportBlob.objects.select_for_update().filter(pk=blob.pk, ref_count=0).delete()[0]:
+                storage.delete(blob.name)
+                removed += 1
+
+    # Files written by a save whose transaction rolled back never got a row
+    known = set(ReportBlob.objects.values_list('name', flat=True))
+    root = storage.path(BLOB_PREFIX)
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            modified = datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc)
+            if name not in known and modified < cutoff:
+                os.remove(path)
+                removed += 1
+
+    expired = timezone.now() - timedelta(seconds=settings.REPORT_UPLOAD_EXPIRY)
+    uploads = 0
+    for upload in ReportUpload.objects.filter(updated_at__lt=expired):
+        storage.delete(f'{UPLOAD_PREFIX}/{upload.pk}.part')
+        upload.delete()
+        uploads += 1
+    return removed, uploads
+
+
+def dedupe_reports(delete_originals=False):
+    """Move reports saved before content addressing into blob storage.
+
+    Returns (tasks moved, original files deleted).
+    """
+    storage = report_storage()
+    moved = 0
+    tasks = Task.objects.exclude(completion_report='').exclude(completion_report__isnull=True)
+    for task in tasks.exclude(completion_report__startswith=f'{BLOB_PREFIX}/').iterator():
+        if not storage.exists(task.completion_report.name):
+            continue
+        with storage.open(task.completion_report.name) as original:
+            name = os.path.basename(task.completion_report.name)
+            attach_report(task, original, task.completion_report_name or name)
+            task.save(update_fields=['completion_report', 'completion_report_name', 'updated_at'])
+        moved += 1
+
+    deleted = 0
+    if delete_originals:
+        referenced = set(tasks.values_list('completion_report', flat=True))
+        directory = Task._meta.get_field('completion_report').upload_to.rstrip('/')
+        if storage.exists(directory):
+            for filename in storage.listdir(directory)[1]:
+                name = f'{directory}/{filename}'
+                if name not in referenced:
+                    storage.delete(name)
+                    deleted += 1
+    return moved, deleted
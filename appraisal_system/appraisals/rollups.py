@@ -0,0 +1,162 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import AppraisalPeriod, EmployeeScoreRollup, PerformanceRating, Task
+from .scoring import (
+    QUALITY_POINTS, TIMELINESS_POINTS, ScoreResult, compute_scores, compute_scores_bulk,
+    points_case, rating_period_q, task_period_q,
+)
+
+ROLLUP_FIELDS = [
+    'rating_count', 'overall_sum', 'quality_points_sum', 'timeliness_points_sum',
+    'task_count', 'completed_task_count',
+]
+
+
+def periods_containing(*moments):
+    """Return ids of the periods whose date range contains any of the datetimes"""
+    query = Q()
+    for moment in moments:
+        if moment is not None:
+            day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+            query |= Q(start_date__lte=day, end_date__gte=day)
+    if not query:
+        return set()
+    return set(AppraisalPeriod.objects.filter(query).values_list('pk', flat=True))
+
+
+def rating_contributions(rating):
+    """Map (employee id, period id) -> the rollup values one rating adds"""
+    values = {
+        'rating_count': 1,
+        'overall_sum': rating.overall_rating,
+        'quality_points_sum': QUALITY_POINTS.get(rating.quality_rating, 0),
+        'timeliness_points_sum': TIMELINESS_POINTS.get(rating.timeliness_rating, 0),
+    }
+    return {(rating.employee_id, period_id): values for period_id in periods_containing(rating.rating_date)}
+
+
+def task_contributions(task):
+    """Map (employee id, period id) -> the rollup values one task adds"""
+    values = {'task_count': 1, 'completed_task_count': int(task.status == 'completed')}
+    periods = periods_containing(task.due_date, task.completed_date)
+    return {(task.assigned_to_id, period_id): values for period_id in periods}
+
+
+def apply_contributions(before, after):
+    """Move the rollups from the ``before`` contributions to the ``after`` ones"""
+    for key in set(before) | set(after):
+        old, new = before.get(key, {}), after.get(key, {})
+        delta = {field: new.get(field, 0) - old.get(field, 0) for field in set(old) | set(new)}
+        apply_delta(*key, **delta)
+
+
+def apply_delta(employee_id, period_id, **deltas):
+    """Add ``deltas`` to a rollup row with atomic F() arithmetic.
+
+    A row that does not exist yet is built from the raw rows instead, so the
+    first addition after deployment (or after a period edit) never leaves a
+    rollup holding a partial total. Callers run this after the change has been
+    written, so that rebuild already includes it.
+    """
+    updates = {field: F(field) + value for field, value in deltas.items() if value}
+    if not updates:
+        return
+    rollups = EmployeeScoreRollup.objects.filter(employee_id=employee_id, period_id=period_id)
+    if rollups.update(**updates):
+        return
+    if all(value <= 0 for value in deltas.values()):
+        # Nothing to seed for a pure removal; a missing rollup is simply
+        # recomputed on read. This also keeps a cascade delete of the
+        # employee from re-creating the rollup it has just removed.
+        return
+    period = AppraisalPeriod.objects.get(pk=period_id)
+    totals = compute_totals(period, [employee_id]).get(employee_id, {})
+    try:
+        with transaction.atomic():
+            EmployeeScoreRollup.objects.create(employee_id=employee_id, period=period, **totals)
+    except IntegrityError:
+        # Somebody else created it between our UPDATE and INSERT
+        rollups.update(**updates)
+
+
+def compute_totals(period, employee_ids=None):
+    """Recompute rollup totals from the raw rows, grouped by employee"""
+    ratings = PerformanceRating.objects.filter(rating_period_q(period))
+    tasks = Task.objects.filter(task_period_q(period))
+    if employee_ids is not None:
+        ratings = ratings.filter(employee_id__in=employee_ids)
+        tasks = tasks.filter(assigned_to_id__in=employee_ids)
+
+    totals = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    rating_rows = ratings.order_by().values('employee_id').annotate(
+        rating_count=Count('pk'),
+        overall_sum=Sum('overall_rating'),
+        quality_points_sum=Sum(points_case('quality_rating', QUALITY_POINTS)),
+        timeliness_points_sum=Sum(points_case('timeliness_rating', TIMELINESS_POINTS)),
+    )
+    for row in rating_rows:
+        totals[row.pop('employee_id')].update(row)
+    task_rows = tasks.order_by().values('assigned_to_id').annotate(
+        task_count=Count('pk'),
+        completed_task_count=Count('pk', filter=Q(status='completed')),
+    )
+    for row in task_rows:
+        totals[row.pop('assigned_to_id')].update(row)
+    return dict(totals)
+
+
+def rebuild_period(period, repair=True):
+    """Compare a period's rollups with the raw rows and optionally fix them.
+
+    Returns the list of employee ids whose rollup had drifted.
+    """
+    expected = compute_totals(period)
+    existing = {rollup.employee_id: rollup for rollup in EmployeeScoreRollup.objects.filter(period=period)}
+
+    drifted, to_create, to_update = [], [], []
+    for employee_id, totals in expected.items():
+        rollup = existing.pop(employee_id, None)
+        if rollup is None:
+            drifted.append(employee_id)
+            to_create.append(EmployeeScoreRollup(employee_id=employee_id, period=period, **totals))
+        elif any(abs(getattr(rollup, field) - value) > 1e-6 for field, value in totals.items()):
+            drifted.append(employee_id)
+            for field, value in totals.items():
+                setattr(rollup, field, value)
+            rollup.updated_at = timezone.now()
+            to_update.append(rollup)
+    # Rollups left over have nothing behind them any more
+    orphans = [employee_id for employee_id, rollup in existing.items()
+               if any(getattr(rollup, field) for field in ROLLUP_FIELDS)]
+    drifted.extend(orphans)
+
+    if repair:
+        with transaction.atomic():
+            EmployeeScoreRollup.objects.bulk_create(to_create, batch_size=500)
+            EmployeeScoreRollup.objects.bulk_update(to_update, ROLLUP_FIELDS + ['updated_at'], batch_size=500)
+            EmployeeScoreRollup.objects.filter(period=period, employee_id__in=orphans).delete()
+    return drifted
+
+
+def get_scores(employee, period):
+    """Scores for one employee, read from the rollup when one is available"""
+    rollup = EmployeeScoreRollup.objects.filter(employee=employee, period=period).first()
+    if rollup is not None:
+        return ScoreResult.from_rollup(rollup)
+    return compute_scores(employee, period)
+
+
+def get_scores_bulk(employee_ids, period):
+    """Scores for many employees, computing only those without a rollup"""
+    results = {
+        rollup.employee_id: ScoreResult.from_rollup(rollup)
+        for rollup in EmployeeScoreRollup.objects.filter(period=period, employee_id__in=employee_ids)
+    }
+    missing = [employee_id for employee_id in employee_ids if employee_id not in results]
+    if missing:
+        results.update(compute_scores_bulk(missing, period))
+    return results
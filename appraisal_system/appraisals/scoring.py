@@ -0,0 +1,150 @@
+from django.db.models import Avg, Case, Count, IntegerField, Max, Q, Subquery, Value, When
+
+from .models import PerformanceRating, Task
+
+QUALITY_POINTS = {'excellent': 100, 'good': 80, 'average': 60, 'below_average': 40, 'poor': 20}
+TIMELINESS_POINTS = {'on_time': 100, 'slightly_late': 80, 'late': 60, 'very_late': 40}
+
+SCORE_FIELDS = ['overall_percentage', 'task_completion_score', 'quality_score', 'timeliness_score']
+
+
+def points_case(field, points):
+    """Map a rating choice column to its points inside the database"""
+    return Case(
+        *[When(**{field: choice}, then=Value(value)) for choice, value in points.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+class ScoreResult:
+    """Scores computed for one employee, shared by every caller that fills an Appraisal"""
+
+    def __init__(self, rating_count=0, overall=None, quality=None, timeliness=None,
+                 total_tasks=0, completed_tasks=0):
+        self.rating_count = rating_count or 0
+        self.overall = overall
+        self.quality = quality
+        self.timeliness = timeliness
+        self.total_tasks = total_tasks or 0
+        self.completed_tasks = completed_tasks or 0
+
+    def __repr__(self):
+        return (f"ScoreResult(ratings={self.rating_count}, overall={self.overall}, "
+                f"quality={self.quality}, timeliness={self.timeliness}, "
+                f"tasks={self.completed_tasks}/{self.total_tasks})")
+
+    @classmethod
+    def from_rollup(cls, rollup):
+        """Build a result from the running totals of an EmployeeScoreRollup"""
+        count = rollup.rating_count
+        return cls(
+            rating_count=count,
+            overall=rollup.overall_sum / count if count else None,
+            quality=rollup.quality_points_sum / count if count else None,
+            timeliness=rollup.timeliness_points_sum / count if count else None,
+            total_tasks=rollup.task_count,
+            completed_tasks=rollup.completed_task_count,
+        )
+
+    @property
+    def task_completion(self):
+        if not self.total_tasks:
+            return None
+        return (self.completed_tasks / self.total_tasks) * 100
+
+    def apply(self, appraisal):
+        """Copy the scores onto an appraisal without saving it.
+
+        Scores are only overwritten when there is data behind them, so an
+        appraisal without ratings keeps whatever values it already had.
+        """
+        if not self.rating_count:
+            return appraisal
+        appraisal.overall_percentage = self.overall
+        if self.total_tasks:
+            appraisal.task_completion_score = self.task_completion
+            appraisal.quality_score = self.quality
+            appraisal.timeliness_score = self.timeliness
+        return appraisal
+
+
+def rating_period_q(period):
+    """Restrict PerformanceRating rows to those given during the period"""
+    if period is None:
+        return Q()
+    start, end = period.window()
+    return Q(rating_date__gte=start, rating_date__lt=end)
+
+
+def task_period_q(period):
+    """Restrict Task rows to those due or completed during the period"""
+    if period is None:
+        return Q()
+    start, end = period.window()
+    return Q(due_date__gte=start, due_date__lt=end) | Q(completed_date__gte=start, completed_date__lt=end)
+
+
+def compute_scores(employee, period=None):
+    """Compute all appraisal scores for an employee with a single aggregate query.
+
+    When a period is given only ratings and tasks falling inside its date
+    range are considered. An employee without ratings costs a second query
+    for the task counts.
+    """
+    tasks = Task.objects.filter(task_period_q(period), assigned_to=employee).order_by().values('assigned_to')
+    total_tasks = tasks.annotate(n=Count('pk')).values('n')
+    completed_tasks = tasks.filter(status='completed').annotate(n=Count('pk')).values('n')
+
+    row = PerformanceRating.objects.filter(rating_period_q(period), employee=employee).aggregate(
+        rating_count=Count('pk'),
+        overall=Avg('overall_rating'),
+        quality=Avg(points_case('quality_rating', QUALITY_POINTS)),
+        timeliness=Avg(points_case('timeliness_rating', TIMELINESS_POINTS)),
+        # Uncorrelated scalar subqueries, evaluated once; Max() only lifts them
+        # into the aggregate row so everything comes back in one round trip.
+        total_tasks=Max(Subquery(total_tasks)),
+        completed_tasks=Max(Subquery(completed_tasks)),
+    )
+    if not row['rating_count']:
+        # Max() over no ratings drops the task counts too; fetch them on their own
+        row.update(tasks.aggregate(total_tasks=Count('pk'), completed_tasks=Count('pk', filter=Q(status='completed'))))
+    return ScoreResult(**row)
+
+
+def compute_scores_bulk(employee_ids, period=None):
+    """Compute scores for many employees with one grouped query per table.
+
+    Returns a dict of employee id -> ScoreResult; employees without any
+    ratings or tasks still get an empty result.
+    """
+    results = {employee_id: ScoreResult() for employee_id in employee_ids}
+
+    rating_rows = (
+        PerformanceRating.objects.filter(rating_period_q(period), employee_id__in=employee_ids)
+        .order_by()
+        .values('employee_id')
+        .annotate(
+            rating_count=Count('pk'),
+            overall=Avg('overall_rating'),
+            quality=Avg(points_case('quality_rating', QUALITY_POINTS)),
+            timeliness=Avg(points_case('timeliness_rating', TIMELINESS_POINTS)),
+        )
+    )
+    for row in rating_rows:
+        result = results[row.pop('employee_id')]
+        for key, value in row.items():
+            setattr(result, key, value)
+
+    task_rows = (
+        Task.objects.filter(task_period_q(period), assigned_to_id__in=employee_ids)
+        .order_by()
+        .values('assigned_to_id')
+        .annotate(total_tasks=Count('pk'), completed_tasks=Count('pk', filter=Q(status='completed')))
+    )
+    for row in task_rows:
+        result = results[row['assigned_to_id']]
+        result.total_tasks = row['total_tasks']
+        result.completed_tasks = row['completed_tasks']
+
+    return results
@@ -0,0 +1,156 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+
+# Created by migration 0014 (SQLite with FTS5 only) and recreated by rebuild()
+SEARCH_TABLE = 'appraisals_search'
+CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    "title, body, tags, link_id UNINDEXED, tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+
+# Each row's rowid packs the object id and its kind, so one object is found,
+# replaced or deleted by rowid without scanning the index
+KINDS = {'task': 1, 'rating': 2, 'appraisal': 3, 'ticket': 4}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+KIND_BITS = 8
+
+# kind -> (SELECT of rowid, title, body, tags, link_id; alias of the indexed table).
+# ``tags`` holds the kind and the ids of the users who may see the row, so the
+# role filter is another term of the MATCH rather than a scan of the results.
+ROW_SQL = {
+    'task': ("""
+        SELECT t.id * 8 + 1, t.title, t.description,
+               'k1 u' || t.assigned_to_id || ' u' || t.assigned_by_id, NULL
+        FROM appraisals_task t""", 't'),
+    'rating': ("""
+        SELECT r.id * 8 + 2, '', r.remarks,
+               'k2 u' || r.employee_id || ' u' || r.manager_id, NULL
+        FROM appraisals_performancerating r""", 'r'),
+    'appraisal': ("""
+        SELECT a.id * 8 + 3, '', a.final_remarks,
+               'k3 u' || a.employee_id || ' u' || a.manager_id, a.id
+        FROM appraisals_appraisal a""", 'a'),
+    'ticket': ("""
+        SELECT n.id * 8 + 4, '', n.employee_reason || char(10) || n.manager_response || char(10) || n.hr_decision,
+               'k4 u' || a.employee_id || ' u' || a.manager_id || ifnull(' u' || n.negotiated_by_id, ''), a.id
+        FROM appraisals_negotiationticket n JOIN appraisals_appraisal a ON a.id = n.appraisal_id""", 'n'),
+}
+INSERT_SQL = f'INSERT INTO {SEARCH_TABLE} (rowid, title, body, tags, link_id) '
+
+# Weights of title, body and tags in the bm25 ranking
+RANK = f'bm25({SEARCH_TABLE}, 2.0, 1.0, 0.0)'
+SNIPPET_TOKENS = 16
+ID_CHUNK = 500
+_TERMS = re.compile(r'\w+')
+
+_available = {}
+
+
+def search_available():
+    """Whether the database has the FTS5 index (SQLite built with FTS5, migrated)"""
+    if connection.vendor != 'sqlite':
+        return False
+    name = connection.settings_dict['NAME']
+    if name not in _available:
+        _available[name] = SEARCH_TABLE in connection.introspection.table_names()
+    return _available[name]
+
+
+def rowid(kind, pk):
+    return pk * KIND_BITS + KINDS[kind]
+
+
+def index(kind, ids):
+    """(Re)write the search rows of the given objects of one kind"""
+    if not search_available():
+        return
+    select, alias = ROW_SQL[kind]
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start:start + ID_CHUNK]
+            marks = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({marks})',
+                           [rowid(kind, pk) for pk in chunk])
+            cursor.execute(f'{INSERT_SQL}{select} WHERE {alias}.id IN ({marks})', chunk)
+
+
+def unindex(kind, ids):
+    if not search_available():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), ID_CHUNK):
+            chunk = ids[start:start + ID_CHUNK]
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})",
+                           [rowid(kind, pk) for pk in chunk])
+
+
+def rebuild():
+    """Refill the whole index with one INSERT ... SELECT per kind; returns rows per kind"""
+    counts = {}
+    with connection.cursor() as cursor:
+        # Deleting from an FTS5 table removes each row's terms one by one;
+        # dropping it is instant
+        cursor.execute(f'DROP TABLE {SEARCH_TABLE}')
+        cursor.execute(CREATE_SQL)
+        for kind, (select, _) in ROW_SQL.items():
+            cursor.execute(f'{INSERT_SQL}{select}')
+            counts[kind] = cursor.rowcount
+        # Merge the b-tree segments the inserts left behind, for faster queries
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def match_expression(text, user=None, kind=None):
+    """An FTS5 query for the words of ``text``, or None when it has none.
+
+    Every word must appear in the title or body; a trailing ``*`` makes the
+    last one a prefix. Users other than HR only match rows tagged with their
+    id, and ``kind`` narrows to one kind of object.
+    """
+    terms = _TERMS.findall(text)
+    if not terms:
+        return None
+    words = ' '.join(f'"{term}"' for term in terms) + ('*' if text.rstrip().endswith('*') else '')
+    expression = f'{{title body}} : ({words})'
+    if kind is not None:
+        expression += f' AND tags : "k{KINDS[kind]}"'
+    if user is not None and user.role != 'hr_admin':
+        expression += f' AND tags : "u{user.pk}"'
+    return expression
+
+
+def search(user, text, kind=None, limit=20):
+    """The best ``limit`` matches ``user`` may see, each a dict with an HTML-safe snippet"""
+    expression = match_expression(text, user, kind)
+    if expression is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, title, snippet({SEARCH_TABLE}, 1, char(2), char(3), '…', %s), link_id, {RANK} AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY score LIMIT %s",
+            [SNIPPET_TOKENS, expression, limit],
+        )
+        rows = cursor.fetchall()
+    results = []
+    for row_id, title, snippet, link_id, score in rows:
+        results.append({
+            'kind': KIND_NAMES[row_id % KIND_BITS],
+            'id': row_id // KIND_BITS,
+            'title': title,
+            'snippet': escape(snippet).replace('\x02', '<mark>').replace('\x03', '</mark>'),
+            'appraisal_id': link_id,
+            'score': round(-score, 4),
+        })
+    return results
+
+
+def matching_ids(kind, text):
+    """SQL and params selecting the ids of every ``kind`` object matching ``text``, for an __in filter"""
+    expression = match_expression(text, kind=kind)
+    if expression is None:
+        return None
+    return f'SELECT rowid / {KIND_BITS} FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [expression]
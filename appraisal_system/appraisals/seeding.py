@@ -0,0 +1,241 @@
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from accounts.dashboard import invalidate as invalidate_dashboards
+from accounts.hierarchy import add_users
+from accounts.models import Department
+from appraisals.analytics import invalidate_period
+from appraisals.generation import generate_for_department
+from appraisals.keywords import backfill as index_keywords
+from appraisals.models import Appraisal, AppraisalPeriod, NegotiationTicket, Notification, PerformanceRating, Task
+from appraisals.rollups import rebuild_period
+from appraisals.search import index as index_search
+from appraisals.scoring import QUALITY_POINTS
+from appraisals.utils import recount_unread
+
+User = get_user_model()
+
+FIRST_NAMES = ['Ava', 'Ben', 'Chloe', 'Dev', 'Elena', 'Farah', 'Gus', 'Hana', 'Ivan', 'Jia',
+               'Kofi', 'Lena', 'Mateo', 'Nia', 'Omar', 'Priya', 'Quinn', 'Ravi', 'Sofia', 'Tomas']
+LAST_NAMES = ['Adams', 'Bose', 'Chen', 'Diaz', 'Eze', 'Fischer', 'Garcia', 'Haddad', 'Ito', 'Jones',
+              'Khan', 'Lopez', 'Mensah', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Sato', 'Torres', 'Weber']
+DEPARTMENTS = ['Engineering', 'Sales', 'Finance', 'Operations', 'Marketing', 'Support', 'Legal', 'Research']
+PERIOD_DAYS = 91
+BATCH_SIZE = 1000
+
+
+class OrgSeeder:
+    """Bulk-insert a synthetic org: departments, a four-level reporting tree and its activity.
+
+    Everything is written with bulk_create, which sends no signals, so the
+    derived tables (org closure, score rollups, keyword and search indexes,
+    unread counters) and caches are brought up to date with their helpers.
+    """
+
+    def __init__(self, departments=4, managers=2, leaders=3, employees=6, tasks=8, periods=2, hr=2,
+                 prefix='seed', password='password', seed=0):
+        self.departments = departments
+        self.managers = managers
+        self.leaders = leaders
+        self.employees = employees
+        self.tasks = tasks
+        self.periods = periods
+        self.hr = hr
+        self.prefix = prefix
+        self.rng = random.Random(seed)
+        # PBKDF2 is slow on purpose; every seeded user shares one hash
+        self.password = make_password(password)
+        self.now = timezone.now()
+        self.counter = 0
+        self.counts = {}
+
+    def run(self):
+        with transaction.atomic():
+            self.create_users()
+            self.create_periods()
+            self.create_tasks_and_ratings()
+        # Rollups of every period the seeded activity falls in, not just the new ones
+        touched = AppraisalPeriod.objects.filter(start_date__lte=self.latest.date(), end_date__gte=self.earliest.date())
+        for period in touched:
+            rebuild_period(period)
+            invalidate_period(period.pk)
+        self.create_appraisals()
+        self.create_notifications()
+        # The new users have no cached panels yet; the shared ones now show them
+        invalidate_dashboards('hr', 'global')
+        return self.counts
+
+    def _user(self, role, department=None, manager=None):
+        self.counter += 1
+        return User(
+            username=f'{self.prefix}_{role}_{self.counter}',
+            first_name=self.rng.choice(FIRST_NAMES),
+            last_name=self.rng.choice(LAST_NAMES),
+            email=f'{self.prefix}.{self.counter}@example.com',
+            role=role,
+            department=department,
+            manager=manager,
+            employee_id=f'{self.prefix.upper()}-{self.counter:06d}',
+            hire_date=(self.now - timedelta(days=self.rng.randint(30, 3000))).date(),
+            password=self.password,
+        )
+
+    def _create_level(self, users):
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return users
+
+    def create_users(self):
+        departments = Department.objects.bulk_create([
+            Department(name=f'{DEPARTMENTS[d % len(DEPARTMENTS)]} {d // len(DEPARTMENTS) + 1}'
+                       if d >= len(DEPARTMENTS) else DEPARTMENTS[d],
+                       description=f'Seeded by {self.prefix}')
+            for d in range(self.departments)
+        ])
+        self.department_objects = departments
+        hr = self._create_level([self._user('hr_admin') for _ in range(self.hr)])
+        # Each department has a head manager with the other managers reporting to them
+        heads = self._create_level([self._user('manager', department) for department in departments])
+        managers = heads + self._create_level([
+            self._user('manager', head.department, head) for head in heads for _ in range(self.managers - 1)
+        ])
+        leaders = self._create_level([
+            self._user('team_leader', manager.department, manager) for manager in managers for _ in range(self.leaders)
+        ])
+        employees = self._create_level([
+            self._user('employee', leader.department, leader) for leader in leaders for _ in range(self.employees)
+        ])
+        self.users = hr + managers + leaders + employees
+        self.hr_users = hr
+        add_users(self.users)
+        self.counts.update(departments=len(departments), users=len(self.users))
+
+    def create_periods(self):
+        today = self.now.date()
+        current_start = today - timedelta(days=PERIOD_DAYS // 2)
+        periods = []
+        for index in reversed(range(self.periods)):
+            start = current_start - timedelta(days=PERIOD_DAYS * index)
+            periods.append(AppraisalPeriod(
+                title=f'{self.prefix.title()} P{self.periods - index}',
+                start_date=start,
+                end_date=start + timedelta(days=PERIOD_DAYS - 1),
+                is_active=index == 0,
+                created_by=self.hr_users[0] if self.hr_users else self.users[0],
+            ))
+        self.period_objects = AppraisalPeriod.objects.bulk_create(periods)
+        self.counts['periods'] = len(periods)
+
+    def create_tasks_and_ratings(self):
+        earliest = self.now.replace(hour=12) - timedelta(days=(self.now.date() - self.period_objects[0].start_date).days)
+        self.earliest, self.latest = earliest, self.now + timedelta(days=30)
+        span = (self.latest - earliest).total_seconds()
+        tasks = []
+        for user in self.users:
+            if user.manager_id is None:
+                continue
+            for t in range(self.tasks):
+                due = earliest + timedelta(seconds=self.rng.uniform(0, span))
+                task = Task(title=f'Task {t + 1} for {user.first_name}', description='Seeded task',
+                            assigned_to=user, assigned_by_id=user.manager_id, due_date=due,
+                            priority=self.rng.choice(['low', 'medium', 'medium', 'high', 'urgent']))
+                if due < self.now:
+                    if self.rng.random() < 0.8:
+                        task.status = 'completed'
+                        task.completed_date = min(due + timedelta(hours=self.rng.gauss(-24, 36)), self.now)
+                    else:
+                        task.status = 'overdue'
+                elif self.rng.random() < 0.2:
+                    task.status = 'completed'
+                    task.completed_date = self.now - timedelta(hours=self.rng.uniform(0, 48))
+                else:
+                    task.status = self.rng.choice(['assigned', 'in_progress'])
+                tasks.append(task)
+        Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+
+        qualities = list(QUALITY_POINTS)
+        ratings = []
+        for task in tasks:
+            if task.status != 'completed' or self.rng.random() > 0.8:
+                continue
+            late_hours = (task.completed_date - task.due_date).total_seconds() / 3600
+            timeliness = ('on_time' if late_hours <= 0 else 'slightly_late' if late_hours <= 24
+                          else 'late' if late_hours <= 72 else 'very_late')
+            quality = self.rng.choices(qualities, weights=[20, 40, 25, 10, 5])[0]
+            ratings.append(PerformanceRating(
+                employee_id=task.assigned_to_id, manager_id=task.assigned_by_id, task=task,
+                quality_rating=quality, timeliness_rating=timeliness,
+                overall_rating=round(max(0, min(100, self.rng.gauss(75, 12))), 1),
+                remarks='Seeded rating', keywords=', '.join(self.rng.sample(
+                    ['teamwork', 'ownership', 'quality', 'communication', 'delivery', 'mentoring'], 2)),
+            ))
+        PerformanceRating.objects.bulk_create(ratings, batch_size=BATCH_SIZE)
+        # auto_now_add stamps every rating with now; date each one when its task was
+        # completed, in one UPDATE rather than a bulk_update CASE per row
+        completed = Subquery(Task.objects.filter(pk=OuterRef('task_id')).values('completed_date')[:1])
+        PerformanceRating.objects.filter(pk__in=[rating.pk for rating in ratings]).update(
+            rating_date=completed, updated_at=completed,
+        )
+        index_keywords(PerformanceRating.objects.filter(pk__in=[rating.pk for rating in ratings]))
+        index_search('task', [task.pk for task in tasks])
+        index_search('rating', [rating.pk for rating in ratings])
+        self.counts.update(tasks=len(tasks), ratings=len(ratings))
+
+    def create_appraisals(self):
+        for period in self.period_objects:
+            for department in self.department_objects:
+                generate_for_department(period.pk, department.pk)
+
+        appraisals = list(Appraisal.objects.filter(period__in=self.period_objects))
+        # Appraisals are moved along the workflow with one UPDATE per outcome
+        outcomes = defaultdict(list)
+        tickets = []
+        for appraisal in appraisals:
+            current = appraisal.period_id == self.period_objects[-1].pk
+            roll = self.rng.random()
+            if not current or roll < 0.4:
+                appraisal.status, appraisal.hr_approved = 'accepted', True
+                appraisal.hr_approved_by_id = self.rng.choice(self.hr_users).pk if self.hr_users else None
+                outcomes['accepted', appraisal.hr_approved_by_id].append(appraisal.pk)
+            elif roll < 0.55:
+                appraisal.status = 'negotiation'
+                outcomes['negotiation', None].append(appraisal.pk)
+                tickets.append(NegotiationTicket(
+                    appraisal=appraisal, negotiated_by_id=appraisal.employee_id,
+                    employee_reason='My ratings do not reflect the projects I delivered this period.',
+                    status=self.rng.choice(['open', 'in_review']),
+                ))
+        for (status, approver_id), ids in outcomes.items():
+            Appraisal.objects.filter(pk__in=ids).update(
+                status=status, hr_approved=status == 'accepted', hr_approved_by_id=approver_id,
+            )
+        NegotiationTicket.objects.bulk_create(tickets, batch_size=BATCH_SIZE)
+        index_search('ticket', [ticket.pk for ticket in tickets])
+        for period in self.period_objects:
+            invalidate_period(period.pk)
+        self.appraisals = appraisals
+        self.counts.update(appraisals=len(appraisals), tickets=len(tickets))
+
+    def create_notifications(self):
+        notifications = []
+        for appraisal in self.appraisals:
+            notifications.append(Notification(
+                recipient_id=appraisal.employee_id, notification_type='appraisal_created',
+                title='Appraisal created', message='Your appraisal is ready for review.',
+                appraisal=appraisal, is_read=appraisal.hr_approved or self.rng.random() < 0.5,
+            ))
+            if appraisal.hr_approved:
+                notifications.append(Notification(
+                    recipient_id=appraisal.employee_id, notification_type='appraisal_approved',
+                    title='Appraisal approved', message='HR has approved your appraisal.',
+                    appraisal=appraisal, is_read=self.rng.random() < 0.7,
+                ))
+        Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+        recount_unread({notification.recipient_id for notification in notifications})
+        self.counts['notifications'] = len(notifications)
@@ -0,0 +1,172 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.dashboard import invalidate as invalidate_dashboards
+
+from .analytics import invalidate_period
+from .events import publish_unread
+from .keywords import index_ratings
+from .models import (
+    Appraisal, AppraisalPeriod, EmployeeScoreRollup, NegotiationTicket, Notification, PerformanceRating, Task,
+)
+from .reports import release_blob, retain_blob
+from .rollups import apply_contributions, periods_containing, rating_contributions, task_contributions
+from .search import index as index_search, unindex as unindex_search
+from .utils import adjust_unread_counts
+
+CONTRIBUTIONS = {
+    PerformanceRating: rating_contributions,
+    Task: task_contributions,
+}
+
+
+@receiver(pre_save, sender=PerformanceRating)
+@receiver(pre_save, sender=Task)
+def remember_rollup_contribution(sender, instance, raw=False, **kwargs):
+    """Keep what the stored row contributed so post_save can apply the difference"""
+    if raw or instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    instance._rollup_before = CONTRIBUTIONS[sender](previous) if previous else {}
+
+
+@receiver(post_save, sender=PerformanceRating)
+@receiver(post_save, sender=Task)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = instance.__dict__.pop('_rollup_before', {})
+    apply_contributions(before, CONTRIBUTIONS[sender](instance))
+
+
+@receiver(post_delete, sender=PerformanceRating)
+@receiver(post_delete, sender=Task)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    apply_contributions(CONTRIBUTIONS[sender](instance), {})
+
+
+@receiver(pre_save, sender=AppraisalPeriod)
+def drop_rollups_on_period_change(sender, instance, raw=False, **kwargs):
+    """A period whose dates move no longer matches its rollups; they rebuild lazily"""
+    if raw or instance.pk is None:
+        return
+    previous = AppraisalPeriod.objects.filter(pk=instance.pk).values('start_date', 'end_date').first()
+    if previous and (previous['start_date'], previous['end_date']) != (instance.start_date, instance.end_date):
+        EmployeeScoreRollup.objects.filter(period_id=instance.pk).delete()
+        invalidate_period(instance.pk)
+
+
+@receiver(post_save, sender=Appraisal)
+@receiver(post_delete, sender=Appraisal)
+def invalidate_appraisal_analytics(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_period(instance.period_id)
+
+
+@receiver(post_save, sender=PerformanceRating)
+@receiver(post_delete, sender=PerformanceRating)
+def invalidate_rating_analytics(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for period_id in periods_containing(instance.rating_date):
+        invalidate_period(period_id)
+
+
+@receiver(post_save, sender=PerformanceRating)
+def index_rating_keywords(sender, instance, raw=False, **kwargs):
+    """Keep the normalized keyword links in step with the keywords field"""
+    if raw:
+        return
+    index_ratings([instance])
+
+
+SEARCH_KINDS = {
+    Task: 'task',
+    PerformanceRating: 'rating',
+    Appraisal: 'appraisal',
+    NegotiationTicket: 'ticket',
+}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=PerformanceRating)
+@receiver(post_save, sender=Appraisal)
+@receiver(post_save, sender=NegotiationTicket)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_search(SEARCH_KINDS[sender], [instance.pk])
+    if sender is Appraisal:
+        # A ticket's row lists its appraisal's employee and manager as readers
+        index_search('ticket', NegotiationTicket.objects.filter(appraisal=instance).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=PerformanceRating)
+@receiver(post_delete, sender=Appraisal)
+@receiver(post_delete, sender=NegotiationTicket)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_search(SEARCH_KINDS[sender], [instance.pk])
+
+
+@receiver(post_delete, sender=Notification)
+def release_unread_count(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_counts([instance.recipient_id], -1)
+        publish_unread([instance.recipient_id])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_panels(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards(f'user:{instance.assigned_to_id}')
+
+
+@receiver(post_save, sender=Appraisal)
+@receiver(post_delete, sender=Appraisal)
+def invalidate_appraisal_panels(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards(f'user:{instance.employee_id}', 'hr')
+
+
+@receiver(post_save, sender=NegotiationTicket)
+@receiver(post_delete, sender=NegotiationTicket)
+def invalidate_ticket_panels(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    employee_id = Appraisal.objects.filter(pk=instance.appraisal_id).values_list('employee_id', flat=True).first()
+    invalidate_dashboards(f'user:{employee_id}' if employee_id else None, 'hr')
+
+
+@receiver(post_save, sender=AppraisalPeriod)
+@receiver(post_delete, sender=AppraisalPeriod)
+def invalidate_period_panels(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_dashboards('global')
+
+
+@receiver(post_init, sender=Task)
+def remember_report(sender, instance, **kwargs):
+    # Skipped for deferred loads, which would otherwise fetch the column
+    if 'completion_report' in instance.__dict__:
+        stored = instance.__dict__['completion_report'] if instance.pk is not None else ''
+        instance._stored_report = stored if isinstance(stored, str) else ''
+
+
+@receiver(post_save, sender=Task)
+def count_report_references(sender, instance, raw=False, **kwargs):
+    if raw or 'completion_report' not in instance.__dict__:
+        return
+    current = instance.completion_report.name or ''
+    previous = instance.__dict__.get('_stored_report', '')
+    if current != previous:
+        retain_blob(current)
+        release_blob(previous)
+        instance._stored_report = current
+
+
+@receiver(post_delete, sender=Task)
+def release_report(sender, instance, **kwargs):
+    if 'completion_report' in instance.__dict__:
+        release_blob(instance.completion_report.name or '')
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_PREFIX = 'blobs'
+UPLOAD_PREFIX = 'uploads'
+
+
+def blob_name(hexdigest):
+    return f'{BLOB_PREFIX}/{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores each distinct file once, under a path derived from its SHA-256.
+
+    The name a file is saved under only matters to the caller: the bytes are
+    hashed while they stream to a temporary file, and saving content that is
+    already stored returns the existing path instead of writing a copy.
+    Reference counts live in ReportBlob; this class never deletes on its own.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # The real name is only known once the content has been hashed
+        return name
+
+    def _save(self, name, content):
+        directory = self.path(f'{BLOB_PREFIX}/tmp')
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, partial = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    out.write(chunk)
+            name = blob_name(digest.hexdigest())
+            path = self.path(name)
+            if os.path.exists(path):
+                os.remove(partial)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(partial, self.file_permissions_mode)
+                os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return name
+
+    def upload_path(self, upload_id):
+        """Where the bytes of an unfinished chunked upload accumulate"""
+        return self.path(f'{UPLOAD_PREFIX}/{upload_id}.part')
+
+
+def report_storage():
+    return ContentAddressedStorage()
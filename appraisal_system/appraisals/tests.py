@@ -1,3 +1,1343 @@
-from django.test import TestCase
+import asyncio
+import csv
+import glob
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.dashboard import DASHBOARD_CACHE
+from accounts.models import CustomUser, Department
+from appraisal_system.pools import shared_pool
+from .models import (
+    Task, PerformanceRating, Appraisal, AppraisalPeriod, EmployeeScoreRollup, Keyword, NegotiationTicket, Notification,
+    RatingKeyword, ReportBlob,
+)
+from .analytics import ANALYTICS_CACHE, invalidate_period, percentiles
+from .api import RESOURCES
+from .events import broker
+from .exports import stream_csv
+from .keywords import employees_with_keyword, normalize_keywords, top_keywords
+from .pagination import decode_cursor, keyset_paginate
+from .pdf import render_appraisal_pdf, render_many, stream_zip
+from .search import search
+from .reports import dedupe_reports, prune_blobs
+from .rollups import ROLLUP_FIELDS, compute_totals, get_scores, get_scores_bulk
+from .scoring import SCORE_FIELDS, compute_scores, compute_scores_bulk, rating_period_q, task_period_q
+from .utils import create_notification, fan_out_notification, mark_notifications_as_read, process_outbox
+
+HOT_TABLES = {
+    'accounts_customuser',
+    'appraisals_task',
+    'appraisals_performancerating',
+    'appraisals_appraisal',
+    'appraisals_negotiationticket',
+    'appraisals_notification',
+    'appraisals_ratingkeyword',
+}
+FULL_SCAN = re.compile(r'\bSCAN (\w+)')
+# Walking an index in its own order, stopped by a LIMIT
+ORDERED_WALK = re.compile(r'\bSCAN \w+ USING (COVERING )?INDEX \w+$')
+
+
+def seed_org(employees_per_leader=3, tasks_per_employee=4):
+    """Build a small org (HR, manager, two team leaders and their employees) with activity"""
+    department = Department.objects.create(name='Engineering')
+    hr = CustomUser.objects.create_user('hr', role='hr_admin', first_name='Hana', last_name='Reyes')
+    manager = CustomUser.objects.create_user('manager', role='manager', department=department,
+                                             first_name='Mona', last_name='Gale')
+    period = AppraisalPeriod.objects.create(title='Q1', start_date=date.today() - timedelta(days=30),
+                                            end_date=date.today() + timedelta(days=30), created_by=hr)
+    now = timezone.now()
+    leaders, employees = [], []
+    for l in range(2):
+        leader = CustomUser.objects.create_user(f'leader{l}', role='team_leader',
+                                                department=department, manager=manager,
+                                                first_name='Lee', last_name=f'Leader{l}')
+        leaders.append(leader)
+        Task.objects.create(title=f'Plan {l}', description='Plan the quarter', assigned_to=leader,
+                            assigned_by=manager, due_date=now + timedelta(days=3))
+        for e in range(employees_per_leader):
+            employee = CustomUser.objects.create_user(f'emp{l}_{e}', role='employee',
+                                                      department=department, manager=leader,
+                                                      first_name='Emma', last_name=f'Employee{l}{e}')
+            employees.append(employee)
+            for t in range(tasks_per_employee):
+                task = Task.objects.create(title=f'Task {t}', description='Ship the feature', assigned_to=employee,
+                                           assigned_by=leader, due_date=now + timedelta(days=t - 1),
+                                           status='completed' if t % 2 else 'assigned',
+                                           completed_date=now if t % 2 else None)
+                if t % 2:
+                    PerformanceRating.objects.create(employee=employee, manager=leader, task=task,
+                                                     quality_rating='good', timeliness_rating='on_time',
+                                                     overall_rating=80, remarks='Solid work', keywords='teamwork')
+            appraisal = Appraisal.objects.create(employee=employee, period=period, manager=leader,
+                                                 overall_percentage=80, final_remarks='Good quarter',
+                                                 status='submitted' if e % 2 else 'accepted',
+                                                 hr_approved=not e % 2)
+            if e % 2:
+                NegotiationTicket.objects.create(appraisal=appraisal, negotiated_by=employee,
+                                                 employee_reason='I shipped more than this shows')
+            create_notification(employee, 'appraisal_created', 'Appraisal created',
+                                'Your appraisal is ready', appraisal)
+    return {'hr': hr, 'manager': manager, 'leaders': leaders, 'employees': employees, 'period': period}
+
+
+def legacy_scores(employee, appraisal):
+    """The per-row Python calculation compute_scores replaced, kept as its reference"""
+    ratings = PerformanceRating.objects.filter(employee=employee)
+    if ratings.exists():
+        appraisal.overall_percentage = sum(r.overall_rating for r in ratings) / ratings.count()
+        tasks = Task.objects.filter(assigned_to=employee)
+        if tasks.exists():
+            completed_tasks = tasks.filter(status='completed').count()
+            appraisal.task_completion_score = (completed_tasks / tasks.count()) * 100
+            quality_scores = {'excellent': 100, 'good': 80, 'average': 60, 'below_average': 40, 'poor': 20}
+            timeliness_scores = {'on_time': 100, 'slightly_late': 80, 'late': 60, 'very_late': 40}
+            appraisal.quality_score = sum(quality_scores.get(r.quality_rating, 0) for r in ratings) / ratings.count()
+            appraisal.timeliness_score = (sum(timeliness_scores.get(r.timeliness_rating, 0) for r in ratings)
+                                          / ratings.count())
+    return appraisal
+
+
+class ScoringTests(TestCase):
+    """compute_scores must give the same appraisal scores as the old per-row calculation"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = CustomUser.objects.create_user('hr', role='hr_admin')
+        cls.leader = CustomUser.objects.create_user('leader', role='team_leader')
+        cls.period = AppraisalPeriod.objects.create(title='Q1', start_date=date.today() - timedelta(days=30),
+                                                    end_date=date.today() + timedelta(days=30), created_by=cls.hr)
+        now = timezone.now()
+        cls.employees = {}
+        for name in ('mixed', 'no_tasks', 'no_ratings', 'idle'):
+            cls.employees[name] = CustomUser.objects.create_user(name, role='employee', manager=cls.leader)
+
+        mixed = cls.employees['mixed']
+        for i, status in enumerate(['completed', 'completed', 'assigned', 'in_progress', 'overdue']):
+            Task.objects.create(title=f'Task {i}', description='Work', assigned_to=mixed, assigned_by=cls.leader,
+                                due_date=now + timedelta(days=i - 2), status=status,
+                                completed_date=now if status == 'completed' else None)
+        ratings = [('excellent', 'on_time', 95), ('good', 'slightly_late', 81.5), ('poor', 'very_late', 22),
+                   ('below_average', 'late', 47)]
+        for quality, timeliness, overall in ratings:
+            PerformanceRating.objects.create(employee=mixed, manager=cls.leader, quality_rating=quality,
+                                             timeliness_rating=timeliness, overall_rating=overall,
+                                             remarks='Reviewed', keywords='')
+        PerformanceRating.objects.create(employee=cls.employees['no_tasks'], manager=cls.leader,
+                                         quality_rating='average', timeliness_rating='late', overall_rating=60,
+                                         remarks='Reviewed', keywords='')
+        Task.objects.create(title='Unrated', description='Work', assigned_to=cls.employees['no_ratings'],
+                            assigned_by=cls.leader, due_date=now, status='completed', completed_date=now)
+
+    def blank_appraisal(self, employee):
+        # Sentinel scores show which fields a calculation leaves alone
+        return Appraisal(employee=employee, period=self.period, manager=self.leader, overall_percentage=-1,
+                         task_completion_score=-1, quality_score=-1, timeliness_score=-1)
+
+    def scores(self, appraisal):
+        return {field: getattr(appraisal, field) for field in SCORE_FIELDS}
+
+    def test_matches_the_per_row_calculation(self):
+        for name, employee in self.employees.items():
+            expected = self.scores(legacy_scores(employee, self.blank_appraisal(employee)))
+            actual = self.scores(compute_scores(employee).apply(self.blank_appraisal(employee)))
+            self.assertEqual(actual.keys(), expected.keys())
+            for field, value in expected.items():
+                self.assertAlmostEqual(actual[field], value, places=6, msg=f'{name}.{field}')
+
+    def test_calculate_scores_saves_the_result(self):
+        mixed = self.employees['mixed']
+        appraisal = self.blank_appraisal(mixed)
+        appraisal.save()
+        result = appraisal.calculate_scores()
+        self.assertEqual((result.rating_count, result.total_tasks, result.completed_tasks), (4, 5, 2))
+        appraisal.refresh_from_db()
+        self.assertAlmostEqual(appraisal.task_completion_score, 40.0)
+        self.assertAlmostEqual(appraisal.overall_percentage, (95 + 81.5 + 22 + 47) / 4)
+
+    def test_query_counts(self):
+        with self.assertNumQueries(1):
+            compute_scores(self.employees['mixed'])
+        with self.assertNumQueries(2):
+            compute_scores(self.employees['no_ratings'])
+        ids = [employee.pk for employee in self.employees.values()]
+        with self.assertNumQueries(2):
+            results = compute_scores_bulk(ids)
+        self.assertEqual(set(results), set(ids))
+        for name, employee in self.employees.items():
+            single = compute_scores(employee)
+            bulk = results[employee.pk]
+            for attr in ('rating_count', 'total_tasks', 'completed_tasks'):
+                self.assertEqual(getattr(bulk, attr), getattr(single, attr), f'{name}.{attr}')
+            for attr in ('overall', 'quality', 'timeliness'):
+                self.assertAlmostEqual(getattr(bulk, attr), getattr(single, attr), msg=f'{name}.{attr}')
+
+
+class GenerateAppraisalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2)
+        Appraisal.objects.all().delete()
+        cls.orphan = CustomUser.objects.create_user('orphan', role='employee',
+                                                    department=cls.org['leaders'][0].department)
+
+    def generate(self, **options):
+        out = io.StringIO()
+        call_command('generate_appraisals', period=self.org['period'].pk, chunk_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_creates_scored_appraisals_and_skips_employees_without_a_manager(self):
+        output = self.generate()
+        appraised = self.org['employees'] + self.org['leaders']
+        self.assertIn(f'created {len(appraised)}, refreshed 0, skipped 1', output)
+        self.assertEqual(set(Appraisal.objects.values_list('employee', flat=True)), {user.pk for user in appraised})
+        self.assertFalse(Appraisal.objects.filter(employee=self.orphan).exists())
+        appraisal = Appraisal.objects.get(employee=self.org['employees'][0])
+        self.assertEqual((appraisal.manager, appraisal.status), (self.org['leaders'][0], 'submitted'))
+        self.assertEqual(appraisal.overall_percentage, 80)
+        self.assertEqual(appraisal.task_completion_score, 50)
+        self.assertEqual(search(self.org['hr'], 'generated automatically', kind='appraisal')[0]['kind'], 'appraisal')
+
+    def test_second_run_creates_nothing(self):
+        self.generate()
+        ids = set(Appraisal.objects.values_list('pk', flat=True))
+        self.assertIn('created 0, refreshed 0, skipped 1', self.generate())
+        self.assertEqual(set(Appraisal.objects.values_list('pk', flat=True)), ids)
+
+    def test_resumes_after_an_interrupted_run(self):
+        first = self.org['employees'][0]
+        Appraisal.objects.create(employee=first, period=self.org['period'], manager=first.manager,
+                                 overall_percentage=10, final_remarks='Written by hand')
+        self.assertIn('created 5,', self.generate())
+        self.assertEqual(Appraisal.objects.get(employee=first).overall_percentage, 10)
+
+    def test_refresh_rescores_only_open_appraisals(self):
+        draft, approved = self.org['employees'][:2]
+        for employee, hr_approved in ((draft, False), (approved, True)):
+            Appraisal.objects.create(employee=employee, period=self.org['period'], manager=employee.manager,
+                                     overall_percentage=10, final_remarks='Stale', status='submitted',
+                                     hr_approved=hr_approved)
+        self.assertIn('created 4, refreshed 1,', self.generate(refresh=True))
+        self.assertEqual(Appraisal.objects.get(employee=draft).overall_percentage, 80)
+        self.assertEqual(Appraisal.objects.get(employee=approved).overall_percentage, 10)
+
+    def test_appraisal_created_meanwhile_is_left_alone(self):
+        racer = self.org['employees'][0]
+        real_scores = get_scores_bulk
+
+        def scores_then_race(employee_ids, period):
+            # Another writer inserts between our read of existing rows and the INSERT
+            if racer.pk in employee_ids:
+                Appraisal.objects.get_or_create(employee=racer, period=period, defaults={
+                    'manager': racer.manager, 'overall_percentage': 10, 'final_remarks': 'Racer'})
+            return real_scores(employee_ids, period)
+
+        with mock.patch('appraisals.generation.get_scores_bulk', scores_then_race):
+            self.generate()
+        self.assertEqual(Appraisal.objects.filter(employee=racer).count(), 1)
+        self.assertEqual(Appraisal.objects.get(employee=racer).final_remarks, 'Racer')
+        self.assertEqual(Appraisal.objects.count(), 6)
+
+
+class PeriodWindowTests(TestCase):
+    """A period covers every moment of its first and last day and nothing either side"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = CustomUser.objects.create_user('hr', role='hr_admin')
+        cls.leader = CustomUser.objects.create_user('leader', role='team_leader')
+        cls.employee = CustomUser.objects.create_user('emp', role='employee', manager=cls.leader)
+        cls.period = AppraisalPeriod.objects.create(title='Q1', start_date=date(2025, 1, 1),
+                                                    end_date=date(2025, 3, 31), created_by=cls.hr)
+        cls.moments = {
+            'day_before_start': cls.at(date(2024, 12, 31), 23, 59),
+            'start_date': cls.at(date(2025, 1, 1), 0, 0),
+            'end_date': cls.at(date(2025, 3, 31), 23, 59),
+            'day_after_end': cls.at(date(2025, 4, 1), 0, 0),
+        }
+
+    @staticmethod
+    def at(day, hour, minute):
+        return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+    def rate(self, name):
+        rating = PerformanceRating.objects.create(employee=self.employee, manager=self.leader,
+                                                  quality_rating='good', timeliness_rating='on_time',
+                                                  overall_rating=80, remarks=name, keywords='')
+        # rating_date is auto_now_add; move it without re-running the save hooks
+        PerformanceRating.objects.filter(pk=rating.pk).update(rating_date=self.moments[name])
+        return rating
+
+    def test_window_is_half_open_over_whole_days(self):
+        start, end = self.period.window()
+        self.assertEqual(start, self.moments['start_date'])
+        self.assertEqual(end, self.moments['day_after_end'])
+
+    def test_ratings_on_the_boundaries(self):
+        for name in self.moments:
+            self.rate(name)
+        in_period = PerformanceRating.objects.filter(rating_period_q(self.period))
+        self.assertEqual(sorted(in_period.values_list('remarks', flat=True)), ['end_date', 'start_date'])
+        self.assertEqual(compute_scores(self.employee, self.period).rating_count, 2)
+
+    def test_tasks_due_or_completed_on_the_boundaries(self):
+        outside = self.moments['day_before_start']
+        cases = {
+            'due_on_start': (self.moments['start_date'], None),
+            'due_on_end': (self.moments['end_date'], None),
+            'due_before_completed_on_start': (outside, self.moments['start_date']),
+            'due_after_end': (self.moments['day_after_end'], None),
+            'due_and_completed_outside': (outside, self.moments['day_after_end']),
+        }
+        for title, (due, completed) in cases.items():
+            Task.objects.create(title=title, description='Work', assigned_to=self.employee, assigned_by=self.leader,
+                                due_date=due, completed_date=completed,
+                                status='completed' if completed else 'assigned')
+        in_period = Task.objects.filter(task_period_q(self.period))
+        self.assertEqual(sorted(in_period.values_list('title', flat=True)),
+                         ['due_before_completed_on_start', 'due_on_end', 'due_on_start'])
+        result = compute_scores(self.employee, self.period)
+        self.assertEqual((result.total_tasks, result.completed_tasks), (3, 1))
+
+    def test_no_period_means_all_time(self):
+        for name in self.moments:
+            self.rate(name)
+        Task.objects.create(title='Old', description='Work', assigned_to=self.employee, assigned_by=self.leader,
+                            due_date=self.moments['day_before_start'])
+        self.assertEqual(rating_period_q(None), models.Q())
+        self.assertEqual(task_period_q(None), models.Q())
+        result = compute_scores(self.employee)
+        self.assertEqual((result.rating_count, result.total_tasks), (4, 1))
+
+
+class ScoreRollupTests(TestCase):
+    """Signal-driven F() deltas must keep every rollup equal to a rebuild from the raw rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = CustomUser.objects.create_user('hr', role='hr_admin')
+        cls.leader = CustomUser.objects.create_user('leader', role='team_leader')
+        cls.employee = CustomUser.objects.create_user('emp', role='employee', manager=cls.leader)
+        today = date.today()
+        cls.current = AppraisalPeriod.objects.create(title='Current', start_date=today - timedelta(days=30),
+                                                     end_date=today + timedelta(days=30), created_by=cls.hr)
+        cls.previous = AppraisalPeriod.objects.create(title='Previous', start_date=today - timedelta(days=120),
+                                                      end_date=today - timedelta(days=60), created_by=cls.hr)
+        cls.in_previous = timezone.now() - timedelta(days=90)
+
+    def rollup(self, period):
+        return EmployeeScoreRollup.objects.filter(employee=self.employee, period=period).values(*ROLLUP_FIELDS).first()
+
+    def assertInSync(self):
+        for period in (self.current, self.previous):
+            expected = compute_totals(period, [self.employee.pk]).get(self.employee.pk)
+            rollup = self.rollup(period)
+            if rollup is None:
+                self.assertIsNone(expected, period.title)
+            else:
+                self.assertEqual(rollup, expected or dict.fromkeys(ROLLUP_FIELDS, 0), period.title)
+
+    def rate(self, quality='good', timeliness='on_time', overall=80):
+        return PerformanceRating.objects.create(employee=self.employee, manager=self.leader, quality_rating=quality,
+                                                timeliness_rating=timeliness, overall_rating=overall,
+                                                remarks='Reviewed', keywords='')
+
+    def assign(self, **fields):
+        fields.setdefault('due_date', timezone.now())
+        return Task.objects.create(title='Task', description='Work', assigned_to=self.employee,
+                                   assigned_by=self.leader, **fields)
+
+    def test_first_change_seeds_the_rollup_from_raw_rows(self):
+        # bulk_create sends no signals, like rows written before rollups existed
+        PerformanceRating.objects.bulk_create([PerformanceRating(
+            employee=self.employee, manager=self.leader, quality_rating='poor', timeliness_rating='late',
+            overall_rating=20, remarks='Old', keywords='')])
+        self.assertIsNone(self.rollup(self.current))
+        self.rate()
+        self.assertEqual(self.rollup(self.current), {
+            'rating_count': 2, 'overall_sum': 100, 'quality_points_sum': 100, 'timeliness_points_sum': 160,
+            'task_count': 0, 'completed_task_count': 0,
+        })
+        self.assertIsNone(self.rollup(self.previous))
+        self.assertInSync()
+
+    def test_creates_and_status_changes(self):
+        self.rate(quality='excellent', timeliness='slightly_late', overall=90)
+        task = self.assign()
+        self.assertEqual(self.rollup(self.current)['task_count'], 1)
+        self.assertEqual(self.rollup(self.current)['completed_task_count'], 0)
+        task.status, task.completed_date = 'completed', timezone.now()
+        task.save()
+        self.assertEqual(self.rollup(self.current)['completed_task_count'], 1)
+        task.save()
+        self.assertEqual(self.rollup(self.current)['completed_task_count'], 1)
+        self.assertInSync()
+        self.assertEqual(get_scores(self.employee, self.current).task_completion, 100)
+
+    def test_rating_moved_into_another_period(self):
+        kept, moved = self.rate(), self.rate(overall=40)
+        moved.rating_date = self.in_previous
+        moved.save()
+        self.assertEqual(self.rollup(self.current)['rating_count'], 1)
+        self.assertEqual(self.rollup(self.current)['overall_sum'], kept.overall_rating)
+        self.assertEqual(self.rollup(self.previous)['rating_count'], 1)
+        self.assertEqual(self.rollup(self.previous)['overall_sum'], 40)
+        self.assertInSync()
+
+    def test_task_completed_in_a_later_period_counts_in_both(self):
+        task = self.assign(due_date=self.in_previous)
+        task.status, task.completed_date = 'completed', timezone.now()
+        task.save()
+        self.assertEqual(self.rollup(self.previous)['completed_task_count'], 1)
+        self.assertEqual(self.rollup(self.current)['completed_task_count'], 1)
+        self.assertInSync()
+
+    def test_deletes(self):
+        rating, other = self.rate(), self.rate(overall=60)
+        task = self.assign(status='completed', completed_date=timezone.now())
+        rating.delete()
+        task.delete()
+        self.assertEqual(self.rollup(self.current), {
+            'rating_count': 1, 'overall_sum': 60, 'quality_points_sum': 80, 'timeliness_points_sum': 100,
+            'task_count': 0, 'completed_task_count': 0,
+        })
+        other.delete()
+        self.assertInSync()
+
+    def test_rebuild_command_finds_and_repairs_drift(self):
+        self.rate()
+        self.assign()
+        EmployeeScoreRollup.objects.filter(employee=self.employee).update(rating_count=F('rating_count') + 5,
+                                                                          task_count=0)
+        out = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 rollups out of sync'):
+            call_command('rebuild_rollups', check=True, stdout=out)
+        self.assertIn('Current: found drift for 1 employees', out.getvalue())
+        self.assertEqual(self.rollup(self.current)['rating_count'], 6)
+
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertInSync()
+        out = io.StringIO()
+        call_command('rebuild_rollups', check=True, stdout=out)
+        self.assertIn('Done, 0 rollups out of sync.', out.getvalue())
+
+
+class QueryPlanTests(TestCase):
+    """Every hot query must be answered from an index, never a full table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org()
+
+    def setUp(self):
+        # Cached dashboard panels would hide the queries under test
+        caches[DASHBOARD_CACHE].clear()
+
+    def full_scans(self, plan):
+        return [line for line in plan.splitlines() if (m := FULL_SCAN.search(line)) and m.group(1) in HOT_TABLES]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+
+    def assertIndexedQueries(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertIn(response.status_code, (200, 302))
+        for query in ctx.captured_queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(self.full_scans(self.explain(query['sql'])), [],
+                                 f"{url} as {user.role}: {query['sql']}")
+
+    def test_hot_filters_use_indexes(self):
+        employee = self.org['employees'][0]
+        leader = self.org['leaders'][0]
+        querysets = [
+            Task.objects.filter(assigned_to=employee, status='completed'),
+            Task.objects.filter(assigned_by=leader).order_by('-created_at'),
+            Notification.objects.filter(recipient=employee, is_read=False),
+            Appraisal.objects.filter(status='submitted', hr_approved=False).order_by('-created_at', '-id'),
+            Appraisal.objects.filter(status='accepted', hr_approved=True).order_by('-created_at', '-id'),
+            NegotiationTicket.objects.filter(status__in=['open', 'in_review']),
+            CustomUser.objects.filter(role='hr_admin'),
+            Task.objects.filter(status__in=['assigned', 'in_progress'], due_date__lt=timezone.now()),
+            employees_with_keyword('teamwork', self.org['period']),
+            top_keywords(employee.department, self.org['period']),
+        ]
+        for queryset in querysets:
+            self.assertEqual(self.full_scans(queryset.explain()), [], str(queryset.query))
+
+    def test_dashboards(self):
+        for user in [self.org['employees'][0], self.org['leaders'][0], self.org['manager'], self.org['hr']]:
+            self.assertIndexedQueries(user, reverse('dashboard'))
+
+    def test_task_lists(self):
+        for user in [self.org['employees'][0], self.org['leaders'][0], self.org['manager']]:
+            self.assertIndexedQueries(user, reverse('task_list'))
+
+    def test_appraisal_pages(self):
+        appraisal = Appraisal.objects.filter(employee=self.org['employees'][1]).get()
+        self.assertIndexedQueries(self.org['hr'], reverse('view_appraisal', args=[appraisal.id]))
+        self.assertIndexedQueries(appraisal.employee, reverse('view_appraisal', args=[appraisal.id]))
+        self.assertIndexedQueries(appraisal.employee, reverse('negotiate_appraisal', args=[appraisal.id]))
+
+    def test_api_pages(self):
+        # Scopes that are an OR of two foreign keys merge two index seeks and
+        # sort the user's own rows; every other page reads straight off an index
+        merged = {('team_leader', 'tasks'), ('team_leader', 'ratings'), ('team_leader', 'appraisals'),
+                  ('manager', 'ratings'), ('manager', 'appraisals')}
+        for user in [self.org['employees'][0], self.org['leaders'][0], self.org['manager'], self.org['hr']]:
+            self.client.force_login(user)
+            for resource in RESOURCES:
+                first = self.client.get(reverse('api_list', args=[resource]), {'limit': 1}).json()
+                for cursor in ['', first['next_cursor'] or '']:
+                    with CaptureQueriesContext(connection) as ctx:
+                        self.client.get(reverse('api_list', args=[resource]), {'limit': 1, 'cursor': cursor})
+                    for query in ctx.captured_queries:
+                        if 'updated_at' not in query['sql']:
+                            continue
+                        plan = self.explain(query['sql'])
+                        walks = [line for line in plan.splitlines()
+                                 if ORDERED_WALK.search(line) and 'LIMIT' in query['sql']]
+                        self.assertEqual([line for line in self.full_scans(plan) if line not in walks], [],
+                                         f'{resource} as {user.role}: {plan}')
+                        if (user.role, resource) not in merged:
+                            self.assertNotIn('TEMP B-TREE', plan, f'{resource} as {user.role}')
+
+    def test_rating_and_task_forms(self):
+        leader = self.org['leaders'][0]
+        self.assertIndexedQueries(leader, reverse('rate_employee', args=[self.org['employees'][0].id]))
+        self.assertIndexedQueries(leader, reverse('create_task'))
+
+
+class ListQueryBudgetTests(TestCase):
+    """List pages must not issue a query per row they render"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=4, tasks_per_employee=6)
+
+    def assertBudget(self, user, url, budget):
+        self.client.force_login(user)
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_budgets(self):
+        budgets = [
+            (self.org['employees'][0], 3),
+            (self.org['leaders'][0], 6),
+            (self.org['manager'], 4),
+            (self.org['hr'], 2),
+        ]
+        for user, budget in budgets:
+            with self.subTest(role=user.role):
+                self.assertBudget(user, reverse('task_list'), budget)
+
+    def test_appraisal_and_form_budgets(self):
+        leader = self.org['leaders'][0]
+        appraisal = Appraisal.objects.filter(employee=self.org['employees'][0]).get()
+        self.assertBudget(self.org['hr'], reverse('view_appraisal', args=[appraisal.id]), 3)
+        self.assertBudget(leader, reverse('rate_employee', args=[self.org['employees'][0].id]), 4)
+        self.assertBudget(leader, reverse('create_task'), 3)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=7)
+        cls.employee = cls.org['employees'][0]
+        # Identical timestamps must still page deterministically through the id tie-breaker
+        Task.objects.filter(assigned_to=cls.employee).update(created_at=timezone.now())
+
+    def test_pages_cover_every_row_once(self):
+        tasks = Task.objects.filter(assigned_to=self.employee)
+        seen, cursor = [], None
+        while True:
+            page = keyset_paginate(tasks, cursor, per_page=3)
+            seen.extend(task.id for task in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, list(tasks.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_deep_page_is_an_index_seek(self):
+        page = keyset_paginate(Task.objects.filter(assigned_to=self.employee), per_page=3)
+        position = decode_cursor(page.next_cursor)
+        queryset = (Task.objects.filter(assigned_to=self.employee, created_at__lte=position[0])
+                    .exclude(created_at=position[0], pk__gte=position[1]).order_by('-created_at', '-pk'))
+        plan = queryset.explain()
+        self.assertIn('task_assignee_feed_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_task_list_filters_and_cursor(self):
+        self.client.force_login(self.employee)
+        response = self.client.get(reverse('task_list'), {'status': 'completed'})
+        self.assertEqual({task.status for task in response.context['tasks']}, {'completed'})
+        response = self.client.get(reverse('task_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+
+
+class NotificationFanOutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=1)
+        cls.recipients = CustomUser.objects.filter(role='employee')
+
+    def test_fan_out_is_one_insert(self):
+        # recipient ids, then one INSERT and one counter UPDATE inside a savepoint
+        with self.assertNumQueries(5):
+            sent = fan_out_notification(self.recipients, 'appraisal_created', 'Hello', 'Body')
+        self.assertEqual(sent, 4)
+        self.assertEqual(Notification.objects.filter(title='Hello').count(), 4)
+
+    @override_settings(NOTIFICATION_OUTBOX=True)
+    def test_outbox_defers_delivery(self):
+        fan_out_notification(self.recipients, 'appraisal_created', 'Later', 'Body')
+        self.assertFalse(Notification.objects.filter(title='Later').exists())
+        self.assertEqual(process_outbox(), (1, 4))
+        self.assertEqual(Notification.objects.filter(title='Later').count(), 4)
+        self.assertEqual(process_outbox(), (0, 0))
+
+
+class UnreadCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=1)
+        cls.user = cls.org['employees'][0]
+        for n in range(3):
+            create_notification(cls.user, 'appraisal_created', f'Note {n}', 'Body')
+
+    def unread(self):
+        self.user.refresh_from_db(fields=['unread_notification_count'])
+        return self.user.unread_notification_count
+
+    def test_counter_follows_creation_and_reads(self):
+        self.assertEqual(self.unread(), 4)
+        first = self.user.notifications.filter(title='Note 0').get()
+        self.assertEqual(mark_notifications_as_read(self.user, [first.id]), 1)
+        self.assertEqual(mark_notifications_as_read(self.user, [first.id]), 0)
+        self.assertEqual(self.unread(), 3)
+        self.assertEqual(mark_notifications_as_read(self.user), 3)
+        self.assertEqual(self.unread(), 0)
+
+    def test_deleting_unread_notification_releases_count(self):
+        self.user.notifications.filter(title='Note 1').delete()
+        self.assertEqual(self.unread(), 3)
+
+    def test_mark_read_endpoints(self):
+        self.client.force_login(self.user)
+        ids = list(self.user.notifications.values_list('id', flat=True)[:2])
+        response = self.client.post(reverse('mark_notifications_read'), {'ids': ids})
+        self.assertEqual(response.json(), {'status': 'success', 'marked': 2, 'unread_count': 2})
+        response = self.client.post(reverse('mark_notifications_read'))
+        self.assertEqual(response.json()['unread_count'], 0)
+        with self.assertNumQueries(3):  # session, user, one page of notifications
+            self.client.get(reverse('notifications'))
+
+
+class KeywordIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+
+    def tags(self, rating):
+        return sorted(rating.keyword_tags.values_list('name', flat=True))
+
+    def test_normalization(self):
+        self.assertEqual(normalize_keywords(' Leadership,team  Work,, leadership ,'), ['leadership', 'team work'])
+        self.assertEqual(normalize_keywords(''), [])
+
+    def test_saves_keep_the_index_in_sync(self):
+        rating = PerformanceRating.objects.filter(employee=self.org['employees'][0]).get()
+        self.assertEqual(self.tags(rating), ['teamwork'])
+        rating.keywords = 'Leadership, TEAMWORK, ownership'
+        rating.save()
+        self.assertEqual(self.tags(rating), ['leadership', 'ownership', 'teamwork'])
+        link = rating.keyword_links.first()
+        self.assertEqual((link.employee_id, link.rating_date), (rating.employee_id, rating.rating_date))
+        rating.delete()
+        self.assertFalse(RatingKeyword.objects.filter(rating_id=link.rating_id).exists())
+
+    def test_backfill_indexes_bulk_created_ratings(self):
+        employee, leader = self.org['employees'][1], self.org['leaders'][0]
+        PerformanceRating.objects.bulk_create([
+            PerformanceRating(employee=employee, manager=leader, quality_rating='good', timeliness_rating='on_time',
+                              overall_rating=70, remarks='Bulk', keywords='Mentoring, teamwork'),
+        ])
+        Keyword.objects.create(name='unused')
+        out = io.StringIO()
+        call_command('backfill_rating_keywords', batch_size=2, stdout=out)
+        self.assertIn('Indexed 6 keywords on 5 ratings; removed 1 unused keywords.', out.getvalue())
+        self.assertEqual(RatingKeyword.objects.filter(keyword__name='mentoring').count(), 1)
+        # Re-running writes the same links again rather than duplicating them
+        call_command('backfill_rating_keywords', stdout=io.StringIO())
+        self.assertEqual(RatingKeyword.objects.count(), 6)
+
+    def test_keyword_queries(self):
+        period, leader = self.org['period'], self.org['leaders'][0]
+        first = self.org['employees'][0]
+        PerformanceRating.objects.create(employee=first, manager=leader, quality_rating='good',
+                                         timeliness_rating='on_time', overall_rating=90, remarks='More',
+                                         keywords='teamwork, leadership')
+        rows = list(employees_with_keyword(' TeamWork ', period))
+        self.assertEqual([(row['employee'], row['ratings']) for row in rows][0], (first.pk, 2))
+        self.assertEqual(len(rows), 4)
+        top = list(top_keywords(first.department, period, limit=1))
+        self.assertEqual(top, [{'keyword__name': 'teamwork', 'ratings': 5, 'employees': 4}])
+
+        self.client.force_login(self.org['hr'])
+        response = self.client.get(reverse('department_keywords', args=[period.id, first.department_id]))
+        self.assertEqual([row['keyword'] for row in response.json()['keywords']], ['teamwork', 'leadership'])
+        response = self.client.get(reverse('keyword_employees', args=[period.id]), {'keyword': 'leadership'})
+        self.assertEqual([row['id'] for row in response.json()['employees']], [first.pk])
+        self.client.force_login(first)
+        self.assertEqual(self.client.get(reverse('keyword_employees', args=[period.id])).status_code, 403)
+
+
+class SearchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+
+    def found(self, user, text, kind=None):
+        return {(result['kind'], result['id']) for result in search(user, text, kind)}
+
+    def test_roles_only_see_their_rows(self):
+        hr, employee, leader = self.org['hr'], self.org['employees'][1], self.org['leaders'][0]
+        # "shipped" in the ticket stems to the same term as "Ship" in the task descriptions
+        everything = self.found(hr, 'ship')
+        self.assertEqual(len(everything), 8 + 2)
+        own = self.found(employee, 'ship')
+        ticket = NegotiationTicket.objects.get(appraisal__employee=employee)
+        self.assertEqual(own, {('task', pk) for pk in employee.assigned_tasks.values_list('pk', flat=True)}
+                         | {('ticket', ticket.pk)})
+        self.assertEqual(len(self.found(leader, 'ship', kind='task')), 4)
+        # A trailing * matches a prefix; "quarter" is in the plan tasks and the appraisals
+        self.assertEqual(self.found(hr, 'qua'), set())
+        self.assertEqual(self.found(hr, 'qua*'), self.found(hr, 'quarter'))
+        self.assertEqual({kind for kind, _ in self.found(hr, 'quarter', kind='appraisal')}, {'appraisal'})
+
+    def test_saves_and_deletes_update_the_index(self):
+        hr = self.org['hr']
+        task = Task.objects.filter(assigned_to=self.org['employees'][0]).first()
+        task.description = 'Migrate the <legacy> billing system'
+        task.save()
+        [result] = search(hr, 'billing')
+        self.assertEqual((result['kind'], result['id']), ('task', task.pk))
+        self.assertEqual(result['snippet'], 'Migrate the &lt;legacy&gt; <mark>billing</mark> system')
+        self.assertNotIn(('task', task.pk), self.found(hr, 'feature'))
+        task.delete()
+        self.assertEqual(search(hr, 'billing'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM appraisals_search')
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 10 tasks, 4 ratings, 4 appraisals, 2 tickets', out.getvalue())
+        self.assertEqual(len(self.found(self.org['hr'], 'solid')), 4)
+
+    def test_search_endpoint(self):
+        employee = self.org['employees'][1]
+        self.client.force_login(employee)
+        with self.assertNumQueries(3):  # session, user, one MATCH
+            response = self.client.get(reverse('search'), {'q': 'more than', 'limit': 5})
+        [result] = response.json()['results']
+        self.assertEqual(result['kind'], 'ticket')
+        self.assertEqual(result['url'], reverse('view_appraisal', args=[result['appraisal_id']]))
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'x', 'kind': 'user'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': '"*'}).json(), {'results': []})
+
+    def test_admin_search_uses_the_index(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'pw', role='hr_admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:appraisals_performancerating_changelist'), {'q': 'solid'})
+        self.assertEqual(response.context['cl'].result_count, 4)
+
+
+class LiveNotificationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=1)
+        cls.user = cls.org['employees'][0]
+        cls.first = create_notification(cls.user, 'appraisal_created', 'First', 'Body')
+
+    def notify(self, title='Live'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_notification(self.user, 'appraisal_created', title, 'Body')
+
+    async def test_subscribers_get_the_notification_and_count_after_commit(self):
+        subscription = broker.subscribe(self.user.pk)
+        try:
+            notification = await sync_to_async(self.notify)()
+            created = await subscription.get(1)
+            unread = await subscription.get(1)
+            self.assertIsNone(await subscription.get(0.01))
+        finally:
+            broker.unsubscribe(subscription)
+        self.assertEqual(created['id'], notification.pk)
+        self.assertEqual(created['data']['title'], 'Live')
+        self.assertEqual(unread, {'event': 'unread', 'data': {'unread_count': 3}})
+        self.assertEqual(broker.listening([self.user.pk]), set())
+
+    def test_poll_answers_at_once_when_behind(self):
+        self.client.force_login(self.user)
+        later = create_notification(self.user, 'appraisal_created', 'Later', 'Body')
+        response = self.client.get(reverse('notification_poll'), {'after': self.first.pk})
+        data = response.json()
+        self.assertEqual([n['id'] for n in data['notifications']], [later.pk])
+        self.assertEqual((data['unread_count'], data['last_id']), (3, later.pk))
+        # Up to date: waits out the timeout and returns the newest id to poll from
+        data = self.client.get(reverse('notification_poll'), {'timeout': 0}).json()
+        self.assertEqual((data['notifications'], data['last_id']), ([], later.pk))
+
+    @override_settings(NOTIFICATION_POLL_INTERVAL=30)
+    def test_poll_does_not_wait_under_wsgi(self):
+        self.client.force_login(self.user)
+        with mock.patch('appraisals.events.Subscription.get') as wait:
+            data = self.client.get(reverse('notification_poll'), {'after': self.first.pk, 'timeout': 5}).json()
+        wait.assert_not_called()
+        self.assertEqual((data['notifications'], data['retry_ms']), ([], 30000))
+
+    async def test_poll_wakes_on_a_new_notification(self):
+        await self.async_client.aforce_login(self.user)
+        poll = asyncio.ensure_future(self.async_client.get(reverse('notification_poll'), {'timeout': 5}))
+        while not broker.listening([self.user.pk]):
+            await asyncio.sleep(0.01)
+        notification = await sync_to_async(self.notify)()
+        data = (await poll).json()
+        self.assertEqual([n['id'] for n in data['notifications']], [notification.pk])
+        self.assertEqual(data['unread_count'], 3)
+        self.assertEqual(data['retry_ms'], settings.NOTIFICATION_RETRY_MS)
+
+    async def test_stream_replays_missed_notifications(self):
+        await self.async_client.aforce_login(self.user)
+        later = await sync_to_async(create_notification)(self.user, 'appraisal_created', 'Later', 'Body')
+        response = await self.async_client.get(reverse('notification_stream'),
+                                               headers={'Last-Event-ID': str(self.first.pk)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = response.streaming_content.__aiter__()
+        self.assertTrue((await anext(chunks)).startswith(b'retry: '))
+        self.assertIn(f'id: {later.pk}\nevent: notification\n'.encode(), await anext(chunks))
+        self.assertIn(b'"unread_count":3', await anext(chunks))
+        # A client disconnect cancels the task waiting on the stream
+        waiting = asyncio.ensure_future(anext(chunks))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(broker.listening([self.user.pk]), set())
+
+    def test_stream_needs_asgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('notification_stream')).status_code, 501)
+
+    def test_pages_under_wsgi_poll_without_opening_the_stream(self):
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(reverse('notifications')), 'const streaming = false;')
+
+    async def test_pages_under_asgi_open_the_stream(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('notifications'))
+        self.assertContains(response, 'const streaming = true;')
+
+
+class PeriodPdfExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=1)
+
+    @override_settings(PDF_EXPORT_WORKERS=0)
+    def test_zip_holds_one_letter_per_appraisal(self):
+        self.client.force_login(self.org['hr'])
+        response = self.client.get(reverse('export_period_pdfs', args=[self.org['period'].id]))
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        names = archive.namelist()
+        self.assertEqual(len(names), 4)
+        self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in names))
+
+    def test_pool_renders_in_order(self):
+        rows = [{'id': i, 'employee': f'E{i}', 'manager': 'M', 'period': 'P', 'overall_percentage': i,
+                 'task_completion_score': 0, 'quality_score': 0, 'timeliness_score': 0,
+                 'status': 'Draft', 'final_remarks': ''} for i in range(5)]
+        rendered = list(render_many(rows, workers=2, batch_size=2))
+        self.assertEqual([data['id'] for data, pdf in rendered], list(range(5)))
+        # Later exports reuse the spawned workers rather than forking new ones
+        pool = shared_pool('pdf', 2)
+        self.assertEqual(pool._mp_context.get_start_method(), 'spawn')
+        self.assertEqual(len(list(render_many(rows[:3], workers=2, batch_size=1))), 3)
+        self.assertIs(shared_pool('pdf', 2), pool)
+
+    def test_duplicate_names_are_kept_apart(self):
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(stream_zip([('a.pdf', b'1'), ('a.pdf', b'2')]))))
+        self.assertEqual(archive.namelist(), ['a.pdf', 'a_1.pdf'])
+
+    def test_export_is_hr_only(self):
+        self.client.force_login(self.org['manager'])
+        response = self.client.get(reverse('export_period_pdfs', args=[self.org['period'].id]))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+
+class PdfCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=1)
+        cls.appraisal = Appraisal.objects.filter(employee=cls.org['employees'][0]).get()
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        settings = override_settings(PDF_CACHE_DIR=self.cache_dir.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_login(self.org['hr'])
+        self.url = reverse('generate_appraisal_pdf', args=[self.appraisal.id])
+
+    def test_second_download_is_served_from_disk(self):
+        with mock.patch('appraisals.pdf.render_appraisal_pdf', wraps=render_appraisal_pdf) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_gets_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with mock.patch('appraisals.pdf.render_appraisal_pdf') as render:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        render.assert_not_called()
+
+    def test_saving_the_appraisal_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.appraisal.final_remarks = 'Revised'
+        self.appraisal.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        # The superseded render is dropped rather than left to age out
+        self.assertEqual(len(self.cached_letters()), 1)
+
+    def test_cache_stays_under_its_size_limit(self):
+        pdfs = Appraisal.objects.filter(period=self.org['period']).values_list('id', flat=True)
+        size = len(self.client.get(self.url).content)
+        with override_settings(PDF_CACHE_MAX_BYTES=size):
+            for appraisal_id in pdfs:
+                self.client.get(reverse('generate_appraisal_pdf', args=[appraisal_id]))
+        self.assertEqual(len(self.cached_letters()), 1)
+        self.assertEqual(len(os.listdir(self.cache_dir.name)), 1)
+
+    def test_misses_under_the_limit_do_not_rescan_the_cache(self):
+        self.client.get(self.url)
+        others = Appraisal.objects.exclude(pk=self.appraisal.pk).values_list('id', flat=True)
+        with mock.patch('appraisals.pdf.evict_pdf_cache') as evict:
+            for appraisal_id in others:
+                self.client.get(reverse('generate_appraisal_pdf', args=[appraisal_id]))
+        evict.assert_not_called()
+        self.assertEqual(len(self.cached_letters()), 1 + len(others))
+
+    def cached_letters(self):
+        return glob.glob(os.path.join(self.cache_dir.name, '*', '*.pdf'))
+
+    def test_non_hr_gets_no_letter(self):
+        self.client.force_login(self.appraisal.employee)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('ETag', response)
+
+
+class DepartmentAnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+        cls.department = cls.org['manager'].department
+        cls.url = reverse('department_analytics', args=[cls.org['period'].id, cls.department.id])
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        caches_setting = {**settings.CACHES, ANALYTICS_CACHE: {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.cache_dir.name,
+        }}
+        overridden = override_settings(CACHES=caches_setting)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.client.force_login(self.org['hr'])
+
+    def test_report(self):
+        Appraisal.objects.filter(employee=self.org['employees'][0]).update(overall_percentage=100)
+        report = self.client.get(self.url).json()
+        appraisals = report['appraisals']
+        self.assertEqual(appraisals['count'], 4)
+        self.assertEqual(appraisals['histogram']['90-100'], 1)
+        self.assertEqual(appraisals['histogram']['80-90'], 3)
+        self.assertEqual(appraisals['scores']['overall_percentage']['p50'], 80)
+        self.assertEqual(appraisals['scores']['overall_percentage']['max'], 100)
+        self.assertEqual(appraisals['statuses']['submitted'], 2)
+        self.assertEqual(report['ratings']['count'], 4)
+        self.assertEqual(report['ratings']['quality']['good'], 4)
+        self.assertEqual(report['ratings']['overall_mean'], 80)
+
+    def test_cached_until_an_appraisal_changes(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(4):  # session, user, period, department
+            self.client.get(self.url)
+        appraisal = Appraisal.objects.filter(employee=self.org['employees'][0]).get()
+        appraisal.overall_percentage = 5
+        appraisal.save()
+        report = self.client.get(self.url).json()
+        self.assertEqual(report['appraisals']['histogram']['0-10'], 1)
+
+    def test_invalidation_from_another_process(self):
+        self.client.get(self.url)
+        # A bulk write sends no signals, as when generate_appraisals runs elsewhere
+        Appraisal.objects.filter(employee=self.org['employees'][0]).update(overall_percentage=5)
+        self.assertEqual(self.client.get(self.url).json()['appraisals']['histogram']['0-10'], 0)
+        # That process invalidates through its own client of the shared cache
+        other_process = FileBasedCache(self.cache_dir.name, {})
+        with mock.patch('appraisals.analytics._cache', return_value=other_process):
+            invalidate_period(self.org['period'].id)
+        self.assertEqual(self.client.get(self.url).json()['appraisals']['histogram']['0-10'], 1)
+
+    def test_hr_only(self):
+        self.client.force_login(self.org['manager'])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_percentiles_interpolate(self):
+        self.assertEqual(percentiles([10, 20, 30, 40], points=(50, 100)), {'p50': 25, 'p100': 40})
+        self.assertEqual(percentiles([], points=(50,)), {'p50': None})
+
+
+class CsvExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+
+    def export(self, dataset, **params):
+        self.client.force_login(self.org['hr'])
+        response = self.client.get(reverse('export_csv', args=[dataset]), params)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_appraisals_join_names_in_sql(self):
+        rows = self.export('appraisals', period=self.org['period'].id)
+        header, first = rows[0], dict(zip(rows[0], rows[1]))
+        self.assertEqual(len(rows), 5)
+        self.assertIn('department', header)
+        self.assertEqual(first['employee_name'], 'Emma Employee00')
+        self.assertEqual(first['manager_name'], 'Lee Leader0')
+        self.assertEqual(first['department'], 'Engineering')
+
+    def test_every_dataset_is_one_query(self):
+        for dataset, count in [('appraisals', 4), ('ratings', 4), ('tasks', 10)]:
+            with self.subTest(dataset=dataset), self.assertNumQueries(1):
+                self.assertEqual(len(list(stream_csv(dataset))), count + 1)
+
+    def test_hr_only(self):
+        self.client.force_login(self.org['manager'])
+        self.assertEqual(self.client.get(reverse('export_csv', args=['tasks'])).status_code, 302)
+        self.client.force_login(self.org['hr'])
+        self.assertEqual(self.client.get(reverse('export_csv', args=['users'])).status_code, 404)
+
+
+class ContentAddressedReportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=2)
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings = override_settings(MEDIA_ROOT=self.media.name, REPORT_UPLOAD_CHUNK_SIZE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def pending_task(self, employee):
+        return Task.objects.filter(assigned_to=employee, status='assigned').first()
+
+    def submit(self, employee, content, filename='report.txt'):
+        task = self.pending_task(employee)
+        self.client.force_login(employee)
+        upload = io.BytesIO(content)
+        upload.name = filename
+        self.client.post(reverse('submit_task', args=[task.id]), {'completion_report': upload})
+        task.refresh_from_db()
+        return task
+
+    def test_identical_reports_are_stored_once(self):
+        first = self.submit(self.org['employees'][0], b'same bytes', 'mine.txt')
+        second = self.submit(self.org['employees'][1], b'same bytes', 'theirs.txt')
+        self.assertEqual(first.completion_report.name, second.completion_report.name)
+        self.assertEqual((first.completion_report_name, second.completion_report_name), ('mine.txt', 'theirs.txt'))
+        self.assertEqual(ReportBlob.objects.get().ref_count, 2)
+
+        first.delete()
+        self.assertEqual(ReportBlob.objects.get().ref_count, 1)
+        second.delete()
+        with override_settings(REPORT_UPLOAD_EXPIRY=0):
+            self.assertEqual(prune_blobs(grace=timedelta(0)), (1, 0))
+        self.assertFalse(ReportBlob.objects.exists())
+
+    def test_download_keeps_the_original_filename(self):
+        task = self.submit(self.org['employees'][0], b'quarterly numbers', 'q1.txt')
+        self.client.force_login(self.org['manager'])
+        response = self.client.get(reverse('download_task_report', args=[task.id]))
+        self.assertEqual(b''.join(response.streaming_content), b'quarterly numbers')
+        self.assertIn('q1.txt', response['Content-Disposition'])
+        self.client.force_login(self.org['employees'][1])
+        self.assertEqual(self.client.get(reverse('download_task_report', args=[task.id])).status_code, 403)
+
+    def test_chunked_upload_resumes_at_the_stored_offset(self):
+        employee = self.org['employees'][0]
+        self.client.force_login(employee)
+        content = b'0123456789'
+        upload = self.client.post(reverse('start_report_upload'), {'filename': 'big.txt', 'size': len(content)}).json()
+        self.assertEqual(upload['chunk_size'], 4)
+
+        put = lambda offset, body: self.client.put(upload['url'], body, content_type='application/octet-stream',
+                                                    HTTP_UPLOAD_OFFSET=str(offset))
+        self.assertEqual(put(0, content[:4]).json()['offset'], 4)
+        # A retried chunk is refused with the offset to resume from
+        retry = put(0, content[:4])
+        self.assertEqual((retry.status_code, retry.json()['offset']), (409, 4))
+        self.assertEqual(put(4, content[4:] + b'extra').status_code, 400)
+        self.assertEqual(self.client.get(upload['url']).json()['offset'], 4)
+        self.assertTrue(put(4, content[4:]).json()['complete'])
+
+        task = self.pending_task(employee)
+        self.client.post(reverse('submit_task', args=[task.id]), {'upload_id': upload['upload_id']})
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.completion_report_name, 'big.txt')
+        with task.completion_report.open('rb') as report:
+            self.assertEqual(report.read(), content)
+
+    def test_uploads_belong_to_their_owner(self):
+        self.client.force_login(self.org['employees'][0])
+        upload = self.client.post(reverse('start_report_upload'), {'filename': 'a.txt', 'size': 3}).json()
+        self.client.force_login(self.org['employees'][1])
+        self.assertEqual(self.client.get(upload['url']).status_code, 404)
+
+    def test_dedupe_moves_legacy_reports(self):
+        tasks = list(Task.objects.filter(status='completed')[:2])
+        os.makedirs(os.path.join(self.media.name, 'task_reports'))
+        for index, task in enumerate(tasks):
+            name = f'task_reports/legacy{index}.txt'
+            with open(os.path.join(self.media.name, name), 'wb') as legacy:
+                legacy.write(b'old report')
+            Task.objects.filter(pk=task.pk).update(completion_report=name)
+
+        self.assertEqual(dedupe_reports(delete_originals=True), (2, 2))
+        names = set(Task.objects.filter(pk__in=[t.pk for t in tasks]).values_list('completion_report', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names.pop().startswith('blobs/'))
+        self.assertEqual(ReportBlob.objects.get().ref_count, 2)
+        self.assertEqual(os.listdir(os.path.join(self.media.name, 'task_reports')), [])
+
+
+class OverdueTaskTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Task 0 of every employee is open and a day past due, task 1 completed on time
+        cls.org = seed_org(employees_per_leader=1, tasks_per_employee=2)
+
+    def test_annotation_matches_the_property(self):
+        late = Task.objects.filter(status='completed').first()
+        Task.objects.filter(pk=late.pk).update(completed_date=late.due_date + timedelta(hours=1))
+        for task in Task.objects.with_completion_status():
+            with self.subTest(task=task.title):
+                self.assertEqual(task.completion_state, Task.objects.get(pk=task.pk).completion_status)
+        counts = dict(Task.objects.with_completion_status().values_list('completion_state')
+                      .annotate(n=models.Count('pk')).order_by())
+        self.assertEqual(counts, {'overdue': 2, 'late': 1, 'on_time': 1, 'pending': 2})
+
+    def test_sweep_is_one_update(self):
+        with self.assertNumQueries(1):
+            swept = Task.objects.sweep_overdue()
+        self.assertEqual(swept, 2)
+        self.assertEqual(Task.objects.filter(status='overdue').count(), 2)
+        self.assertEqual(Task.objects.sweep_overdue(), 0)
+        self.assertTrue(Task.objects.filter(status='overdue').first().is_overdue)
+
+    def test_command_refreshes_the_assignee_dashboard(self):
+        employee = self.org['employees'][0]
+        self.client.force_login(employee)
+        self.client.get(reverse('dashboard'))
+        call_command('sweep_overdue_tasks', stdout=io.StringIO())
+        tasks = self.client.get(reverse('dashboard')).context['assigned_tasks']
+        self.assertIn('overdue', [task.status for task in tasks])
+
+    def test_overdue_filter_includes_unswept_tasks(self):
+        employee = self.org['employees'][0]
+        self.client.force_login(employee)
+        tasks = self.client.get(reverse('task_list'), {'status': 'overdue'}).context['tasks']
+        self.assertEqual([task.status for task in tasks], ['assigned'])
+        self.assertTrue(all(task.is_overdue for task in tasks))
+
+
+class ReadOnlyApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = seed_org(employees_per_leader=2, tasks_per_employee=3)
+
+    def get(self, user, name, *args, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse(name, args=args), params)
+
+    def test_rows_are_scoped_like_the_html_views(self):
+        employee, leader = self.org['employees'][0], self.org['leaders'][0]
+        tasks = self.get(employee, 'api_list', 'tasks').json()['results']
+        self.assertEqual({task['assigned_to'] for task in tasks}, {employee.id})
+        # A team leader sees the tasks assigned to them and the ones they assigned
+        self.assertEqual(len(self.get(leader, 'api_list', 'tasks').json()['results']), 1 + 2 * 3)
+        # HR sees no tasks, as in task_list
+        task = Task.objects.first()
+        self.assertEqual(self.get(self.org['hr'], 'api_list', 'tasks').json()['results'], [])
+        self.assertEqual(self.get(self.org['hr'], 'api_detail', 'tasks', task.id).status_code, 404)
+
+        other = Appraisal.objects.exclude(employee=employee).first()
+        self.assertEqual(self.get(employee, 'api_detail', 'appraisals', other.id).status_code, 404)
+        self.assertEqual(self.get(other.manager, 'api_detail', 'appraisals', other.id).status_code, 200)
+
+    def test_field_selection(self):
+        rows = self.get(self.org['hr'], 'api_list', 'appraisals', fields='id,status').json()['results']
+        self.assertEqual(set(rows[0]), {'id', 'status'})
+        response = self.get(self.org['hr'], 'api_list', 'appraisals', fields='id,employee__password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_keyset_pages_cover_every_row_once(self):
+        seen, cursor = [], ''
+        while True:
+            page = self.get(self.org['hr'], 'api_list', 'ratings', fields='id', limit=3, cursor=cursor).json()
+            seen += page['results']
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(row['id'] for row in seen),
+                         list(PerformanceRating.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_unchanged_poll_gets_304_without_reading_rows(self):
+        hr = self.org['hr']
+        first = self.get(hr, 'api_list', 'ratings')
+        self.client.force_login(hr)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api_list', args=['ratings']), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if 'overall_rating' in q['sql']])
+
+        rating = PerformanceRating.objects.first()
+        rating.remarks = 'Revised'
+        rating.save()
+        self.client.force_login(hr)
+        response = self.client.get(reverse('api_list', args=['ratings']), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['remarks'], 'Revised')
+
+    def test_page_tag_reads_only_the_page_keys(self):
+        hr = self.org['hr']
+        first = self.get(hr, 'api_list', 'appraisals', limit=2)
+        self.client.force_login(hr)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('api_list', args=['appraisals']), {'limit': 2},
+                                       HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        [query] = [q['sql'] for q in ctx.captured_queries if 'appraisals_appraisal' in q['sql']]
+        self.assertIn('LIMIT 3', query)
+        self.assertNotIn('COUNT(', query)
+
+        # Deleting a row on the page changes its tag
+        Appraisal.objects.filter(pk=first.json()['results'][0]['id']).delete()
+        self.assertNotEqual(self.get(hr, 'api_list', 'appraisals', limit=2)['ETag'], first['ETag'])
+
+
+class SqlitePragmaTests(TestCase):
+
+    def test_new_connections_get_the_profile_pragmas(self):
+        # A connection of its own, so the shared test connection keeps its pragmas
+        other = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.addCleanup(other.close)
+        with override_settings(SQLITE_PRAGMAS={'cache_size': -4000, 'busy_timeout': 1500}):
+            other.ensure_connection()
+        with other.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4000)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 1500)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertNotEqual(cursor.fetchone()[0], 1500)
+
+
+class SeedOrgTests(TestCase):
+
+    def test_seeded_org_is_consistent(self):
+        from accounts.hierarchy import rebuild_closure
+        from .rollups import rebuild_period
+        from .seeding import OrgSeeder
+
+        counts = OrgSeeder(departments=2, managers=2, leaders=2, employees=3, tasks=4, periods=2, hr=1).run()
+        self.assertEqual(counts['users'], 1 + 2 * (2 + 4 + 12))
+        self.assertEqual(CustomUser.objects.filter(role='employee', manager__role='team_leader').count(), 24)
+        self.assertEqual(CustomUser.objects.filter(role='manager', manager__role='manager').count(), 2)
+        # Derived tables were rebuilt after the bulk inserts
+        self.assertEqual(rebuild_closure(repair=False), 0)
+        for period in AppraisalPeriod.objects.all():
+            self.assertEqual(rebuild_period(period, repair=False), [])
+        self.assertEqual(Appraisal.objects.count(), 2 * (8 + 24))
+        unread = Notification.objects.filter(is_read=False).values('recipient').distinct().count()
+        self.assertEqual(CustomUser.objects.filter(unread_notification_count__gt=0).count(), unread)
+
+    def test_url_benchmark_writes_a_baseline(self):
+        seed_org(employees_per_leader=1, tasks_per_employee=2)
+        appraisals = Appraisal.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'baseline.json')
+            call_command('bench_urls', repeat=2, output=output, stdout=io.StringIO())
+            with open(output) as baseline:
+                results = json.load(baseline)['results']
+            # Routes that write on GET are skipped, so a run leaves the data as it found it
+            self.assertNotIn('team_leader create_appraisal', results)
+            self.assertEqual(Appraisal.objects.count(), appraisals)
+            self.assertIn('employee dashboard', results)
+            self.assertIn('hr_admin api_list', results)
+            self.assertEqual(set(results['calculate_scores']), {'p50_ms', 'p95_ms', 'queries'})
+            # A run compared with itself has no regressions
+            call_command('bench_urls', repeat=2, output=output + '.new', compare=output, tolerance=10,
+                         stdout=io.StringIO())
@@ -6,6 +6,9 @@ urlpatterns = [
     path('tasks/', views.task_list, name='task_list'),
     path('tasks/create/', views.create_task, name='create_task'),
     path('tasks/<int:task_id>/submit/', views.submit_task, name='submit_task'),
+    path('tasks/<int:task_id>/report/', views.download_task_report, name='download_task_report'),
+    path('uploads/', views.start_report_upload, name='start_report_upload'),
+    path('uploads/<uuid:upload_id>/', views.report_upload, name='report_upload'),
     path('rate/<int:employee_id>/', views.rate_employee, name='rate_employee'),
     path('appraisal/create/<int:employee_id>/', views.create_appraisal, name='create_appraisal'),
     path('appraisal/<int:appraisal_id>/', views.view_appraisal, name='view_appraisal'),
@@ -16,4 +19,18 @@ urlpatterns = [
     path('appraisal/<int:appraisal_id>/edit-scores/', views.edit_appraisal_scores, name='edit_appraisal_scores'),
     path('period/create/', views.create_appraisal_period, name='create_appraisal_period'),
     path('period/<int:period_id>/edit/', views.edit_appraisal_period, name='edit_appraisal_period'),
+    path('period/<int:period_id>/pdfs/', views.export_period_pdfs, name='export_period_pdfs'),
+    path('period/<int:period_id>/analytics/<int:department_id>/', views.department_analytics, name='department_analytics'),
+    path('period/<int:period_id>/analytics/<int:department_id>/keywords/', views.department_keywords,
+         name='department_keywords'),
+    path('period/<int:period_id>/keywords/', views.keyword_employees, name='keyword_employees'),
+    path('export/<str:dataset>.csv', views.export_csv, name='export_csv'),
+    path('search/', views.search, name='search'),
+    path('api/<str:resource>/', views.api_list, name='api_list'),
+    path('api/<str:resource>/<int:pk>/', views.api_detail, name='api_detail'),
+    path('notifications/', views.notifications, name='notifications'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+    path('notifications/poll/', views.notification_poll, name='notification_poll'),
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
+    path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
 ]
\ No newline at end of file
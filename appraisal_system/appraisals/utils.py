@@ -1,19 +1,106 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Notification
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .events import publish_notifications, publish_unread
+from .models import Notification, NotificationOutbox
 
 User = get_user_model()
 
+FAN_OUT_BATCH_SIZE = 500
+
+def adjust_unread_counts(user_ids, delta):
+    """Shift the denormalized unread counter of each user by ``delta``"""
+    User.objects.filter(pk__in=user_ids).update(
+        unread_notification_count=Greatest(F('unread_notification_count') + delta, 0)
+    )
+
+def recount_unread(user_ids):
+    """Recompute the unread counter of each user from their notifications"""
+    unread = (Notification.objects.filter(recipient=OuterRef('pk'), is_read=False)
+              .order_by().values('recipient').annotate(n=Count('pk')).values('n'))
+    User.objects.filter(pk__in=user_ids).update(
+        unread_notification_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0))
+    )
+    publish_unread(user_ids)
+
 def create_notification(recipient, notification_type, title, message, appraisal=None):
     """Create a notification for a user"""
-    notification = Notification.objects.create(
-        recipient=recipient,
-        notification_type=notification_type,
-        title=title,
-        message=message,
-        appraisal=appraisal
-    )
+    with transaction.atomic():
+        notification = Notification.objects.create(
+            recipient=recipient,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            appraisal=appraisal
+        )
+        adjust_unread_counts([recipient.pk], 1)
+        publish_notifications([notification])
     return notification
 
+def fan_out_notification(recipients, notification_type, title, message, appraisal=None):
+    """Send the same notification to every user in ``recipients``.
+
+    Rows are written with bulk inserts. With ``NOTIFICATION_OUTBOX`` enabled the
+    request only records one outbox event and ``process_notification_outbox``
+    materializes the notifications later. Returns the number of recipients.
+    """
+    recipient_ids = list(recipients.values_list('pk', flat=True))
+    if not recipient_ids:
+        return 0
+    if getattr(settings, 'NOTIFICATION_OUTBOX', False):
+        NotificationOutbox.objects.create(
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            appraisal=appraisal,
+            recipient_ids=recipient_ids,
+        )
+    else:
+        deliver_notifications(recipient_ids, notification_type, title, message, appraisal)
+    return len(recipient_ids)
+
+def deliver_notifications(recipient_ids, notification_type, title, message, appraisal=None):
+    """Insert one notification per recipient id, FAN_OUT_BATCH_SIZE rows per INSERT.
+
+    ``appraisal`` may be an Appraisal or its id.
+    """
+    appraisal_id = getattr(appraisal, 'pk', appraisal)
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    recipient_id=recipient_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    appraisal_id=appraisal_id,
+                )
+                for recipient_id in recipient_ids
+            ],
+            batch_size=FAN_OUT_BATCH_SIZE,
+        )
+        adjust_unread_counts(recipient_ids, 1)
+        publish_notifications(notifications)
+
+def process_outbox(limit=100):
+    """Materialize up to ``limit`` pending outbox events; returns (events, notifications)"""
+    events = notifications = 0
+    with transaction.atomic():
+        pending = (NotificationOutbox.objects.select_for_update(skip_locked=True)
+                   .filter(processed_at__isnull=True).order_by('id')[:limit])
+        processed = []
+        for event in pending:
+            deliver_notifications(event.recipient_ids, event.notification_type, event.title,
+                                  event.message, event.appraisal_id)
+            processed.append(event.pk)
+            events += 1
+            notifications += len(event.recipient_ids)
+        NotificationOutbox.objects.filter(pk__in=processed).update(processed_at=timezone.now())
+    return events, notifications
+
 def notify_team_leader_about_appraisal(appraisal, notification_type, action):
     """Notify team leader when their team member's appraisal is updated"""
     employee = appraisal.employee
@@ -45,14 +132,13 @@ def notify_hr_about_negotiation(negotiation_ticket):
              f"by {negotiation_ticket.negotiated_by.get_full_name()} ({negotiator_role}). " \
              f"Period: {negotiation_ticket.appraisal.period.title}"
     
-    for hr_user in hr_users:
-        create_notification(
-            recipient=hr_user,
-            notification_type='negotiation_requested',
-            title=title,
-            message=message,
-            appraisal=negotiation_ticket.appraisal
-        )
+    fan_out_notification(
+        hr_users,
+        notification_type='negotiation_requested',
+        title=title,
+        message=message,
+        appraisal=negotiation_ticket.appraisal
+    )
 
 def get_user_notifications(user, unread_only=False):
     """Get notifications for a user"""
@@ -61,12 +147,26 @@ def get_user_notifications(user, unread_only=False):
         notifications = notifications.filter(is_read=False)
     return notifications
 
+def mark_notifications_as_read(user, notification_ids=None):
+    """Mark the given notifications (or all of them) read with a single UPDATE.
+
+    Returns how many notifications changed state; the user's unread counter
+    is lowered by the same amount in the same transaction.
+    """
+    unread = user.notifications.filter(is_read=False)
+    if notification_ids is not None:
+        unread = unread.filter(id__in=notification_ids)
+    with transaction.atomic():
+        marked = unread.update(is_read=True)
+        if marked:
+            adjust_unread_counts([user.pk], -marked)
+            publish_unread([user.pk])
+    if marked:
+        user.unread_notification_count = max(user.unread_notification_count - marked, 0)
+    return marked
+
 def mark_notification_as_read(notification_id, user):
     """Mark a notification as read"""
-    try:
-        notification = Notification.objects.get(id=notification_id, recipient=user)
-        notification.is_read = True
-        notification.save()
+    if mark_notifications_as_read(user, [notification_id]):
         return True
-    except Notification.DoesNotExist:
-        return False
+    return Notification.objects.filter(id=notification_id, recipient=user).exists()
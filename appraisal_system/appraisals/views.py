@@ -1,14 +1,34 @@
+import uuid
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from .models import Task, PerformanceRating, Appraisal, AppraisalPeriod, NegotiationTicket
+from .models import Task, PerformanceRating, Appraisal, AppraisalPeriod, NegotiationTicket, ReportUpload
+from .analytics import cached_department_period_report
+from .api import MAX_PAGE_SIZE, RESOURCES, page_etag, row_etag, scoped_queryset, select_fields, shape, values_page_query
+from .events import broker, format_sse, notification_event, notifications_after, release_connection, unread_event
+from .exports import DATASETS, stream_csv
+from .keywords import employees_with_keyword, top_keywords
+from .rollups import get_scores
+from .scoring import rating_period_q
+from .search import KINDS as SEARCH_KINDS, search as search_index, search_available
+from .pagination import DEFAULT_PAGE_SIZE, keyset_paginate
+from .reports import UploadOffsetMismatch, append_chunk, attach_report, finish_upload, start_upload
+from .pdf import cached_appraisal_pdf, pdf_cache_key, pdf_data_for, pdf_filename, stream_period_pdfs
+from .utils import get_user_notifications, mark_notification_as_read, mark_notifications_as_read
 from .forms import TaskForm, RatingForm, AppraisalForm, NegotiationForm, AppraisalPeriodForm
-from accounts.models import CustomUser
+from accounts.models import CustomUser, Department
 from django.http import HttpResponseForbidden
+from django.views.decorators.http import require_http_methods, require_POST
 from django import forms
 
 class HRAppraisalScoreForm(forms.ModelForm):
@@ -16,26 +36,50 @@ class HRAppraisalScoreForm(forms.ModelForm):
         model = Appraisal
         fields = ['overall_percentage', 'task_completion_score', 'quality_score', 'timeliness_score', 'final_remarks']
 
+def filter_tasks(queryset, params):
+    """Apply the optional status/priority filters of the task list"""
+    status = params.get('status')
+    if status == 'overdue':
+        # Includes tasks that went past due since the last sweep
+        queryset = queryset.overdue()
+    elif status in dict(Task.STATUS_CHOICES):
+        queryset = queryset.filter(status=status)
+    priority = params.get('priority')
+    if priority in dict(Task.PRIORITY_CHOICES):
+        queryset = queryset.filter(priority=priority)
+    return queryset
+
 @login_required
 def task_list(request):
+    filters = {
+        'status_choices': Task.STATUS_CHOICES,
+        'priority_choices': Task.PRIORITY_CHOICES,
+        'selected_status': request.GET.get('status', ''),
+        'selected_priority': request.GET.get('priority', ''),
+    }
     if request.user.role == 'employee':
-        tasks = Task.objects.filter(assigned_to=request.user).order_by('-created_at')
-        return render(request, 'appraisals/task_list.html', {'tasks': tasks})
+        tasks = filter_tasks(Task.objects.filter(assigned_to=request.user).select_related('assigned_by').with_completion_status(), request.GET)
+        tasks = keyset_paginate(tasks, request.GET.get('cursor'))
+        return render(request, 'appraisals/task_list.html', {'tasks': tasks, **filters})
     elif request.user.role == 'team_leader':
-        assigned_to_me = Task.objects.filter(assigned_to=request.user).order_by('-created_at')
-        assigned_by_me = Task.objects.filter(assigned_by=request.user).order_by('-created_at')
+        assigned_to_me = filter_tasks(Task.objects.filter(assigned_to=request.user).select_related('assigned_by').with_completion_status(), request.GET)
+        assigned_by_me = filter_tasks(Task.objects.filter(assigned_by=request.user).select_related('assigned_to').with_completion_status(), request.GET)
+        assigned_to_me = keyset_paginate(assigned_to_me, request.GET.get('to_cursor'))
+        assigned_by_me = keyset_paginate(assigned_by_me, request.GET.get('by_cursor'))
         # For each completed task assigned by me, check if rated by me
-        rated_task_ids = set(PerformanceRating.objects.filter(manager=request.user, task__in=assigned_by_me).values_list('task_id', flat=True))
+        rated_task_ids = set(PerformanceRating.objects.filter(manager=request.user, task__in=[task.id for task in assigned_by_me]).values_list('task_id', flat=True))
         return render(request, 'appraisals/task_list.html', {
             'tasks_assigned_to_me': assigned_to_me,
             'tasks_assigned_by_me': assigned_by_me,
             'rated_task_ids': rated_task_ids,
             'is_team_leader': True,
+            **filters,
         })
     elif request.user.role == 'manager':
-        tasks = Task.objects.filter(assigned_by=request.user).order_by('-created_at')
-        rated_task_ids = set(PerformanceRating.objects.filter(manager=request.user, task__in=tasks).values_list('task_id', flat=True))
-        return render(request, 'appraisals/task_list.html', {'tasks': tasks, 'rated_task_ids': rated_task_ids})
+        tasks = filter_tasks(Task.objects.filter(assigned_by=request.user).select_related('assigned_to').with_completion_status(), request.GET)
+        tasks = keyset_paginate(tasks, request.GET.get('cursor'))
+        rated_task_ids = set(PerformanceRating.objects.filter(manager=request.user, task__in=[task.id for task in tasks]).values_list('task_id', flat=True))
+        return render(request, 'appraisals/task_list.html', {'tasks': tasks, 'rated_task_ids': rated_task_ids, **filters})
     else:
         # HR: do not show tasks or completed appraisals
         return render(request, 'appraisals/task_list.html', {'is_hr': True})
@@ -66,19 +110,94 @@ def submit_task(request, task_id):
     task = get_object_or_404(Task, id=task_id, assigned_to=request.user)
     
     if request.method == 'POST':
-        if 'completion_report' in request.FILES:
-            task.completion_report = request.FILES['completion_report']
+        upload = None
+        if request.POST.get('upload_id'):
+            try:
+                upload = ReportUpload.objects.filter(pk=uuid.UUID(request.POST['upload_id']), user=request.user).first()
+            except ValueError:
+                upload = None
+            if upload is None or not upload.is_complete:
+                messages.error(request, 'The report upload is not complete yet. Please try again.')
+                return render(request, 'appraisals/submit_task.html', {'task': task, **report_upload_settings()})
+        elif 'completion_report' in request.FILES:
+            report = request.FILES['completion_report']
+            attach_report(task, report, report.name)
         task.status = 'completed'
         task.completed_date = timezone.now()
-        task.save()
+        if upload is not None:
+            finish_upload(task, upload)
+        else:
+            task.save()
         messages.success(request, 'Task submitted successfully!')
         return redirect('task_list')
     
-    return render(request, 'appraisals/submit_task.html', {'task': task})
+    return render(request, 'appraisals/submit_task.html', {'task': task, **report_upload_settings()})
+
+def report_upload_settings():
+    return {
+        'upload_chunk_size': settings.REPORT_UPLOAD_CHUNK_SIZE,
+        'upload_max_bytes': settings.REPORT_UPLOAD_MAX_BYTES,
+    }
+
+@login_required
+@require_POST
+def start_report_upload(request):
+    """Open a resumable upload; the client then PUTs chunks to the returned URL"""
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'size is required.'}, status=400)
+    filename = request.POST.get('filename', '').strip()
+    if not filename or size <= 0 or size > settings.REPORT_UPLOAD_MAX_BYTES:
+        return JsonResponse({'status': 'error', 'message': 'Invalid filename or size.'}, status=400)
+    upload = start_upload(request.user, filename, size)
+    return JsonResponse({
+        'status': 'success',
+        'upload_id': str(upload.pk),
+        'url': reverse('report_upload', args=[upload.pk]),
+        'offset': upload.offset,
+        'chunk_size': settings.REPORT_UPLOAD_CHUNK_SIZE,
+    }, status=201)
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def report_upload(request, upload_id):
+    """GET reports how far an upload got; PUT appends the body at the ``Upload-Offset`` header"""
+    upload = get_object_or_404(ReportUpload, pk=upload_id, user=request.user)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Upload-Offset is required.'}, status=400)
+        try:
+            upload = append_chunk(upload, request, offset)
+        except UploadOffsetMismatch as mismatch:
+            return JsonResponse({'status': 'error', 'message': str(mismatch), 'offset': mismatch.offset}, status=409)
+        except ValueError as exc:
+            return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'offset': upload.offset,
+        'size': upload.size,
+        'complete': upload.is_complete,
+    })
+
+@login_required
+def download_task_report(request, task_id):
+    task = get_object_or_404(Task, id=task_id)
+    user = request.user
+    allowed = (user.id in (task.assigned_to_id, task.assigned_by_id) or user.role == 'hr_admin'
+               or user.manages(task.assigned_to_id))
+    if not allowed:
+        return HttpResponseForbidden()
+    if not task.completion_report:
+        raise Http404('This task has no completion report.')
+    return FileResponse(task.completion_report.open('rb'), as_attachment=True,
+                        filename=task.completion_report_name or task.completion_report.name.rsplit('/', 1)[-1])
 
 @login_required
 def rate_employee(request, employee_id):
-    employee = get_object_or_404(CustomUser, id=employee_id)
+    employee = get_object_or_404(CustomUser.objects.select_related('department'), id=employee_id)
     if request.user.role == 'team_leader' and employee.role != 'employee':
         messages.error(request, 'Team leaders can only rate employees.')
         return redirect('dashboard')
@@ -100,7 +219,7 @@ def rate_employee(request, employee_id):
             return redirect('dashboard')
     else:
         form = RatingForm()
-        form.fields['task'].queryset = Task.objects.filter(assigned_to=employee, status='completed')
+        form.fields['task'].queryset = Task.objects.filter(assigned_to=employee, status='completed').select_related('assigned_to')
     
     return render(request, 'appraisals/rate_employee.html', {'form': form, 'employee': employee})
 
@@ -129,22 +248,32 @@ def create_appraisal(request, employee_id):
         messages.info(request, 'Appraisal already exists for this employee.')
         return redirect('view_appraisal', appraisal_id=existing_appraisal.id)
 
-    appraisal = Appraisal.objects.create(
+    appraisal = Appraisal(
         employee=employee,
         period=period,
         manager=request.user,
         overall_percentage=0,
-        final_remarks="Generated automatically based on performance ratings.",
+        final_remarks=Appraisal.AUTO_REMARKS,
         status='submitted',  # Always send to HR
     )
-
-    appraisal.calculate_scores()
+    # Scores are filled in before the first save so creation is a single INSERT
+    get_scores(employee, period).apply(appraisal)
+    try:
+        with transaction.atomic():
+            appraisal.save()
+    except IntegrityError:
+        # generate_appraisals (or a double submit) created it since we looked
+        existing_appraisal = Appraisal.objects.get(employee=employee, period=period)
+        messages.info(request, 'Appraisal already exists for this employee.')
+        return redirect('view_appraisal', appraisal_id=existing_appraisal.id)
     messages.success(request, f'Appraisal created for {employee.get_full_name()} and sent to HR!')
     return redirect('view_appraisal', appraisal_id=appraisal.id)
 
 @login_required
 def view_appraisal(request, appraisal_id):
-    appraisal = get_object_or_404(Appraisal, id=appraisal_id)
+    appraisal = get_object_or_404(
+        Appraisal.objects.select_related('employee__department', 'manager', 'period'), id=appraisal_id,
+    )
     
     # Check permissions
     if not (request.user == appraisal.employee or 
@@ -155,7 +284,7 @@ def view_appraisal(request, appraisal_id):
     
     context = {
         'appraisal': appraisal,
-        'ratings': PerformanceRating.objects.filter(employee=appraisal.employee),
+        'ratings': PerformanceRating.objects.filter(rating_period_q(appraisal.period), employee=appraisal.employee),
     }
     
     return render(request, 'appraisals/view_appraisal.html', context)
@@ -211,41 +340,185 @@ def approve_appraisal(request, appraisal_id):
 
 @login_required
 def generate_appraisal_pdf(request, appraisal_id):
-    appraisal = get_object_or_404(Appraisal, id=appraisal_id)
+    data = pdf_data_for(appraisal_id)
+    if data is None:
+        raise Http404('No Appraisal matches the given query.')
     
     if request.user.role != 'hr_admin':
         messages.error(request, 'You do not have permission to generate PDF reports.')
         return redirect('dashboard')
     
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="appraisal_{appraisal.employee.get_full_name()}_{appraisal.period.title}.pdf"'
-    
-    p = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
-    
-    # PDF Content
-    p.drawString(100, height - 100, f"PERFORMANCE APPRAISAL REPORT")
-    p.drawString(100, height - 130, f"Employee: {appraisal.employee.get_full_name()}")
-    p.drawString(100, height - 150, f"Period: {appraisal.period.title}")
-    p.drawString(100, height - 170, f"Manager: {appraisal.manager.get_full_name()}")
-    p.drawString(100, height - 200, f"Overall Score: {appraisal.overall_percentage:.1f}%")
-    p.drawString(100, height - 220, f"Task Completion: {appraisal.task_completion_score:.1f}%")
-    p.drawString(100, height - 240, f"Quality Score: {appraisal.quality_score:.1f}%")
-    p.drawString(100, height - 260, f"Timeliness Score: {appraisal.timeliness_score:.1f}%")
-    p.drawString(100, height - 290, f"Status: {appraisal.get_status_display()}")
-    
-    # Add remarks
-    p.drawString(100, height - 320, "Final Remarks:")
-    y_pos = height - 340
-    for line in appraisal.final_remarks.split('\n'):
-        p.drawString(120, y_pos, line)
-        y_pos -= 20
-    
-    p.showPage()
-    p.save()
+    # A re-download of an unchanged letter is answered with a 304 before
+    # ReportLab or the disk cache is touched
+    key = pdf_cache_key(data)
+    etag = quote_etag(key)
+    last_modified = int(data['updated_at'].timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(cached_appraisal_pdf(data, key), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{pdf_filename(data)}"'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
     
     return response
 
+@login_required
+def export_period_pdfs(request, period_id):
+    period = get_object_or_404(AppraisalPeriod, id=period_id)
+
+    if request.user.role != 'hr_admin':
+        messages.error(request, 'You do not have permission to generate PDF reports.')
+        return redirect('dashboard')
+
+    # Letters are rendered in worker processes and zipped as they finish, so
+    # the download starts at once and memory stays flat for any period size
+    response = StreamingHttpResponse(stream_period_pdfs(period), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="appraisals_{period.title}.zip"'
+    return response
+
+@login_required
+def department_analytics(request, period_id, department_id):
+    if request.user.role != 'hr_admin':
+        return JsonResponse({'status': 'error', 'message': 'You do not have permission to view analytics.'}, status=403)
+    period = get_object_or_404(AppraisalPeriod, id=period_id)
+    department = get_object_or_404(Department, id=department_id)
+    return JsonResponse(cached_department_period_report(department, period))
+
+@login_required
+def keyword_employees(request, period_id):
+    """Employees whose ratings in the period were tagged with ``?keyword=``"""
+    if request.user.role != 'hr_admin':
+        return JsonResponse({'status': 'error', 'message': 'You do not have permission to view analytics.'}, status=403)
+    period = get_object_or_404(AppraisalPeriod, id=period_id)
+    keyword = request.GET.get('keyword', '')
+    if not keyword.strip():
+        return JsonResponse({'status': 'error', 'message': 'Give a keyword.'}, status=400)
+    return JsonResponse({
+        'keyword': keyword,
+        'employees': [
+            {'id': row['employee'], 'username': row['employee__username'],
+             'name': f"{row['employee__first_name']} {row['employee__last_name']}".strip(),
+             'ratings': row['ratings']}
+            for row in employees_with_keyword(keyword, period)
+        ],
+    })
+
+@login_required
+def department_keywords(request, period_id, department_id):
+    """The department's most used rating keywords in the period; ``?limit=`` up to MAX_PAGE_SIZE"""
+    if request.user.role != 'hr_admin':
+        return JsonResponse({'status': 'error', 'message': 'You do not have permission to view analytics.'}, status=403)
+    period = get_object_or_404(AppraisalPeriod, id=period_id)
+    department = get_object_or_404(Department, id=department_id)
+    limit = request.GET.get('limit', '10')
+    if not limit.isdigit() or not 0 < int(limit) <= MAX_PAGE_SIZE:
+        return JsonResponse({'status': 'error', 'message': f'limit must be 1-{MAX_PAGE_SIZE}.'}, status=400)
+    return JsonResponse({
+        'department': department.name,
+        'keywords': [
+            {'keyword': row['keyword__name'], 'ratings': row['ratings'], 'employees': row['employees']}
+            for row in top_keywords(department, period, int(limit))
+        ],
+    })
+
+@login_required
+def export_csv(request, dataset):
+    if request.user.role != 'hr_admin':
+        messages.error(request, 'You do not have permission to export data.')
+        return redirect('dashboard')
+    if dataset not in DATASETS:
+        raise Http404('Unknown export.')
+    period = None
+    period_id = request.GET.get('period', '')
+    if period_id:
+        if not period_id.isdigit():
+            raise Http404('Unknown appraisal period.')
+        period = get_object_or_404(AppraisalPeriod, id=period_id)
+
+    response = StreamingHttpResponse(stream_csv(dataset, period), content_type='text/csv')
+    suffix = f'_{period.title}' if period else ''
+    response['Content-Disposition'] = f'attachment; filename="{dataset}{suffix}.csv"'
+    return response
+
+@login_required
+def search(request):
+    """Ranked full-text search over remarks, task descriptions and negotiation texts.
+
+    HR searches everything; everyone else only rows they are a party to.
+    ``?kind=`` narrows to task, rating, appraisal or ticket.
+    """
+    if not search_available():
+        return JsonResponse({'status': 'error', 'message': 'Search is not available on this database.'}, status=501)
+    kind = request.GET.get('kind') or None
+    if kind is not None and kind not in SEARCH_KINDS:
+        return JsonResponse({'status': 'error', 'message': f'kind must be one of {", ".join(SEARCH_KINDS)}.'},
+                            status=400)
+    limit = request.GET.get('limit', '20')
+    if not limit.isdigit() or not 0 < int(limit) <= MAX_PAGE_SIZE:
+        return JsonResponse({'status': 'error', 'message': f'limit must be 1-{MAX_PAGE_SIZE}.'}, status=400)
+    results = search_index(request.user, request.GET.get('q', ''), kind, int(limit))
+    for result in results:
+        if result['appraisal_id']:
+            result['url'] = reverse('view_appraisal', args=[result['appraisal_id']])
+        else:
+            resource = 'tasks' if result['kind'] == 'task' else 'ratings'
+            result['url'] = reverse('api_detail', args=[resource, result['id']])
+    return JsonResponse({'results': results})
+
+def conditional_json(request, etag, last_modified, build):
+    """Answer with 304 when the client's copy is current, else JsonResponse(build())"""
+    etag = quote_etag(etag)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def api_fields(request, resource):
+    if resource not in RESOURCES:
+        raise Http404('Unknown resource.')
+    return select_fields(resource, request.GET.get('fields', ''))
+
+@login_required
+def api_list(request, resource):
+    """Read-only JSON listing, newest change first, with ``fields``, ``limit`` and ``cursor`` parameters"""
+    try:
+        fields = api_fields(request, resource)
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return JsonResponse({'status': 'error', 'message': f'limit must be between 1 and {MAX_PAGE_SIZE}.'}, status=400)
+    cursor = request.GET.get('cursor', '')
+    queryset = scoped_queryset(resource, request.user)
+
+    # The page's row keys, read from an index, decide whether anything
+    # changed; an unchanged poll never fetches a row
+    etag, last_modified = page_etag(queryset, cursor, limit, resource, ','.join(fields))
+
+    def build():
+        page = keyset_paginate(values_page_query(queryset, fields), cursor, per_page=limit, field='updated_at')
+        return {'results': [shape(row, fields) for row in page], 'next_cursor': page.next_cursor}
+
+    return conditional_json(request, etag, last_modified, build)
+
+@login_required
+def api_detail(request, resource, pk):
+    try:
+        fields = api_fields(request, resource)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    row = values_page_query(scoped_queryset(resource, request.user).filter(pk=pk), fields).first()
+    if row is None:
+        raise Http404('No such record.')
+    etag = row_etag(row, resource, ','.join(fields))
+    return conditional_json(request, etag, row['updated_at'], lambda: shape(row, fields))
+
 @login_required
 def create_appraisal_period(request):
     if request.user.role != 'hr_admin':
@@ -293,4 +566,121 @@ def edit_appraisal_scores(request, appraisal_id):
             return redirect('view_appraisal', appraisal_id=appraisal.id)
     else:
         form = HRAppraisalScoreForm(instance=appraisal)
-    return render(request, 'appraisals/edit_appraisal_scores.html', {'form': form, 'appraisal': appraisal})
\ No newline at end of file
+    return render(request, 'appraisals/edit_appraisal_scores.html', {'form': form, 'appraisal': appraisal})
+
+@login_required
+def notifications(request):
+    page = keyset_paginate(get_user_notifications(request.user), request.GET.get('cursor'))
+    return render(request, 'appraisals/notifications.html', {
+        'notifications': page,
+        'unread_count': request.user.unread_notification_count,
+    })
+
+def last_event_id(request):
+    """The newest notification id the client has, from Last-Event-ID or ?after="""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@login_required
+async def notification_stream(request):
+    """Server-sent events: new notifications and unread-count changes.
+
+    Runs as a coroutine under ASGI: an idle stream waits on the in-process
+    broker without polling or holding a database connection.
+    A reconnecting EventSource sends Last-Event-ID and is first sent what
+    it missed. Under WSGI the page falls back to notification_poll.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'status': 'error', 'message': 'Streaming needs the ASGI server; use polling.'},
+                            status=501)
+    user = await request.auser()
+    last_id = last_event_id(request)
+
+    async def events():
+        # Subscribe before reading the backlog so nothing falls in between
+        subscription = broker.subscribe(user.pk)
+        try:
+            missed, unread_count, _ = await sync_to_async(notifications_after)(user.pk, last_id)
+            # Idle streams must not hold a database connection each
+            await sync_to_async(release_connection)()
+            yield f'retry: {settings.NOTIFICATION_RETRY_MS}\n\n'
+            for notification in missed:
+                yield format_sse(notification_event(notification))
+            yield format_sse(unread_event(unread_count))
+            while True:
+                event = await subscription.get(settings.NOTIFICATION_HEARTBEAT)
+                # Comments keep proxies from closing an idle connection
+                yield format_sse(event) if event else ': keepalive\n\n'
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+async def notification_poll(request):
+    """Polling fallback: answers at once when ``after`` is behind, else waits for an event.
+
+    Returns the missed notifications (oldest first), the unread count and
+    ``retry_ms``, how long the client waits before polling again. Only under
+    ASGI does an up-to-date poll wait, up to ``timeout`` seconds (at most
+    NOTIFICATION_POLL_TIMEOUT); under WSGI waiting would hold a worker per
+    open tab, so it answers at once and the client polls every
+    NOTIFICATION_POLL_INTERVAL seconds.
+    """
+    user = await request.auser()
+    last_id = last_event_id(request)
+    try:
+        timeout = min(float(request.GET.get('timeout', settings.NOTIFICATION_POLL_TIMEOUT)),
+                      settings.NOTIFICATION_POLL_TIMEOUT)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid timeout.'}, status=400)
+    if isinstance(request, ASGIRequest):
+        retry_ms = settings.NOTIFICATION_RETRY_MS
+    else:
+        timeout, retry_ms = 0, settings.NOTIFICATION_POLL_INTERVAL * 1000
+
+    subscription = broker.subscribe(user.pk)
+    try:
+        missed, unread_count, last_id = await sync_to_async(notifications_after)(user.pk, last_id)
+        if not missed and timeout > 0:
+            await sync_to_async(release_connection)()
+            # The database stays the source of truth: an event only says it is worth looking again
+            if await subscription.get(timeout) is not None:
+                missed, unread_count, last_id = await sync_to_async(notifications_after)(user.pk, last_id)
+    finally:
+        broker.unsubscribe(subscription)
+    return JsonResponse({
+        'status': 'success',
+        'notifications': [notification_event(notification)['data'] for notification in missed],
+        'unread_count': unread_count,
+        'last_id': last_id,
+        'retry_ms': retry_ms,
+    })
+
+@login_required
+@require_POST
+def mark_notification_read(request, notification_id):
+    if not mark_notification_as_read(notification_id, request.user):
+        return JsonResponse({'status': 'error', 'message': 'Notification not found.'}, status=404)
+    return JsonResponse({'status': 'success', 'unread_count': request.user.unread_notification_count})
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    """Mark the posted ``ids`` read, or every unread notification when none are given"""
+    try:
+        ids = [int(notification_id) for notification_id in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid notification id.'}, status=400)
+    marked = mark_notifications_as_read(request.user, ids or None)
+    return JsonResponse({
+        'status': 'success',
+        'marked': marked,
+        'unread_count': request.user.unread_notification_count,
+    })